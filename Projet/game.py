@@ -1,11 +1,21 @@
 from utils.clauses_combin import *
 from utils.plateau import Plateau
 from utils.hitman import HC, HitmanReferee
-from gophersat.dimacs import solve
+from utils.profileur import Profileur
+from utils.affichage import Afficheur
+from utils.trace import EnregistreurTrace, RefereeEnregistre, RefereeRejoue
+from utils.modeles import ReserveModeles
+from utils.composantes import Composantes
+from utils.fenetre import ProuveurLocal
+from utils.dpll import dpll
+from utils.echantillonnage import Echantillonneur
+from utils.speculation import Speculateur
+from utils.arena import ArenaClauses
+from gophersat.dimacs import solve_model
 import heapq
 from typing import Tuple, List, Set
-from collections import namedtuple
-from time import sleep
+from collections import namedtuple, deque
+from time import perf_counter
 
 class Game:
     """
@@ -14,17 +24,28 @@ class Game:
     Le jeu est caracterise par :
         - plateau : objet plateau qui represente le plateau du jeu (notre modelisation de nos connaissances)
         - hitman : objet hitman qui permet de communiquer avec le referee
-        - clauses : liste de clauses qui represente notre base de clauses
+        - clauses : base de clauses, stockee dans une ArenaClauses (voir utils/arena.py), qui se manipule comme une liste de clauses
         - penalites : tableau contenant le nombre exact de gardes par lesquels on est vu pour chaque case (si ce nombre est connu, False sinon)
         - old_penalty : nombre de penalites avant la derniere action
         - status : dictionnaire contenant les informations sur l'etat actuel du jeu
         - nb_variables : nombre de variables dans la base de clauses
-        - attente : liste de couples ou l'on sait pour chaque couple qu'au moins une des deux cases est un garde (voir plus bas)
+        - modeles : objet ReserveModeles qui garde les modeles trouves par le solveur (voir garde_possible)
+        - composantes : objet Composantes qui decoupe la base de clauses en composantes independantes (voir resoudre)
+        - prouveur : objet ProuveurLocal qui extrait les clauses proches d'une case (voir refuter_localement)
+        - echantillonneur : objet Echantillonneur qui estime la probabilite de chaque variable (voir probabilites)
+        - _probabilites : couple (nombre de clauses, tableaux renvoyes par probabilites), cache de probabilites
+        - budget_sat_ms : temps maximum (en ms) passe a appeler le solveur avant chaque decision en mode "budget"
+        - _sondages : dictionnaire case -> priorite des cases a sonder au solveur en mode "budget" (voir executer_sondages)
+        - _speculateur : objet Speculateur si les sondages en arriere-plan sont actives, None sinon (voir speculer)
+        - attente : index case -> couples d'hypotheses ou l'on sait pour chaque couple qu'au moins une des deux cases est un garde (voir ajouter_attente)
         - _temporisation : booleen qui indique si on utilise la temporisation ou non (pour faire les affichages plus lentement)
         - _dict_cases : dictionnaire qui permet de convertir un contenu de case en un tuple (element, direction)
         - _dict_directions : dictionnaire qui permet de convertir une direction en un chaine de caracteres
         - _sat_mode : chaine de caracteres qui indique le mode de calcul du risque (voir plus bas)
         - _display : booleen qui indique si on affiche le jeu ou non
+        - _trace : objet EnregistreurTrace si l'enregistrement de la partie est active, None sinon (voir activer_trace)
+        - _afficheur : objet Afficheur qui affiche le plateau dans un thread separe (None tant que rien n'a ete affiche)
+        - _profileur : objet Profileur si le profilage est active, None sinon (voir activer_profilage)
 
     
     Les methodes utiles sont :
@@ -38,15 +59,32 @@ class Game:
             - penalite_minimale : methode qui determine la penalite minimale pour aller a une case (voir plus bas)
             - risque : methode qui determine le risque d'aller sur une case (voir plus bas)
             - update_knowledge : methode qui met a jour notre modelisation du jeu (voir plus bas)
+            - propager : methode qui propage le contenu de cases vues ou deduites dans notre modelisation (voir plus bas)
+            - ajouter_attente : methode qui ajoute un couple de cases dont une est un garde (voir plus bas)
             - update_hitman : methode qui met a jour la position et la direction du hitman sur le plateau (voir plus bas)
             - tourner : methode qui tourne jusqu'a ce qu'une case soit visible (voir plus bas)
             - satisfiable : methode qui determine si la base de clauses est satisfiable (voir plus bas)
+            - resoudre : methode qui appelle le solveur et renvoie le modele trouve (voir plus bas)
+            - garde_possible : methode qui determine s'il existe un modele ou une case contient un garde (voir plus bas)
+            - refuter_localement : methode qui essaye de prouver qu'une case n'est pas un garde avec les clauses proches (voir plus bas)
+            - probabilites : methode qui estime pour chaque case la probabilite de contenir un garde ou un invite (voir plus bas)
+            - garde_possible_sans_solveur : version de garde_possible qui n'appelle pas le solveur (voir plus bas)
+            - marquer_pas_garde : marque une case prouvee n'etant pas un garde (voir plus bas)
+            - executer_sondages : appelle le solveur sur les cases les plus utiles dans la limite du budget (voir plus bas)
+            - activer_speculation, speculer, recolter : sondages du solveur en arriere-plan pendant les actions (voir plus bas)
+            - activer_trace, fermer_trace : enregistrement de la partie dans une trace (voir utils/trace.py)
+            - rejouer : rejoue une partie enregistree sans moteur ni solveur
+            - afficher_plateau : envoie les cases modifiees du plateau au thread d'affichage
+            - attendre_affichage : attend que le thread d'affichage ait tout affiche
+            - fermer_affichage : affiche les dernieres images et arrete le thread d'affichage
+            - activer_profilage : active la mesure du temps passe dans les methodes couteuses du jeu
 
         Pour la phase 2 :
             - avancer, tourner_horaire, tourner_antihoraire : methodes qui renvoient la nouvelle position/direction apres avoir effectue l'action correspondante
             - seen_by_guards, seen_by_civil : methodes qui renvoient le nombre de gardes/invites qui nous voient depuis une case donnee
             - do_fn : methode qui permet de simuler une action, prend un etat en parametre et renvoit le nouvel etat correspondant apres l'action
             - do_fn_for_real : methode qui permet d'effectuer reellement une action
+            - reporter_action : methode qui reporte sur le plateau les effets d'une action effectuee
             - succ : methode qui renvoit les etats successeurs d'un etat donne (voir plus bas)
             - test_if_goal_achived : Teste si dans l'objectif a ete atteint pour l'etat donne
             - h_score : Adaptation de penalite_minimale pour calcul de h_score pour A* dans la phase 2 (voir plus bas)
@@ -60,17 +98,28 @@ class Game:
     def __init__(self):
         self.plateau = None
         self.hitman = HitmanReferee()
-        self.clauses = []
+        self.clauses = ArenaClauses()
         self.penalites = None
         self.old_penalty = 0
         self.status = None
         self.nb_variables = None
-        self.attente = []
+        self.modeles = ReserveModeles()
+        self.composantes = None
+        self.prouveur = None
+        self.echantillonneur = None
+        self._probabilites = (None, None)
+        self.budget_sat_ms = 50
+        self._sondages = dict()
+        self._speculateur = None
+        self.attente = dict()
         self._temporisation = True
         self._sat_mode = "auto"
         self._history_etats = set()
         self._history_positions = set()
         self._display = True
+        self._profileur = None
+        self._afficheur = None
+        self._trace = None
         self.n_invite_inconnu_restants = None
         self.n_garde_inconnu_restants = None
         self._dict_cases = {
@@ -95,12 +144,134 @@ class Game:
             HC.W : "gauche"
         }
 
+    def activer_profilage(self)-> Profileur:
+        """
+        Active le profilage : les methodes couteuses du jeu sont remplacees (sur l'instance)
+        par des versions qui comptent leurs appels et mesurent leur temps d'execution,
+        et chaque appel au solveur est enregistre avec le nombre de clauses et de variables.
+
+        Renvoie le profileur, qui permet ensuite d'afficher un resume ou d'exporter une trace
+        """
+        if self._profileur is None:
+            self._profileur = Profileur()
+            self._profileur.instrumenter(self, [
+                "risque",
+                "garde_possible",
+                "refuter_localement",
+                "probabilites",
+                "executer_sondages",
+                "recolter",
+                "satisfiable",
+                "resoudre",
+                "penalite_minimale",
+                "prochain_objectif",
+                "update_knowledge",
+                "do_fn",
+                "h_score",
+                "search_with_parent",
+            ])
+        return self._profileur
+
+    def activer_speculation(self, nb_travailleurs: int = 2):
+        """
+        Active les sondages en arriere-plan : apres chaque action, des threads sondent le solveur sur les
+        cases qui pourraient voir hitman depuis ses prochaines positions probables (voir speculer)
+        """
+        if self._speculateur is None:
+            self._speculateur = Speculateur(nb_travailleurs)
+
+    def activer_trace(self, filename: str):
+        """
+        Active l'enregistrement de la partie dans le fichier filename : chaque action envoyee au referee
+        est enregistree avec le status obtenu, ainsi que les decisions du moteur (objectifs, cases choisies,
+        risques affines par SAT, plan de la phase 2)
+        """
+        self._trace = EnregistreurTrace(filename)
+        self.hitman = RefereeEnregistre(self.hitman, self._trace)
+
+    def fermer_trace(self):
+        """
+        Termine l'enregistrement de la partie
+        """
+        if self._trace is not None:
+            self._trace.fermer()
+            self._trace = None
+
+    def noter_decision(self, nom: str, **donnees):
+        """
+        Enregistre une decision du moteur dans la trace si l'enregistrement est active
+        """
+        if self._trace is not None:
+            self._trace.decision(nom, **donnees)
+
+    def rejouer(self, filename: str, nb_actions: int = None, temporisation: bool = False, display: bool = True):
+        """
+        Rejoue une partie enregistree avec activer_trace, en s'arretant apres nb_actions actions
+        (toute la partie si nb_actions vaut None).
+
+        Le referee est remplace par un RefereeRejoue qui renvoie les status enregistres, et les actions
+        de la trace sont appliquees une par une avec update_knowledge (phase 1) et do_fn_for_real (phase 2).
+        Aucune recherche n'est faite et le solveur n'est jamais appele : on retrouve en quelques instants
+        le plateau et la base de clauses tels qu'ils etaient au moment voulu d'une longue partie,
+        pour l'afficher, le profiler ou le deboguer.
+        """
+        self.hitman = RefereeRejoue(filename)
+        self.initialiser_phase_1(temporisation, "no_sat", display)
+        nb_rejouees = 1 # start_phase1
+
+        while self.hitman.prochaine_action() is not None and (nb_actions is None or nb_rejouees < nb_actions):
+            nom_action = self.hitman.prochaine_action()
+            if nom_action == "start_phase2":
+                self.attendre_affichage()
+                self.status = self.hitman.start_phase2()
+                self.update_hitman()
+            elif self.status['phase'] == 1:
+                self.status = getattr(self.hitman, nom_action)()
+                self.update_knowledge()
+            else:
+                self.do_fn_for_real(nom_action)
+                self.update_hitman()
+            self.afficher_plateau()
+            nb_rejouees += 1
+
+        self.fermer_affichage()
+        return nb_rejouees
+
     def afficher_plateau(self):
         """
         Affiche le plateau si self._display est True
+
+        L'affichage est fait par un thread separe (voir Afficheur), on ne lui envoie que les cases
+        modifiees depuis le dernier affichage, le jeu n'attend donc jamais le terminal.
+        La temporisation est appliquee par le thread d'affichage entre deux images, elle ralentit
+        l'affichage mais pas le jeu.
         """
-        if self._display:
-            print(self.plateau)
+        if not self._display:
+            return
+
+        if self._afficheur is None:
+            m, n = self.plateau.infos_plateau()
+            self._afficheur = Afficheur(m, n, self.plateau.textes_cases())
+
+        self._afficheur.temporisation = 0.25 if self._temporisation else 0
+        self._afficheur.envoyer(self.plateau.extraire_modifications())
+
+    def attendre_affichage(self):
+        """
+        Attend que le thread d'affichage ait affiche toutes les images envoyees,
+        a appeler avant d'ecrire autre chose sur la sortie
+        """
+        if self._afficheur is not None:
+            self._afficheur.vider()
+
+    def fermer_affichage(self):
+        """
+        Affiche les dernieres images puis arrete le thread d'affichage, a appeler a la fin de
+        chaque phase (un nouvel afficheur est cree si on affiche de nouveau le plateau)
+        """
+        if self._afficheur is not None:
+            self._afficheur.fermer()
+            self._afficheur = None
 
     ##########################################
     ##########################################
@@ -114,8 +285,8 @@ class Game:
     
     @sat_mode.setter
     def sat_mode(self, mode: str):
-        if mode not in ("auto", "sat", "no_sat"):
-            raise ValueError("Le mode doit etre 'auto', 'sat' ou 'no_sat'")
+        if mode not in ("auto", "sat", "no_sat", "proba", "budget"):
+            raise ValueError("Le mode doit etre 'auto', 'sat', 'no_sat', 'proba' ou 'budget'")
         self._sat_mode = mode
 
     def pos_actuelle(self)-> Tuple[int, int]:
@@ -155,6 +326,39 @@ class Game:
         """
         print("\nLa phase 1 commence !")
         # Initialisation
+        self.initialiser_phase_1(temporisation, sat_mode, display)
+
+        # Deroulement
+        prochain_objectif = self.prochain_objectif()
+        while prochain_objectif:
+            i, j = prochain_objectif
+            self.explore(i, j)
+            prochain_objectif = self.prochain_objectif()
+
+        # Fin
+        self.fermer_affichage()
+        if self.hitman.send_content(self.plateau.board_to_dict()):
+            m, n = self.plateau.infos_plateau()
+            calculated_score = 2 * m * n - self.status['penalties']
+        else:
+            print("Perdu !")
+
+        if self._speculateur is not None:
+            self._speculateur.fermer()
+            self._speculateur = None
+
+        _, score, _, _ = self.hitman.end_phase1()
+
+        print("Result phase 1 :")
+        print(score)
+
+        return calculated_score, -self.status['penalties'], 2*m*n
+
+    def initialiser_phase_1(self, temporisation: bool, sat_mode: str, display: bool):
+        """
+        Initialisation de la phase 1 (etape I de phase_1) : demarre la phase aupres du referee,
+        cree le plateau et la base de clauses initiale, et traite la case de depart
+        """
         self.status = self.hitman.start_phase1()
         lignes = self.status['m']
         colonnes = self.status['n']
@@ -171,6 +375,12 @@ class Game:
         variables_invites = [self.plateau.cell_to_var(i, j, "invite") for i in range(m) for j in range(n)]
         variables_gardes = [self.plateau.cell_to_var(i, j, "garde") for i in range(m) for j in range(n)]
         self.nb_variables = len(variables_invites) + len(variables_gardes)
+        self.modeles = ReserveModeles()
+        self.composantes = Composantes(self.nb_variables)
+        self.prouveur = ProuveurLocal(self.plateau)
+        self.echantillonneur = Echantillonneur(self.nb_variables)
+        self._probabilites = (None, None)
+        self._sondages = dict()
 
         # On ajoute les clauses initiales
         
@@ -195,27 +405,6 @@ class Game:
         self.plateau.set_case(i_act, j_act, ("vide", None))
         self.afficher_plateau()
 
-        # Deroulement
-        prochain_objectif = self.prochain_objectif()
-        while prochain_objectif:
-            i, j = prochain_objectif
-            self.explore(i, j)
-            prochain_objectif = self.prochain_objectif()
-
-        # Fin
-        if self.hitman.send_content(self.plateau.board_to_dict()):
-            m, n = self.plateau.infos_plateau()
-            calculated_score = 2 * m * n - self.status['penalties']
-        else:
-            print("Perdu !")
-
-        _, score, _, _ = self.hitman.end_phase1()
-
-        print("Result phase 1 :")
-        print(score)
-
-        return calculated_score, -self.status['penalties'], 2*m*n
-
     def explore(self, i_objectif: int, j_objectif: int):
         """
         methode d'exploration qui a pour but d'effectuer une serie d'actions pour determiner
@@ -239,10 +428,7 @@ class Game:
             raise ValueError("Le jeu n'a pas ete initialise")
         
         # liste des cases depuis lesquelles on peut (a priori) voir la case (i, j)
-        targets = []
-        directions = ("haut", "droite", "bas", "gauche")
-        for direction in directions:
-            targets += self.plateau.cases_voir(i_objectif, j_objectif, direction)
+        targets = self.plateau.frontiere.points_de_vue(i_objectif, j_objectif)
         i_act, j_act = self.pos_actuelle()
 
         while not self.plateau.get_case(i_objectif, j_objectif).contenu_connu() and targets != []:
@@ -282,10 +468,9 @@ class Game:
 
             if not self.plateau.get_case(i_objectif, j_objectif).contenu_connu() and not reflexe_survie:
                 # il y a un objet entre la case actuelle et la case objectif
-                # on recalcule les targets avec case_voir, qui s'occupe d'enlever les cases non pertinentes a cause d'obstacles
-                targets = []
-                for direction in directions:
-                    targets += self.plateau.cases_voir(i_objectif, j_objectif, direction) # cases_voir renverra les cases depuis lesquelles on peut voir la case objectif en fonction de nos nouvelles connaissances
+                # on recupere les nouveaux points de vue, la frontiere les a recalcules avec cases_voir, qui s'occupe
+                # d'enlever les cases non pertinentes a cause d'obstacles en fonction de nos nouvelles connaissances
+                targets = self.plateau.frontiere.points_de_vue(i_objectif, j_objectif)
 
         if targets == []:
             raise ValueError(f"La case ({i_objectif}, {j_objectif}) n'est pas accessible")
@@ -296,6 +481,7 @@ class Game:
 
         L'heuristique utilisee est la penalite minimale
         """
+        self.executer_sondages()
         voisins_actuels = [v for v in self.plateau.voisins(i_act, j_act) if not self.plateau.get_case(v[0], v[1]).case_interdite()]
         penal_min = float("inf")
         voisin_min = None
@@ -313,9 +499,11 @@ class Game:
                     if self.plateau.distance_minimale(i_act, j_act, i_voisin, j_voisin) < self.plateau.distance_minimale(i_act, j_act, voisin_min[0], voisin_min[1]):
                         voisin_min = (i_voisin, j_voisin)
 
+        if voisin_min is not None:
+            self.noter_decision("prochaine_case", case=list(voisin_min), penalite=penal_min, cibles=[list(t) for t in targets])
         return voisin_min
     
-    def penalite_minimale(self, i: int, j: int, cases_target: Set[Tuple[int, int]] = set()) -> List[List[int]]:
+    def penalite_minimale(self, i: int, j: int, cases_target: Set[Tuple[int, int]] = set(), cases_arret: Set[Tuple[int, int]] = None) -> List[List[int]]:
         """
         Methode definissant l'heuristique d'exploration pour la phase 1
         Le retourn est un tableau m*n ou contient la penalite du meilleur chemin 
@@ -349,10 +537,16 @@ class Game:
 
         Utiliser SAT pour calculer le risque de toutes les cases n'est pas utile car la majorite des cases
         traitees sont inconnues et entourees de cases inconnues (et que l'on n'a pas non plus entendues)
+
+        cases_arret est un ensemble de coordonnees (en general la frontiere des cases inconnues) : si il
+        est donne, on s'arrete des que la moins chere de ces cases est traitee, apres avoir traite les
+        cases de meme penalite qu'elle (pour pouvoir departager les egalites). Les penalites des cases
+        non traitees restent a +infini.
         """
         m, n = self.plateau.infos_plateau()
         cases_traitees = set()
         tas_cases_a_traiter = []
+        penalite_arret = float("inf")
 
         penalites = [[float("inf") for _ in range(n)] for _ in range(m)]
 
@@ -361,6 +555,8 @@ class Game:
         else:
             penalites[i][j] = self.risque(i, j)
         cases_traitees.add((i, j))
+        if cases_arret is not None and (i, j) in cases_arret:
+            penalite_arret = penalites[i][j]
 
         for i_voisin, j_voisin in self.plateau.voisins(i, j):
             if self.plateau.get_case(i_voisin, j_voisin).case_interdite():
@@ -372,11 +568,15 @@ class Game:
             heapq.heappush(tas_cases_a_traiter, (penalite, i_voisin, j_voisin))
 
         while tas_cases_a_traiter != [] and (cases_target == set() or not cases_target.issubset(cases_traitees)):
+            if tas_cases_a_traiter[0][0] > penalite_arret:
+                break
             penalite_act, i_act, j_act = heapq.heappop(tas_cases_a_traiter)
             if (i_act, j_act) in cases_traitees:
                 continue
             cases_traitees.add((i_act, j_act))
             penalites[i_act][j_act] = penalite_act
+            if cases_arret is not None and (i_act, j_act) in cases_arret:
+                penalite_arret = min(penalite_arret, penalite_act)
 
             for i_voisin, j_voisin in self.plateau.voisins(i_act, j_act):
                 if self.plateau.get_case(i_voisin, j_voisin).case_interdite():
@@ -418,11 +618,20 @@ class Game:
 
         Au debut le nombre de penalite augmente de 1 en 1, puis a la fin cela augmente plus vite lorsque
         min est grand, ce qui permet de rejeter fortement les cases avec un grand min.
+
+        En mode "proba", on ne fait aucune preuve : le max d'une direction est remplace par la probabilite
+        qu'au moins une des cases de la direction contienne un garde, estimee par echantillonnage de
+        modeles (voir probabilites). Le risque est alors un reel compris entre 4 * min et 4 * min + max.
+
+        En mode "budget", risque n'appelle jamais le solveur : les cases que les modeles deja connus ne
+        permettent pas de trancher comptent comme des gardes possibles (estimation pessimiste) et sont
+        ajoutees aux sondages, executes avant les decisions suivantes (voir executer_sondages).
         """
 
-        if self.sat_mode == "no_sat":
+        use_proba = self.sat_mode == "proba"
+        if self.sat_mode in ("no_sat", "proba"):
             use_sat = False
-        elif self.sat_mode == "sat":
+        elif self.sat_mode in ("sat", "budget"):
             use_sat = True
 
         if not self.plateau.case_existe(i, j):
@@ -442,9 +651,11 @@ class Game:
 
         # "direction" : [min, max]
         visible_depuis = {"gauche": [0, 0], "droite": [0, 0], "haut": [0, 0], "bas": [0, 0]}
+        probabilites_gardes = None
 
         for direction in ['gauche', 'droite', 'haut', 'bas']:
             voisins_direction = gardes_potentiels[direction]
+            proba_aucun_garde = 1
             for i_garde, j_garde in voisins_direction:
 
                 # cas "on est sur" qu'un garde nous voit, mettre min et max a 1 pour la direction
@@ -459,15 +670,20 @@ class Game:
                         
                         # avant d'augmenter max, on essaye de prouver que la case n'est pas un garde.
                         # Pour cela on regarde s'il n'existe pas de modele ou la case est un garde
+                        # (si c'est le cas, garde_possible marque la case comme prouvee)
                         if use_sat:
-                            clauses_temp = self.clauses.copy()
-                            self.clauses.append([self.plateau.cell_to_var(i_garde, j_garde, "garde")])
-                            if self.satisfiable():
-                                visible_depuis[direction][1] = 1
+                            if self.sat_mode == "budget":
+                                possible = self.garde_possible_sans_solveur(i_garde, j_garde)
                             else:
-                                self.plateau.get_case(i_garde, j_garde).proven_not_guard = True
-                                clauses_temp.append([-self.plateau.cell_to_var(i_garde, j_garde, "garde")])
-                            self.clauses = clauses_temp.copy()
+                                possible = self.garde_possible(i_garde, j_garde)
+                            if possible:
+                                visible_depuis[direction][1] = 1
+                        # en mode "proba", on utilise la probabilite estimee que la case soit un garde
+                        elif use_proba:
+                            if probabilites_gardes is None:
+                                probabilites_gardes, _ = self.probabilites()
+                            proba_aucun_garde *= 1 - probabilites_gardes[i_garde][j_garde]
+                            visible_depuis[direction][1] = 1 - proba_aucun_garde
                         # Si on n'utilise pas sat, on ne cherche pas a prouver que la case n'est pas un garde
                         # et on incremente max dans tous les cas
                         else:
@@ -483,6 +699,9 @@ class Game:
         if not self.plateau.get_case(i, j).contenu_connu() and self.n_invite_inconnu_restants > 0:
             min = 0
 
+        if use_sat:
+            self.noter_decision("risque", case=[i, j], min=min, max=max)
+
         return (4 * min) + max
 
 
@@ -523,10 +742,8 @@ class Game:
             case_devant = self.status['vision'][0][0]
             if not self.plateau.get_case(case_devant[0], case_devant[1]).case_interdite(): # si la case devant n'est pas interdite
                 if self.penalites[i_act][j_act] > 0: # si on est en train d'etre vu par au moins un garde
-                    autres_pdv = []
-                    directions = ("haut", "droite", "bas", "gauche")
-                    for direction in directions: # autres points de vue depuis lesquels on pourrait voir notre objectif
-                        autres_pdv += self.plateau.cases_voir(i_objectif, j_objectif, direction)
+                    # autres points de vue depuis lesquels on pourrait voir notre objectif
+                    autres_pdv = self.plateau.frontiere.points_de_vue(i_objectif, j_objectif)
                     
                     # s'il existe un meilleur point de vue, on avance, cela ne vaut pas le coup de se tourner vers l'objectif
                     if self.risque(case_devant[0], case_devant[1], use_sat=True) < self.risque(i_act, j_act, use_sat=True):
@@ -632,8 +849,242 @@ class Game:
     def satisfiable(self)-> bool:
         """
         Renvoie True si les clauses sont satisfiables, False sinon
+
+        La base est satisfiable si et seulement si chacune de ses composantes l'est. Les composantes
+        sans clause le sont toujours, celles dont la satisfiabilite est en cache ne sont pas resolues,
+        et toutes les autres sont resolues ensemble en un seul appel au solveur (leurs clauses ne
+        partagent aucune variable, elles sont donc toutes satisfiables si et seulement si leur union l'est).
+        """
+        self.composantes.synchroniser(self.clauses)
+        a_resoudre = []
+        for racine, indices in self.composantes.indices_clauses.items():
+            if not indices:
+                continue
+            statut = self.composantes.statut(racine)
+            if statut is False:
+                return False
+            if statut is None:
+                a_resoudre.append(racine)
+        if not a_resoudre:
+            return True
+
+        clauses = self.composantes.clauses_racines(self.clauses, a_resoudre)
+        debut = perf_counter()
+        resultat, _ = solve_model(clauses, nb_var=self.nb_variables)
+        if self._profileur is not None:
+            self._profileur.enregistrer_sat(len(clauses), self.nb_variables, debut, perf_counter(), resultat)
+        if resultat:
+            for racine in a_resoudre:
+                self.composantes.enregistrer_statut(racine, True)
+        return resultat
+
+    def resoudre(self, hypotheses: List[List[int]] = [], variable: int = None)-> Tuple[bool, List[int]]:
+        """
+        Appelle le solveur sur la base de clauses augmentee des clauses hypotheses (qui ne sont
+        pas ajoutees a la base). Renvoie (True, modele) si c'est satisfiable, (False, []) sinon.
+
+        Si variable est donnee, on ne resout que la composante de la base qui contient cette variable
+        (les hypotheses ne doivent alors porter que sur des variables de cette composante), le modele
+        renvoye n'a de sens que pour les variables de la composante. Le resultat sans hypotheses est
+        garde en cache pour la composante.
+        """
+        if variable is None:
+            clauses = self.clauses
+        else:
+            self.composantes.synchroniser(self.clauses)
+            clauses = self.composantes.clauses(self.clauses, variable)
+        debut = perf_counter()
+        resultat, modele = solve_model(clauses, nb_var=self.nb_variables, hypotheses=hypotheses)
+        if self._profileur is not None:
+            self._profileur.enregistrer_sat(len(clauses) + len(hypotheses), self.nb_variables, debut, perf_counter(), resultat)
+        if variable is not None and (not hypotheses or resultat):
+            # un modele avec des hypotheses en plus est aussi un modele de la composante
+            self.composantes.enregistrer_statut(variable, resultat)
+        return resultat, modele
+
+    def garde_possible(self, i: int, j: int)-> bool:
+        """
+        Renvoie True s'il existe un modele de la base de clauses ou la case (i, j) contient un garde,
+        False sinon (la case est alors marquee comme prouvee n'etant pas un garde)
+
+        Les modeles trouves par le solveur sont gardes dans self.modeles : si la variable garde de la
+        case est vraie dans un modele encore valable, on repond sans appeler le solveur.
+
+        Sinon, plutot que de demander un modele ou la case est un garde, on demande un modele ou
+        au moins une des variables "inexpliquees" est vraie : les variables garde des cases inconnues
+        non prouvees qui ne sont vraies dans aucun modele garde. Chaque modele trouve explique au
+        moins une nouvelle variable (souvent plusieurs), et si il n'y en a pas, aucune de ces cases
+        ne peut etre un garde. On recommence jusqu'a ce que la case soit expliquee ou prouvee, le
+        nombre d'appels est donc borne par le nombre de cases inconnues, mais en pratique quelques
+        appels suffisent pour repondre a toutes les cases.
+
+        Les variables prouvees fausses sont retenues par la reserve (la base ne faisant que grandir,
+        elles le restent), mais une case n'est marquee proven_not_guard que lorsqu'elle est demandee,
+        comme si on l'avait demandee seule au solveur.
+
+        Chaque appel au solveur ne porte que sur la composante independante de la base qui contient
+        la variable (voir utils/composantes.py), avec uniquement les candidats de cette composante :
+        le modele trouve est un modele partiel, valable pour les variables de la composante.
+        """
+        variable = self.plateau.cell_to_var(i, j, "garde")
+        self.recolter(attendre=variable)
+        self.modeles.mettre_a_jour(self.clauses)
+        self.composantes.synchroniser(self.clauses)
+        racine = self.composantes.racine(variable)
+
+        refutation_essayee = False
+        while not self.modeles.possible(variable):
+            if not self.modeles.impossible(variable):
+                # les cases que les modeles n'expliquent pas sont souvent refutables avec les seules clauses proches
+                if not refutation_essayee:
+                    refutation_essayee = True
+                    if self.refuter_localement(i, j):
+                        self.modeles.ajouter_impossibles([variable])
+                        continue
+
+                candidats = [
+                    self.plateau.cell_to_var(i2, j2, "garde")
+                    for i2, j2 in self.plateau.cases_inconnues()
+                    if not self.plateau.get_case(i2, j2).proven_not_guard
+                ]
+                candidats = [v for v in candidats if self.composantes.racine(v) == racine]
+                inexpliquees = self.modeles.inexpliquees(sorted(set(candidats) | {variable}))
+
+                satisfiable, modele = self.resoudre([inexpliquees], variable=variable)
+                if satisfiable:
+                    self.modeles.ajouter(modele, len(self.clauses), self.composantes.variables_composante(variable))
+                    continue
+                self.modeles.ajouter_impossibles(inexpliquees)
+
+            self.marquer_pas_garde(i, j)
+            return False
+
+        return True
+
+    def marquer_pas_garde(self, i: int, j: int):
+        """
+        Marque la case (i, j) comme prouvee n'etant pas un garde, et ajoute a la base la clause
+        unitaire qui le dit. Seule facon de conclure de garde_possible et garde_possible_sans_solveur,
+        pour que les deux versions enregistrent une preuve de la meme maniere.
+        """
+        self.plateau.get_case(i, j).proven_not_guard = True
+        self.clauses.append([-self.plateau.cell_to_var(i, j, "garde")])
+
+    def garde_possible_sans_solveur(self, i: int, j: int)-> bool:
+        """
+        Version de garde_possible qui n'appelle jamais le solveur, pour le mode "budget" :
+        on repond avec les modeles et les preuves deja connus, et si cela ne suffit pas on renvoie True
+        (estimation pessimiste) et la case est ajoutee aux sondages a faire (voir executer_sondages)
+        """
+        variable = self.plateau.cell_to_var(i, j, "garde")
+        self.recolter()
+        self.modeles.mettre_a_jour(self.clauses)
+
+        if self.modeles.possible(variable):
+            return True
+        if self.modeles.impossible(variable):
+            self.marquer_pas_garde(i, j)
+            return False
+
+        self._sondages.setdefault((i, j), 1)
+        return True
+
+    def executer_sondages(self):
+        """
+        En mode "budget", appelle garde_possible (et donc le solveur) sur les cases a sonder, par ordre
+        de priorite, jusqu'a ce que self.budget_sat_ms millisecondes soient ecoulees.
+        A appeler avant chaque decision, les cases qui n'ont pas pu etre sondees restent pessimistes
+        et seront sondees avant les decisions suivantes.
+
+        Les cases les plus prioritaires sont celles qui peuvent voir hitman depuis sa case ou une case
+        voisine (elles changent le risque du prochain pas), puis celles ajoutees par risque. A priorite
+        egale, on sonde d'abord les cases les plus proches de hitman.
         """
-        return solve(self.clauses, nb_var=self.nb_variables)
+        if self.sat_mode != "budget":
+            return
+        echeance = perf_counter() + self.budget_sat_ms / 1000
+
+        i_act, j_act = self.pos_actuelle()
+        for i, j in [(i_act, j_act)] + self.plateau.voisins(i_act, j_act):
+            for cases_direction in self.plateau.voisins_gardes(i, j).values():
+                for case in cases_direction:
+                    self._sondages[case] = 0
+
+        ordre = sorted(self._sondages, key=lambda c: (self._sondages[c], self.plateau.distance_manhattan(i_act, j_act, c[0], c[1]), c))
+        nb_sondages = 0
+        for i, j in ordre:
+            if perf_counter() >= echeance:
+                break
+            del self._sondages[(i, j)]
+            case = self.plateau.get_case(i, j)
+            if case.contenu_connu() or case.proven_not_guard:
+                continue
+            self.garde_possible(i, j)
+            nb_sondages += 1
+
+        self.noter_decision("sondages", faits=nb_sondages, restants=len(self._sondages))
+
+    def refuter_localement(self, i: int, j: int)-> bool:
+        """
+        Essaye de prouver que la case (i, j) n'est pas un garde avec un sous-ensemble de la base :
+        les clauses dont toutes les variables sont dans une fenetre autour de la case (voir utils/fenetre.py).
+        Si ces clauses sont insatisfiables avec un garde en (i, j), la base complete l'est aussi.
+
+        On essaye les fenetres de plus en plus grandes (self.prouveur.rayons), en sautant celles qui
+        n'apportent pas de nouvelle clause, et on s'arrete quand la fenetre contient deja toute la
+        composante de la variable (la resolution de la composante fera aussi bien).
+        Les fenetres sont petites, elles sont resolues directement avec le DPLL de utils/dpll.py,
+        sans lancer gophersat. Une fenetre de plus de self.prouveur.taille_max clauses n'est plus
+        locale, et le DPLL n'apprend pas de clauses : au dela de self.prouveur.max_conflits conflits
+        sur une fenetre, il renvoie None. Dans ces deux cas on abandonne et garde_possible resout la composante.
+        Renvoie True si la case est refutee, False si aucune fenetre ne suffit (cela ne prouve rien).
+        """
+        variable = self.plateau.cell_to_var(i, j, "garde")
+        self.prouveur.synchroniser(self.clauses)
+        self.composantes.synchroniser(self.clauses)
+        nb_clauses_composante = len(self.composantes.indices_clauses[self.composantes.racine(variable)])
+
+        nb_clauses_fenetre = -1
+        for rayon in self.prouveur.rayons:
+            clauses = self.prouveur.clauses_fenetre(self.clauses, i, j, rayon)
+            if len(clauses) == nb_clauses_fenetre:
+                continue
+            if len(clauses) >= nb_clauses_composante or len(clauses) > self.prouveur.taille_max:
+                return False
+            nb_clauses_fenetre = len(clauses)
+            satisfiable, _ = dpll(clauses + [[variable]], self.nb_variables, self.prouveur.max_conflits)
+            if satisfiable is None:
+                return False
+            if not satisfiable:
+                return True
+        return False
+
+    def probabilites(self)-> Tuple[List[List[float]], List[List[float]]]:
+        """
+        Renvoie deux tableaux m*n contenant pour chaque case la probabilite estimee qu'elle contienne
+        un garde, et celle qu'elle contienne un invite, sachant la base de clauses
+
+        Les probabilites sont les frequences des variables dans des modeles tires a peu pres uniformement
+        par l'echantillonneur (voir utils/echantillonnage.py), qui garde son estimation en cache tant que
+        la base de clauses ne change pas. Le solveur n'est appele que lorsque l'etat courant de la chaine
+        ne satisfait plus les nouvelles clauses, pour obtenir un nouveau modele de depart.
+        Ce ne sont que des estimations : une probabilite nulle ne prouve pas qu'une case n'est pas un garde.
+        Le nombre total de gardes et d'invites n'est pas dans la base, il n'est donc pas pris en compte.
+        Les tableaux renvoyes ne doivent pas etre modifies, ils sont gardes en cache pour la meme base.
+        """
+        if self._probabilites[0] == len(self.clauses):
+            return self._probabilites[1]
+
+        if not self.echantillonneur.synchroniser(self.clauses):
+            _, modele = self.resoudre()
+            self.echantillonneur.demarrer(modele)
+        frequences = self.echantillonneur.estimer()
+
+        m, n = self.plateau.infos_plateau()
+        probabilites_gardes = [[frequences[self.plateau.cell_to_var(i, j, "garde")] for j in range(n)] for i in range(m)]
+        probabilites_invites = [[frequences[self.plateau.cell_to_var(i, j, "invite")] for j in range(n)] for i in range(m)]
+        self._probabilites = (len(self.clauses), (probabilites_gardes, probabilites_invites))
+        return self._probabilites[1]
 
     def update_knowledge(self):
         """
@@ -672,10 +1123,6 @@ class Game:
             et ainsi savoir s'il est utile de proceder au traitement pour la vue
         """
 
-        # permet de ralentir l'affichage pour mieux voir les etapes si cela va trop vite
-        if self._temporisation:
-            sleep(0.25)
-
         if self.status is None:
             raise ValueError("Le jeu n'a pas ete initialise")
 
@@ -719,75 +1166,22 @@ class Game:
                             self.clauses += at_least_n(1, voisins_direction)
 
                             if len(voisins_gardes_dict[direction]) == 1:
+                                # une seule case peut contenir le garde qui nous voit dans cette direction
                                 case = voisins_gardes_dict[direction][0]
-                                if not self.plateau.get_case(case[0], case[1]).contenu_connu():
-                                    self.plateau.set_case(case[0], case[1], ("garde", direction))
-                                    self.n_garde_inconnu_restants -= 1
-                                    if self.n_garde_inconnu_restants == 0:
-                                        m, n = self.plateau.infos_plateau()
-                                        for i_prove in range(m):
-                                            for j_prove in range(n):
-                                                if not self.plateau.get_case(i_prove, j_prove).contenu_connu():
-                                                    self.plateau.get_case(i_prove, j_prove).proven_not_guard = True
-
-                                for pair in self.attente:
-                                    if (case[0], case[1], ("garde", direction)) in pair:
-                                        self.attente.remove(pair)
+                                self.propager([(case[0], case[1], ("garde", direction))])
 
                             else: # len(voisins_gardes_dict[direction]) == 2:
                                 # si il y a deux cases contenant des cartes ayant pu nous voir dans cette direction,
                                 # une des deux est un garde qui nous regarde. Si on en trouve une, on pourra en deduire l'autre 
                                 case1, case2 = voisins_gardes_dict[direction]
-                                self.attente.append(((case1[0], case1[1], ("garde", direction)), (case2[0], case2[1], ("garde", direction))))
+                                self.ajouter_attente((case1[0], case1[1], ("garde", direction)), (case2[0], case2[1], ("garde", direction)))
 
         self.old_penalty = self.status['penalties'] # mise a jour de la penalite actuelle
 
         # vision
         ## plateau
         if premiere_fois_etat:
-            for case in vision:
-                pos, contenu = case
-                i, j = pos
-                if not self.plateau.get_case(i, j).contenu_connu():
-                    self.plateau.set_case(i, j, self._dict_cases[contenu])
-                    if self._dict_cases[contenu][0] == "invite":
-                        self.n_invite_inconnu_restants -= 1
-                        self.plateau.get_case(i, j).proven_not_guard = True
-
-                    elif self._dict_cases[contenu][0] == "garde":
-                        self.n_garde_inconnu_restants -= 1
-                        if self.n_garde_inconnu_restants == 0:
-                            m, n = self.plateau.infos_plateau()
-                            for i_prove in range(m):
-                                for j_prove in range(n):
-                                    if not self.plateau.get_case(i_prove, j_prove).contenu_connu():
-                                        self.plateau.get_case(i_prove, j_prove).proven_not_guard = True
-
-                    else:
-                        self.plateau.get_case(i, j).proven_not_guard = True
-                    
-                    for pair in self.attente:
-                        for direction in {"haut", "droite", "bas", "gauche"}:
-                            if (i, j, ("garde", direction)) in pair:
-                                if self._dict_cases[contenu] != ("garde", direction):
-                                    other_item = pair[0] if pair[0] != (i, j, ("garde", direction)) else pair[1]
-                                    self.plateau.set_case(other_item[0], other_item[1], other_item[2])
-                                    self.n_garde_inconnu_restants -= 1
-                                    if self.n_garde_inconnu_restants == 0:
-                                        m, n = self.plateau.infos_plateau()
-                                        for i_prove in range(m):
-                                            for j_prove in range(n):
-                                                if not self.plateau.get_case(i_prove, j_prove).contenu_connu():
-                                                    self.plateau.get_case(i_prove, j_prove).proven_not_guard = True
-                                self.attente.remove(pair)
-
-
-                    ## clauses
-                    if self._dict_cases[contenu][0] in {"invite", "garde"}:
-                        self.clauses.append([self.plateau.cell_to_var(i, j, self._dict_cases[contenu][0])])
-                    else:
-                        self.clauses.append([-self.plateau.cell_to_var(i, j, "invite")])
-                        self.clauses.append([-self.plateau.cell_to_var(i, j, "garde")])
+            self.propager([(i, j, self._dict_cases[contenu]) for (i, j), contenu in vision])
 
         # ouie
         ## clauses
@@ -818,42 +1212,177 @@ class Game:
         # hitman
         self.update_hitman()
 
+        self.speculer()
+
+    def speculer(self, nb_max_en_cours: int = 4):
+        """
+        Si les sondages en arriere-plan sont actives, lance des sondages sur les cases qui pourraient voir
+        hitman depuis ses prochaines positions probables (les cases a un ou deux pas de lui), pendant que
+        le jeu effectue et affiche ses actions. Les resultats sont recuperes par recolter au moment ou
+        garde_possible en a besoin.
+
+        On ne sonde que les cases dont la reserve de modeles ne connait pas encore la reponse, et on
+        limite le nombre de sondages en cours (ceux soumis trop tot porteraient sur une base trop ancienne).
+        Comme les resultats ne servent qu'a remplir la reserve de modeles et les preuves, les decisions
+        sont les memes qu'avec les sondages faits au moment de la decision.
+        """
+        if self._speculateur is None or self.sat_mode in ("no_sat", "proba"):
+            return
+
+        i_act, j_act = self.pos_actuelle()
+        positions = {(i_act, j_act)}
+        for i, j in self.plateau.voisins(i_act, j_act):
+            positions.add((i, j))
+            positions.update(self.plateau.voisins(i, j))
+
+        self.modeles.mettre_a_jour(self.clauses)
+        self.composantes.synchroniser(self.clauses)
+        for i, j in sorted(positions, key=lambda c: (self.plateau.distance_manhattan(i_act, j_act, c[0], c[1]), c)):
+            for cases_direction in self.plateau.voisins_gardes(i, j).values():
+                for i_garde, j_garde in cases_direction:
+                    if len(self._speculateur.en_cours) >= nb_max_en_cours:
+                        return
+                    case = self.plateau.get_case(i_garde, j_garde)
+                    if case.contenu_connu() or case.proven_not_guard:
+                        continue
+                    variable = self.plateau.cell_to_var(i_garde, j_garde, "garde")
+                    if variable in self.modeles.vraies or variable in self.modeles.impossibles:
+                        continue
+                    self._speculateur.soumettre(
+                        variable,
+                        len(self.clauses),
+                        self.composantes.clauses(self.clauses, variable).figer(),
+                        list(self.composantes.variables_composante(variable)),
+                        self.nb_variables,
+                    )
+
+    def recolter(self, attendre: int = None):
+        """
+        Recupere les sondages en arriere-plan termines (et attend celui de la variable attendre s'il est en cours) :
+        les modeles trouves vont dans la reserve, qui les verifie sur les clauses ajoutees depuis le sondage,
+        et les variables prouvees fausses restent fausses
+        """
+        if self._speculateur is None:
+            return
+        for variable, revision, variables, satisfiable, modele in self._speculateur.resultats(attendre):
+            if satisfiable:
+                self.modeles.ajouter(modele, revision, variables)
+            else:
+                self.modeles.ajouter_impossibles([variable])
+
+    def propager(self, revelations: List[Tuple[int, int, Tuple[str, str]]]):
+        """
+        Propage des revelations (i, j, contenu) dans notre modelisation du jeu. Une revelation est
+        le contenu d'une case que l'on vient de voir ou de deduire.
+
+        Les revelations sont traitees par une file unique : traiter une revelation peut en deduire
+        d'autres (via les couples en attente), qui sont ajoutees a la file. Pour chaque case inconnue revelee :
+            - on met a jour le plateau et le nombre de gardes/invites inconnus restants
+            - on ajoute les clauses correspondantes
+            - on resout les couples en attente qui contiennent la case (voir ajouter_attente),
+                grace a l'index self.attente on ne regarde que les couples concernes
+            - si tous les gardes sont connus, toutes les cases encore inconnues ne sont pas des gardes,
+                on ne parcourt que l'ensemble des cases inconnues, et non tout le plateau
+
+        Les revelations de cases deja connues sont ignorees.
+        Le cout est donc proportionnel au nombre de cases revelees et de couples concernes.
+        """
+        file = deque(revelations)
+        while file:
+            i, j, contenu = file.popleft()
+            case = self.plateau.get_case(i, j)
+            if case.contenu_connu():
+                continue
+
+            self.plateau.set_case(i, j, contenu)
+
+            if contenu[0] == "invite":
+                self.n_invite_inconnu_restants -= 1
+                case.proven_not_guard = True
+            elif contenu[0] == "garde":
+                self.n_garde_inconnu_restants -= 1
+                if self.n_garde_inconnu_restants == 0:
+                    for i_prove, j_prove in self.plateau.cases_inconnues():
+                        self.plateau.get_case(i_prove, j_prove).proven_not_guard = True
+            else:
+                case.proven_not_guard = True
+
+            ## clauses
+            if contenu[0] in {"invite", "garde"}:
+                self.clauses.append([self.plateau.cell_to_var(i, j, contenu[0])])
+            else:
+                self.clauses.append([-self.plateau.cell_to_var(i, j, "invite")])
+                self.clauses.append([-self.plateau.cell_to_var(i, j, "garde")])
+
+            ## couples en attente
+            for couple in self.attente.pop((i, j), set()):
+                autre = couple[0] if couple[0][:2] != (i, j) else couple[1]
+                hypothese = couple[0][2] if couple[0][:2] == (i, j) else couple[1][2]
+                self.attente[autre[:2]].discard(couple)
+                if not self.attente[autre[:2]]:
+                    del self.attente[autre[:2]]
+                # si la case n'est pas le garde attendu, c'est l'autre case du couple
+                if contenu != hypothese:
+                    file.append(autre)
+
+    def ajouter_attente(self, hypothese1: Tuple[int, int, Tuple[str, str]], hypothese2: Tuple[int, int, Tuple[str, str]]):
+        """
+        Ajoute un couple d'hypotheses (i, j, contenu) dont on sait qu'au moins une est vraie
+        (une des deux cases est un garde qui nous regarde).
+
+        Le couple est indexe par chacune de ses deux cases dans self.attente, ce qui permet a propager
+        de retrouver directement les couples concernes par une case revelee.
+        Si une des deux cases est deja connue, le couple est resolu immediatement.
+        """
+        for hypothese, autre in ((hypothese1, hypothese2), (hypothese2, hypothese1)):
+            contenu_connu = self.plateau.get_case(hypothese[0], hypothese[1]).contenu
+            if contenu_connu[0] != "inconnu":
+                if contenu_connu != hypothese[2]:
+                    self.propager([autre])
+                return
+
+        couple = (hypothese1, hypothese2)
+        self.attente.setdefault(hypothese1[:2], set()).add(couple)
+        self.attente.setdefault(hypothese2[:2], set()).add(couple)
 
     def prochain_objectif(self):
         """
         Renvoie les coordonnees de la prochaine case a explorer en fonction de 
         l'heuristique "penalite minimale", on choisit la case inconnue avec la plus petite penalite
         de deplacement par rapport a nous.
+
+        Les cases candidates sont celles de la frontiere (cases inconnues), et penalite_minimale
+        s'arrete des que la moins chere d'entre elles est traitee au lieu de parcourir tout le plateau.
         """
         if self.plateau is None:
             raise ValueError("Le jeu n'a pas ete initialise")
         
-        # on recupere les coordonnees de la case actuelle et les dimensions du plateau
+        self.executer_sondages()
+
+        # on recupere les coordonnees de la case actuelle et les cases candidates
         i, j = self.pos_actuelle()
-        m, n = self.plateau.infos_plateau()
+        frontiere = self.plateau.cases_inconnues()
 
         i_min, j_min = None, None
         penalite_min = float("inf")
 
-        penalites_min = self.penalite_minimale(i, j)
+        penalites_min = self.penalite_minimale(i, j, cases_arret=frontiere)
 
-        # on recupere les cases candidates
-        for i2 in range(m):
-            for j2 in range(n):
-                if i2 == i and j2 == j:
-                    continue
-                if self.plateau.get_case(i2, j2).contenu_connu():
-                    continue
-                penalite = penalites_min[i2][j2]
-                if penalite < penalite_min:
-                    penalite_min = penalite
+        # on parcourt les cases candidates dans l'ordre du plateau pour departager les egalites de la meme maniere
+        for i2, j2 in sorted(frontiere):
+            if i2 == i and j2 == j:
+                continue
+            penalite = penalites_min[i2][j2]
+            if penalite < penalite_min:
+                penalite_min = penalite
+                i_min, j_min = i2, j2
+            elif penalite == penalite_min and i_min is not None:
+                if self.plateau.distance_minimale(i, j, i2, j2) < self.plateau.distance_minimale(i, j, i_min, j_min):
                     i_min, j_min = i2, j2
-                elif penalite == penalite_min:
-                    if self.plateau.distance_minimale(i, j, i2, j2) < self.plateau.distance_minimale(i, j, i_min, j_min):
-                        i_min, j_min = i2, j2
 
         # on renvoie la premiere case qui n'a pas encore ete exploree
         if i_min is not None and j_min is not None:
+            self.noter_decision("prochain_objectif", case=[i_min, j_min], penalite=penalite_min)
             return i_min, j_min
             
         # si toutes les cases ont ete explorees, on renvoie False
@@ -1083,7 +1612,7 @@ class Game:
         lors de la phase 2. Elle n'est utilisee que lorsque l'on a trouve la liste
         complete des actions a effectuer.
         """
-        position = self.status['position']
+        status_avant = self.status
 
         # Faire une action reellement
         if nom_action == "turn_clockwise":
@@ -1097,38 +1626,43 @@ class Game:
 
         elif nom_action == "kill_target":
             self.status = self.hitman.kill_target()
-            # on indique au plateau que la cible est tuee pour l'affichage
-            self.plateau.remove_case(position[0], position[1])
 
         elif nom_action == "neutralize_guard":
-            i_guard, j_guard = self.status['vision'][0][0]
             self.status = self.hitman.neutralize_guard()
-            # on indique au plateau que le garde est neutralise pour l'affichage
-            self.plateau.remove_case(i_guard, j_guard)
 
         elif nom_action == "neutralize_civil":
-            i_civil, j_civil = self.status['vision'][0][0]
             self.status = self.hitman.neutralize_civil()
-            # on indique au plateau que l'invite est neutralise pour l'affichage
-            self.plateau.remove_case(i_civil, j_civil)
             
         elif nom_action == "take_suit" :
             self.status = self.hitman.take_suit()
-            # on indique au plateau que le costume est pris pour l'affichage
-            self.plateau.remove_case(position[0], position[1])
             
         elif nom_action == "take_weapon" :
             self.status = self.hitman.take_weapon()
-            # on indique au plateau que l'arme est prise pour l'affichage
-            self.plateau.remove_case(position[0], position[1])
 
         elif nom_action == "put_on_suit":
             self.status = self.hitman.put_on_suit()
-            # on indique au plateau que le costume est mis pour l'affichage
-            self.plateau.put_suit()
-            
+
+        self.reporter_action(nom_action, status_avant)
         return None
 
+    def reporter_action(self, nom_action: str, status_avant):
+        """
+        Reporte sur le plateau les effets d'une action de la phase 2 effectuee depuis l'etat status_avant
+        (status du referee juste avant l'action) : cible tuee, garde ou invite neutralise, objet pris,
+        costume mis. Sert aussi bien aux actions une par une (do_fn_for_real) qu'au plan envoye en
+        un seul appel (voir phase_2), pour que le plateau ne depende pas de l'affichage.
+        """
+        position = status_avant['position']
+        if nom_action in ("kill_target", "take_suit", "take_weapon"):
+            # la cible est tuee, le costume ou l'arme est pris
+            self.plateau.remove_case(position[0], position[1])
+        elif nom_action in ("neutralize_guard", "neutralize_civil"):
+            # le garde ou l'invite vu juste devant hitman est neutralise
+            i, j = status_avant['vision'][0][0]
+            self.plateau.remove_case(i, j)
+        elif nom_action == "put_on_suit":
+            self.plateau.put_suit()
+
     def succ(self, etat: namedtuple)-> List[namedtuple]:
         """
         Cette methode prend en parametre un etat, et retourne tous ses etats successeurs.
@@ -1377,7 +1911,7 @@ class Game:
         self.update_hitman()
 
         # Etapes sans forcer la prise du costume
-        etat_s0 = self.transform_dict_to_namedtuple(self.status)
+        etat_s0 = self.transform_dict_to_namedtuple(dict(self.status))
         etat_s1 = self.search_with_parent(etat_s0, "get_weapon") # Chercher la corde
         etat_s2 = self.search_with_parent(etat_s1, "kill_target") # Tuer le cible
         etat_final = self.search_with_parent(etat_s2, "return_home") # Retourner en (0, 0)
@@ -1407,14 +1941,27 @@ class Game:
             if etat_final_bis.penalties < etat_final.penalties:
                 etat_final = etat_final_bis
 
+        self.noter_decision("plan", actions=list(etat_final.historique_actions), penalites=etat_final.penalties)
         self.afficher_plateau()
-        for action in etat_final.historique_actions:
-            self.do_fn_for_real(action)
-            self.update_hitman()
-            self.afficher_plateau()
-            if self._temporisation:
-                sleep(0.25)
-
+        if self._display:
+            for action in etat_final.historique_actions:
+                self.do_fn_for_real(action)
+                self.update_hitman()
+                self.afficher_plateau()
+        else:
+            # sans affichage, le plan est envoye au referee en un seul appel, puis ses effets
+            # sont reportes sur le plateau a partir du status de chaque action
+            actions = list(etat_final.historique_actions)
+            statuts, _, erreur = self.hitman.run_actions(actions, "all")
+            if erreur >= 0:
+                print(f"Action {erreur} du plan refusee par le referee : {actions[erreur]}")
+            for nom_action, statut in zip(actions, statuts):
+                self.reporter_action(nom_action, self.status)
+                self.status = statut
+            if statuts:
+                self.update_hitman()
+
+        self.fermer_affichage()
         _, score, _ = self.hitman.end_phase2()
 
         print("Result phase 2 :")
@@ -1,41 +1,66 @@
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 import subprocess
 import os
 
 def clauses_to_dimacs(clauses, nb_var):
     nb_clause = len(clauses)
-    chaine = f"p cnf {nb_var} {nb_clause}\n"
+    lignes = [f"p cnf {nb_var} {nb_clause}\n"]
     for clause in clauses:
-        chaine += " ".join([str(i) for i in clause]) + " 0\n"
-    return chaine
+        lignes.append(" ".join([str(i) for i in clause]) + " 0\n")
+    return "".join(lignes)
 
 def write_dimacs_file(dimacs: str, filename: str):
     with open(filename, "w", newline="") as cnf:
         cnf.write(dimacs)
 
 def exec_gophersat(
-    filename: str, cmd: str = "./gophersat", encoding: str = "utf8"
+    filename: str, cmd: str = "./gophersat", encoding: str = "utf8", timeout: Optional[float] = None
 ) -> Tuple[bool, List[int]]:
+    """
+    Lance gophersat sur le fichier DIMACS filename et renvoie (satisfiable, modele)
+
+    C'est le seul lanceur de gophersat du depot, les TPs l'importent aussi. La reponse doit etre
+    explicite : "s UNSATISFIABLE" donne (False, []), "s SATISFIABLE" donne (True, modele), le modele
+    etant lu sur toutes les lignes "v" (elles sont coupees sur les grandes instances). Toute autre
+    sortie (reponse indeterminee, ligne manquante) leve RuntimeError, et subprocess.TimeoutExpired
+    est levee si gophersat depasse timeout secondes.
+    """
     result = subprocess.run(
-        [cmd, filename], capture_output=True, check=True, encoding=encoding
+        [cmd, filename], capture_output=True, check=True, encoding=encoding, timeout=timeout
     )
-    string = str(result.stdout)
-    lines = string.splitlines()
+    lines = str(result.stdout).splitlines()
 
-    if lines[1] != "s SATISFIABLE":
+    if "s UNSATISFIABLE" in lines:
         return False, []
+    if "s SATISFIABLE" not in lines:
+        raise RuntimeError(f"sortie de gophersat inattendue : {result.stdout[:200]!r}")
 
-    model = lines[2][2:-2].split(" ")
-
-    return True, [int(x) for x in model]
+    model = []
+    for line in lines:
+        if line.startswith("v "):
+            model.extend(int(x) for x in line[2:].split())
+    if model[-1:] == [0]:
+        model.pop()
+    return True, model
 
 
-def solve(clauses, nb_var):
+def solve_model(clauses, nb_var, filename: str = None, hypotheses=()) -> Tuple[bool, List[int]]:
+    # chemins absolus plutot que os.chdir : le repertoire courant est partage par tous les threads
     file_directory = os.path.dirname(os.path.realpath(__file__))
-    os.chdir(file_directory)
-    dimacs = clauses_to_dimacs(clauses, nb_var)
-    write_dimacs_file(dimacs, "hitman.cnf")
+    if filename is None:
+        filename = os.path.join(file_directory, "hitman.cnf")
+    if hasattr(clauses, "ecrire_dimacs"):
+        # arene de clauses (utils/arena.py) : le texte DIMACS est deja pret, on l'ecrit d'un coup
+        with open(filename, "wb") as cnf:
+            clauses.ecrire_dimacs(cnf, nb_var, hypotheses)
+    else:
+        dimacs = clauses_to_dimacs(list(clauses) + list(hypotheses), nb_var)
+        write_dimacs_file(dimacs, filename)
 
-    satisfiable, _ = exec_gophersat("hitman.cnf")
+    return exec_gophersat(filename, cmd=os.path.join(file_directory, "gophersat"))
+
+
+def solve(clauses, nb_var):
+    satisfiable, _ = solve_model(clauses, nb_var)
 
     return satisfiable
\ No newline at end of file
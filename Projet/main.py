@@ -1,5 +1,6 @@
 from game import Game
 import argparse
+import os
 
 def str_bool(s):
     if s.lower() == 'false':
@@ -9,27 +10,62 @@ def str_bool(s):
 def main():
     g = Game()
     parser = argparse.ArgumentParser(description='Hitman')
-    parser.add_argument('--sat', type=str, default="auto", help='sat mode, can be "auto", "no_sat" or "sat", default is "auto"')
+    parser.add_argument('--sat', type=str, default="auto", help='sat mode, can be "auto", "no_sat", "sat", "proba" or "budget", default is "auto"')
+    parser.add_argument('--sat_ms', '--sat-ms', type=int, default=50, help='Solver time budget in milliseconds before each move with --sat budget, default is 50')
     parser.add_argument('--temp', type=str, default="True", help='Wait a bit between each action, default is True. Is set to false if display is False')
     parser.add_argument('--costume_combinaisons', type=str, default="True", help='Use costume combinations, default is True')
     parser.add_argument('--display', type=str, default="True", help='Display the game, default is True')
+    parser.add_argument('--trace', type=str, default="", help='Record every action, status and engine decision in this file (JSONL, gzip if it ends with .gz)')
+    parser.add_argument('--replay', type=str, default="", help='Replay a recorded trace without running the engine nor the solver')
+    parser.add_argument('--replay_steps', type=int, default=None, help='Stop the replay after this number of actions, default is the whole trace')
+    parser.add_argument('--speculation', type=str, default="False", help='Probe the solver in background threads while actions are played, default is False')
+    parser.add_argument('--referee', type=str, default="", help='Play against a referee server ("unix:/path", "host:port" or "port", see utils/serveur_referee.py) instead of a local referee')
+    parser.add_argument('--profile', type=str, default="False", help='Measure time spent in the engine and write a Chrome trace to profile.json, default is False')
     args = parser.parse_args()
 
+    if str_bool(args.profile):
+        profileur = g.activer_profilage()
+        fichier_trace = os.path.abspath("profile.json")
+
     if args.display.lower() == "false":
         args.temp = "False"
 
-    score_1, penalites_1, points_positifs = g.phase_1(temporisation=str_bool(args.temp), sat_mode=args.sat, display=str_bool(args.display))
-    score_2 = g.phase_2(temporisation=str_bool(args.temp), costume_combinations=str_bool(args.costume_combinaisons), display=str_bool(args.display))
+    g.budget_sat_ms = args.sat_ms
+    if str_bool(args.speculation):
+        g.activer_speculation()
+
+    if args.replay != "":
+        nb_actions = g.rejouer(args.replay, args.replay_steps, temporisation=str_bool(args.temp), display=str_bool(args.display))
+        print(f"{nb_actions} actions rejouees, penalites : {g.status['penalties']}")
+    else:
+        if args.referee != "":
+            # le module du serveur (asyncio, multiprocessing) n'est importe que s'il sert
+            from utils.serveur_referee import RefereeDistant
+            g.hitman = RefereeDistant(args.referee)
+        if args.trace != "":
+            g.activer_trace(os.path.abspath(args.trace))
+
+        score_1, penalites_1, points_positifs = g.phase_1(temporisation=str_bool(args.temp), sat_mode=args.sat, display=str_bool(args.display))
+        score_2 = g.phase_2(temporisation=str_bool(args.temp), costume_combinations=str_bool(args.costume_combinaisons), display=str_bool(args.display))
+        g.fermer_trace()
+        if args.referee != "":
+            g.hitman.fermer()
+
 
+        print("==============================================")
+        print("resultat final:\n")
+        print(f"Points positifs phase 1: {points_positifs}")
+        print(f"Penalites phase 1: {penalites_1}")
+        print(f"Score phase 1: {score_1}\n")
+        print(f"Penalites phase 2: {score_2}\n")
+        print(f"Score total: {score_1 + score_2}")
+        print("==============================================")
 
-    print("==============================================")
-    print("resultat final:\n")
-    print(f"Points positifs phase 1: {points_positifs}")
-    print(f"Penalites phase 1: {penalites_1}")
-    print(f"Score phase 1: {score_1}\n")
-    print(f"Penalites phase 2: {score_2}\n")
-    print(f"Score total: {score_1 + score_2}")
-    print("==============================================")
+    if str_bool(args.profile):
+        print("\nProfilage :\n")
+        print(profileur.resume())
+        profileur.exporter_trace(fichier_trace)
+        print(f"\nTrace ecrite dans {fichier_trace} (ouvrir avec chrome://tracing ou ui.perfetto.dev)")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,161 @@
+import queue
+import sys
+import threading
+from time import sleep
+from typing import Dict, Tuple
+from .plateau import formater_plateau
+
+class Afficheur:
+    """
+    Classe qui affiche le plateau dans un thread separe, pour que l'affichage ne bloque jamais le jeu
+
+    Le moteur envoie apres chaque action les cases modifiees (voir Plateau.extraire_modifications),
+    l'afficheur les applique a sa copie du plateau et ne redessine que ces cases, en deplacant le
+    curseur du terminal avec des sequences ANSI. Si la sortie n'est pas un terminal, le plateau
+    complet est reecrit a chaque image.
+
+    Un afficheur est caracterise par :
+        - m, n : la taille du plateau
+        - textes : dictionnaire (i, j) -> texte affiche, copie du plateau propre au thread d'affichage
+        - file : file bornee des modifications a afficher
+        - temporisation : temps d'attente entre deux images (0 pour ne pas attendre)
+        - images_perdues : nombre d'images qui n'ont pas ete affichees car le moteur allait plus vite que le terminal
+            (incremente par les deux threads, toujours sous _verrou)
+        - _verrou : verrou qui protege images_perdues
+        - _en_attente : modifications qui n'ont pas pu etre mises dans la file, fusionnees avec les suivantes
+        - _redessiner : booleen qui indique si la prochaine image doit etre dessinee en entier
+
+    Les methodes utiles sont :
+        - envoyer : envoie des modifications a afficher, sans jamais bloquer
+        - vider : attend que toutes les modifications envoyees aient ete affichees
+        - fermer : vide la file et arrete le thread d'affichage
+
+    Quand la file est pleine, les modifications ne sont pas perdues : elles sont fusionnees avec les
+    suivantes et affichees en une seule image. On perd donc des images intermediaires, mais l'etat
+    affiche finit toujours par correspondre au plateau.
+    """
+
+    def __init__(self, m: int, n: int, textes: Dict[Tuple[int, int], str], temporisation: float = 0, taille_file: int = 32, flux=sys.stdout):
+        self.m = m
+        self.n = n
+        self.textes = dict(textes)
+        self.file = queue.Queue(maxsize=taille_file)
+        self.temporisation = temporisation
+        self.images_perdues = 0
+        self._verrou = threading.Lock()
+        self._flux = flux
+        self._ansi = hasattr(flux, "isatty") and flux.isatty()
+        self._en_attente = dict()
+        self._redessiner = True
+        self._thread = threading.Thread(target=self._boucle, daemon=True)
+        self._thread.start()
+
+    def envoyer(self, modifications: Dict[Tuple[int, int], str]):
+        """
+        Envoie des modifications a afficher. Ne bloque jamais : si la file est pleine,
+        les modifications sont gardees et fusionnees avec le prochain envoi.
+        """
+        if self._en_attente:
+            self._en_attente.update(modifications)
+            modifications = self._en_attente
+        try:
+            self.file.put_nowait(modifications)
+            self._en_attente = dict()
+        except queue.Full:
+            self._en_attente = modifications
+            self._image_perdue()
+
+    def vider(self):
+        """
+        Attend que toutes les modifications envoyees aient ete affichees.
+        A appeler avant d'ecrire autre chose sur la sortie, la prochaine image sera redessinee en entier.
+        """
+        if self._en_attente:
+            self.file.put(self._en_attente)
+            self._en_attente = dict()
+        self.file.join()
+        self._flux.flush()
+        # le moteur peut maintenant ecrire sur la sortie, les positions relatives du curseur ne seront plus valables
+        self._redessiner = True
+
+    def _image_perdue(self):
+        with self._verrou:
+            self.images_perdues += 1
+
+    def fermer(self):
+        """
+        Affiche les dernieres modifications puis arrete le thread d'affichage
+        """
+        self.vider()
+        self.file.put(None)
+        self._thread.join()
+
+    def _boucle(self):
+        """
+        Boucle du thread d'affichage : recupere les modifications et les affiche
+        """
+        arret = False
+        while not arret:
+            modifications = self.file.get()
+            if modifications is None:
+                self.file.task_done()
+                return
+
+            # on fusionne tout ce qui est deja arrive pour ne dessiner qu'une image
+            nb_recuperees = 1
+            while True:
+                try:
+                    suivantes = self.file.get_nowait()
+                except queue.Empty:
+                    break
+                nb_recuperees += 1
+                if suivantes is None:
+                    arret = True
+                    break
+                modifications = {**modifications, **suivantes}
+                self._image_perdue()
+
+            self.textes.update(modifications)
+            if self._redessiner or not self._ansi:
+                self._flux.write(self._plateau_complet())
+                self._redessiner = False
+            else:
+                self._flux.write(self._plateau_differentiel(modifications))
+            self._flux.flush()
+
+            if self.temporisation > 0:
+                sleep(self.temporisation)
+
+            for _ in range(nb_recuperees):
+                self.file.task_done()
+
+    def _colonne(self, i: int, j: int) -> int:
+        """
+        Colonne du terminal (a partir de 1) ou commence le texte de la case (i, j)
+        """
+        return len(f" {j}  |") + 6 * i + 1
+
+    def _remontee(self, j: int) -> int:
+        """
+        Nombre de lignes a remonter depuis la fin du plateau pour atteindre la ligne j
+        """
+        nb_lignes = 2 * self.n + 3 # bordures, lignes, abscisses et ligne vide finale
+        ligne = 1 + 2 * (self.n - 1 - j)
+        return nb_lignes - ligne
+
+    def _plateau_complet(self) -> str:
+        """
+        Renvoie le plateau complet, au meme format que print(plateau)
+        """
+        return formater_plateau(self.m, self.n, self.textes) + "\n"
+
+    def _plateau_differentiel(self, modifications: Dict[Tuple[int, int], str]) -> str:
+        """
+        Renvoie les sequences ANSI qui redessinent uniquement les cases modifiees.
+        Le curseur est suppose etre sous le plateau, et y est remis a la fin.
+        """
+        morceaux = []
+        for (i, j), texte in modifications.items():
+            remontee = self._remontee(j)
+            morceaux.append(f"\x1b[{remontee}A\x1b[{self._colonne(i, j)}G{texte:^5}\x1b[{remontee}B\r")
+        return "".join(morceaux)
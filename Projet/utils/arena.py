@@ -0,0 +1,213 @@
+from array import array
+from itertools import islice
+from typing import Iterable, Iterator, List
+
+class ArenaClauses:
+    """
+    Classe qui stocke une base de clauses de maniere compacte, a la place d'une liste de listes
+
+    Les litteraux de toutes les clauses sont ranges les uns a la suite des autres dans un tableau
+    d'entiers 32 bits, chaque clause se terminant par un 0 comme en DIMACS, et un second tableau
+    donne l'indice de debut de chaque clause. En parallele, le texte DIMACS des clauses est construit
+    au fur et a mesure dans un tampon d'octets : l'export DIMACS n'a plus qu'a ecrire l'en-tete puis
+    ce tampon d'un seul coup (via une memoryview, sans copie). La position dans le tampon du texte de
+    chaque clause est gardee, ce qui permet aussi d'ecrire une partie des clauses (par exemple une
+    composante, voir utils/composantes.py) par plages d'octets, avec une VueArena.
+
+    Sur la base d'une partie (environ 14 000 clauses, 6 litteraux par clause), une liste Python de
+    listes coute environ 30 octets par litteral (pointeur, en-tete et marge de chaque liste, les
+    petits entiers etant partages), l'arene environ 11 : 7 pour les tableaux (litteral, 0 final,
+    debut et position de chaque clause) et 4 pour le texte DIMACS, garde pour ecrire la base ou une
+    partie de la base sans reconvertir les entiers. Le gain est donc d'environ 3 fois, pas plus.
+
+    L'arene se comporte comme une liste de clauses en ajout seul : append, extend, +=, len,
+    iteration et acces par indice (qui renvoie une nouvelle liste, modifier cette liste ne change
+    pas l'arene). Les boucles qui lisent chaque clause passent plutot par iter_range (ou la fonction
+    iter_clauses, qui accepte aussi une liste), qui ne cree pas de liste par clause.
+
+    Une arene est caracterisee par :
+        - litteraux : tableau array('i') des litteraux, chaque clause terminee par 0
+        - debuts : tableau array('q') de l'indice dans litteraux du debut de chaque clause
+        - texte : tampon bytearray des lignes DIMACS des clauses ("1 -2 3 0\\n")
+        - positions : tableau array('q') de la position dans texte du debut de la ligne de chaque clause
+
+    Les methodes utiles sont :
+        - append, extend : ajoutent une clause, des clauses
+        - ecrire_dimacs : ecrit la base (et eventuellement des clauses supplementaires) au format DIMACS
+        - vue : renvoie une VueArena sur une partie des clauses
+        - iter_range : parcourt des clauses consecutives sans creer de liste
+        - copie : renvoie une copie independante de l'arene
+    """
+
+    def __init__(self, clauses: Iterable[List[int]] = ()):
+        self.litteraux = array("i")
+        self.debuts = array("q")
+        self.texte = bytearray()
+        self.positions = array("q")
+        self.extend(clauses)
+
+    def append(self, clause: List[int]):
+        self.debuts.append(len(self.litteraux))
+        self.litteraux.extend(clause)
+        self.litteraux.append(0)
+        self.positions.append(len(self.texte))
+        self.texte += (" ".join(map(str, clause)) + " 0\n").encode("ascii") if clause else b"0\n"
+
+    def extend(self, clauses: Iterable[List[int]]):
+        for clause in clauses:
+            self.append(clause)
+
+    def __iadd__(self, clauses: Iterable[List[int]]):
+        self.extend(clauses)
+        return self
+
+    def __add__(self, clauses: Iterable[List[int]]) -> "ArenaClauses":
+        resultat = self.copie()
+        resultat.extend(clauses)
+        return resultat
+
+    def __len__(self) -> int:
+        return len(self.debuts)
+
+    def __getitem__(self, k: int) -> List[int]:
+        if k < 0:
+            k += len(self.debuts)
+        if not 0 <= k < len(self.debuts):
+            raise IndexError("indice de clause hors de l'arene")
+        debut = self.debuts[k]
+        fin = self.debuts[k + 1] - 1 if k + 1 < len(self.debuts) else len(self.litteraux) - 1
+        return self.litteraux[debut:fin].tolist()
+
+    def __iter__(self) -> Iterator[List[int]]:
+        litteraux = self.litteraux
+        nb_clauses = len(self.debuts)
+        for k in range(nb_clauses):
+            debut = self.debuts[k]
+            fin = self.debuts[k + 1] - 1 if k + 1 < nb_clauses else len(litteraux) - 1
+            yield litteraux[debut:fin].tolist()
+
+    def iter_range(self, debut: int = 0, fin: int = None) -> Iterator[memoryview]:
+        """
+        Parcourt les clauses d'indices debut a fin - 1 (jusqu'a la fin de l'arene par defaut) : chaque
+        clause est une memoryview en lecture sur ses litteraux, sans copie ni liste. Les vues ne doivent
+        pas etre gardees apres le parcours : l'arene ne peut pas grandir tant qu'une vue existe.
+        """
+        litteraux = self.litteraux
+        debuts = self.debuts
+        nb_clauses = len(debuts)
+        fin = nb_clauses if fin is None else min(fin, nb_clauses)
+        octets = memoryview(litteraux)
+        for k in range(debut, fin):
+            yield octets[debuts[k]:debuts[k + 1] - 1 if k + 1 < nb_clauses else len(litteraux) - 1]
+
+    def copie(self) -> "ArenaClauses":
+        resultat = ArenaClauses()
+        resultat.litteraux = array("i", self.litteraux)
+        resultat.debuts = array("q", self.debuts)
+        resultat.texte = bytearray(self.texte)
+        resultat.positions = array("q", self.positions)
+        return resultat
+
+    def vue(self, indices: Iterable[int]) -> "VueArena":
+        """
+        Renvoie une vue sur les clauses d'indices donnes (croissants), sans copier leur texte :
+        les clauses consecutives dans l'arene sont regroupees en une seule plage d'octets
+        """
+        positions = self.positions
+        nb_clauses = len(positions)
+        tranches = []
+        nb = 0
+        for k in indices:
+            debut = positions[k]
+            fin = positions[k + 1] if k + 1 < nb_clauses else len(self.texte)
+            if tranches and tranches[-1][1] == debut:
+                tranches[-1] = (tranches[-1][0], fin)
+            else:
+                tranches.append((debut, fin))
+            nb += 1
+        return VueArena(self.texte, tranches, nb)
+
+    def ecrire_dimacs(self, fichier, nb_var: int, supplementaires: List[List[int]] = ()):
+        """
+        Ecrit la base au format DIMACS dans fichier (ouvert en mode binaire), suivie des clauses supplementaires
+        (qui ne sont pas ajoutees a la base, par exemple des hypotheses)
+        """
+        fichier.write(f"p cnf {nb_var} {len(self) + len(supplementaires)}\n".encode("ascii"))
+        fichier.write(memoryview(self.texte))
+        _ecrire_clauses(fichier, supplementaires)
+
+
+def iter_clauses(clauses: List[List[int]], debut: int = 0, fin: int = None) -> Iterator[List[int]]:
+    """
+    Parcourt les clauses d'indices debut a fin - 1 d'une base, arene (voir ArenaClauses.iter_range,
+    les clauses sont alors des memoryview a ne pas garder) ou liste de clauses
+    """
+    if hasattr(clauses, "iter_range"):
+        return clauses.iter_range(debut, fin)
+    return islice(clauses, debut, fin)
+
+
+def _ecrire_clauses(fichier, clauses: Iterable[List[int]]):
+    for clause in clauses:
+        fichier.write((" ".join(map(str, clause)) + " 0\n").encode("ascii"))
+
+
+class VueArena:
+    """
+    Classe qui represente une partie des clauses d'une arene (par exemple une composante), sans les copier
+
+    La vue ne garde que les plages d'octets du texte DIMACS de l'arene qui correspondent a ses clauses :
+    ecrire_dimacs ecrit l'en-tete puis chaque plage via une memoryview, sans construire de liste de clauses.
+    Une vue se comporte comme une liste de clauses en lecture seule (len, iteration), et + renvoie une
+    nouvelle vue avec des clauses supplementaires (qui ne sont pas dans l'arene), comme pour une liste.
+
+    Une vue partage le tampon de l'arene, qui ne peut pas grandir pendant qu'une memoryview sur lui existe :
+    elle doit etre ecrite par le thread qui remplit l'arene. figer renvoie une vue qui possede sa propre
+    copie du texte de ses clauses, utilisable depuis un autre thread.
+
+    Une vue est caracterisee par :
+        - texte : tampon des lignes DIMACS (celui de l'arene, ou une copie pour une vue figee)
+        - tranches : liste des plages (debut, fin) d'octets de texte qui contiennent les clauses de la vue
+        - nb_clauses : nombre de clauses de l'arene dans la vue
+        - supplementaires : liste des clauses ajoutees par +
+
+    Les methodes utiles sont :
+        - ecrire_dimacs : ecrit les clauses de la vue (et eventuellement des clauses supplementaires) au format DIMACS
+        - figer : renvoie une vue independante du tampon de l'arene
+    """
+
+    def __init__(self, texte, tranches: List[tuple], nb_clauses: int, supplementaires: List[List[int]] = ()):
+        self.texte = texte
+        self.tranches = tranches
+        self.nb_clauses = nb_clauses
+        self.supplementaires = list(supplementaires)
+
+    def __len__(self) -> int:
+        return self.nb_clauses + len(self.supplementaires)
+
+    def __iter__(self) -> Iterator[List[int]]:
+        for debut, fin in self.tranches:
+            for ligne in bytes(self.texte[debut:fin]).splitlines():
+                yield list(map(int, ligne.split()[:-1]))
+        for clause in self.supplementaires:
+            yield list(clause)
+
+    def __add__(self, clauses: Iterable[List[int]]) -> "VueArena":
+        return VueArena(self.texte, self.tranches, self.nb_clauses, self.supplementaires + list(clauses))
+
+    def figer(self) -> "VueArena":
+        with memoryview(self.texte) as octets:
+            texte = b"".join(octets[debut:fin] for debut, fin in self.tranches)
+        return VueArena(texte, [(0, len(texte))] if texte else [], self.nb_clauses, self.supplementaires)
+
+    def ecrire_dimacs(self, fichier, nb_var: int, supplementaires: List[List[int]] = ()):
+        """
+        Ecrit les clauses de la vue au format DIMACS dans fichier (ouvert en mode binaire), suivies des
+        clauses supplementaires
+        """
+        fichier.write(f"p cnf {nb_var} {len(self) + len(supplementaires)}\n".encode("ascii"))
+        with memoryview(self.texte) as octets:
+            for debut, fin in self.tranches:
+                fichier.write(octets[debut:fin])
+        _ecrire_clauses(fichier, self.supplementaires)
+        _ecrire_clauses(fichier, supplementaires)
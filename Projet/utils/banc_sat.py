@@ -0,0 +1,141 @@
+import argparse
+import os
+import resource
+import signal
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+from typing import Dict, List
+from .lecture_dimacs import lire_dimacs, exemples
+from .dpll import dpll
+from gophersat.dimacs import solve_model
+
+def _gophersat(arene, nb_var):
+    """
+    Meme chemin que le jeu : l'arene est ecrite dans un fichier DIMACS puis gophersat est lance
+    """
+    descripteur, filename = tempfile.mkstemp(prefix="banc_", suffix=".cnf")
+    os.close(descripteur)
+    try:
+        return solve_model(arene, nb_var, filename=filename)
+    finally:
+        os.remove(filename)
+
+def _dpll(arene, nb_var):
+    return dpll(list(arene), nb_var)
+
+# gophersat ne propose pas de mode persistant (il lit un fichier et s'arrete),
+# il n'y a donc que deux solveurs a comparer
+SOLVEURS = {
+    "gophersat": _gophersat,
+    "dpll": _dpll,
+}
+
+class _Expiration(Exception):
+    pass
+
+def _expirer(signum, frame):
+    raise _Expiration()
+
+def modele_valide(clauses, modele: List[int]) -> bool:
+    """
+    Renvoie True si le modele (liste de litteraux vrais) satisfait toutes les clauses
+    """
+    vrais = set(modele)
+    return all(any(litteral in vrais for litteral in clause) for clause in clauses)
+
+def resoudre_fichier(chemin: str, solveur: str, delai: float) -> Dict:
+    """
+    Resout un fichier avec un solveur, dans un processus de travail neuf (la memoire maximale
+    mesuree est donc celle de ce seul fichier). Le delai est impose par une alarme : le
+    processus gophersat eventuel est tue a l'expiration.
+    """
+    nb_var, arene = lire_dimacs(chemin)
+    # le dossier est garde dans le nom (TP2/examples/sudoku.cnf et TP3/sudoku.cnf sont differents)
+    nom = os.path.join(os.path.basename(os.path.dirname(os.path.abspath(chemin))), os.path.basename(chemin))
+    resultat = {"fichier": nom, "solveur": solveur, "variables": nb_var, "clauses": len(arene)}
+
+    signal.signal(signal.SIGALRM, _expirer)
+    signal.setitimer(signal.ITIMER_REAL, delai)
+    debut = perf_counter()
+    try:
+        satisfiable, modele = SOLVEURS[solveur](arene, nb_var)
+        resultat["resultat"] = "SAT" if satisfiable else "UNSAT"
+        resultat["modele_valide"] = modele_valide(arene, modele) if satisfiable else None
+    except _Expiration:
+        resultat["resultat"] = "EXPIRE"
+        resultat["modele_valide"] = None
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+    resultat["temps"] = perf_counter() - debut
+
+    # ru_maxrss est en kilo-octets sous Linux, RUSAGE_CHILDREN donne celle du processus gophersat
+    resultat["rss_ko"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    resultat["rss_solveur_ko"] = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return resultat
+
+def lancer(chemins: List[str], solveurs: List[str], delai: float = 10.0, nb_processus: int = None) -> List[Dict]:
+    """
+    Lance tous les couples (fichier, solveur) en parallele sur nb_processus coeurs (tous par defaut),
+    chaque couple dans un processus neuf, et renvoie les resultats dans l'ordre des fichiers
+    """
+    with ProcessPoolExecutor(max_workers=nb_processus, max_tasks_per_child=1) as executeur:
+        futures = [executeur.submit(resoudre_fichier, chemin, solveur, delai)
+                   for chemin in chemins for solveur in solveurs]
+        return [future.result() for future in futures]
+
+def rapport(resultats: List[Dict], solveurs: List[str]) -> str:
+    """
+    Renvoie un tableau markdown qui compare les solveurs fichier par fichier, en signalant
+    les modeles invalides et les desaccords entre solveurs. La memoire indiquee est celle du
+    processus gophersat s'il y en a un, celle du processus Python sinon.
+    """
+    entete = "| fichier | var | clauses | " + " | ".join(f"{s} | temps (s) | RSS (Mo)" for s in solveurs) + " | remarques |"
+    lignes = [entete, "|" + "---|" * (entete.count("|") - 1)]
+    par_fichier: Dict[str, Dict[str, Dict]] = dict()
+    for resultat in resultats:
+        par_fichier.setdefault(resultat["fichier"], dict())[resultat["solveur"]] = resultat
+
+    totaux = {s: 0.0 for s in solveurs}
+    for fichier, par_solveur in par_fichier.items():
+        premier = next(iter(par_solveur.values()))
+        cellules = [fichier, str(premier["variables"]), str(premier["clauses"])]
+        remarques = []
+        for s in solveurs:
+            r = par_solveur[s]
+            rss = r["rss_solveur_ko"] or r["rss_ko"]
+            cellules += [r["resultat"], f"{r['temps']:.3f}", f"{rss / 1024:.1f}"]
+            totaux[s] += r["temps"]
+            if r["modele_valide"] is False:
+                remarques.append(f"modele {s} invalide")
+        conclus = {r["resultat"] for r in par_solveur.values() if r["resultat"] != "EXPIRE"}
+        if len(conclus) > 1:
+            remarques.append("desaccord")
+        lignes.append("| " + " | ".join(cellules + [", ".join(remarques)]) + " |")
+
+    cellules = ["total", "", ""]
+    for s in solveurs:
+        nb_resolus = sum(1 for par_solveur in par_fichier.values() if par_solveur[s]["resultat"] != "EXPIRE")
+        cellules += [f"{nb_resolus} resolus", f"{totaux[s]:.3f}", ""]
+    lignes.append("| " + " | ".join(cellules + [""]) + " |")
+    return "\n".join(lignes)
+
+if __name__ == "__main__":
+    # depuis Projet/ : python3 -m utils.banc_sat [fichiers.cnf ...]
+    parser = argparse.ArgumentParser(description='SAT benchmark')
+    parser.add_argument('fichiers', nargs='*', help='CNF files, default is TP2/examples and TP3/sudoku.cnf')
+    parser.add_argument('--solveurs', type=str, default=",".join(SOLVEURS), help='Comma separated solvers, default is "gophersat,dpll"')
+    parser.add_argument('--delai', type=float, default=10.0, help='Time limit per file and solver in seconds, default is 10')
+    parser.add_argument('--processus', type=int, default=None, help='Number of worker processes, default is the number of cores')
+    parser.add_argument('--rapport', type=str, default="banc_sat.md", help='Report file, default is banc_sat.md')
+    args = parser.parse_args()
+
+    solveurs = args.solveurs.split(",")
+    for solveur in solveurs:
+        if solveur not in SOLVEURS:
+            parser.error(f"unknown solver {solveur!r}, available: {', '.join(SOLVEURS)}")
+
+    texte = rapport(lancer(args.fichiers or exemples(), solveurs, args.delai, args.processus), solveurs)
+    with open(args.rapport, "w") as fichier:
+        fichier.write(texte + "\n")
+    print(texte)
@@ -0,0 +1,119 @@
+from typing import Dict, List
+from .arena import iter_clauses
+
+class Composantes:
+    """
+    Classe qui decoupe la base de clauses en composantes independantes
+
+    Deux variables sont dans la meme composante si elles apparaissent dans une meme clause
+    (ou sont reliees par une chaine de clauses). Les clauses d'une composante ne partagent
+    aucune variable avec celles des autres composantes, la base est donc satisfiable si et
+    seulement si chaque composante l'est, et un modele d'une composante peut toujours etre
+    complete par des modeles des autres composantes.
+
+    Les composantes sont maintenues avec un union-find sur les variables. La base de clauses ne
+    fait que grandir, le decoupage est donc mis a jour paresseusement : synchroniser ne traite que
+    les clauses ajoutees depuis le dernier appel.
+
+    Les composantes sont caracterisees par :
+        - parent : tableau de l'union-find, parent[v] est le parent de la variable v (v si v est une racine)
+        - variables : dictionnaire racine -> liste des variables de la composante
+        - indices_clauses : dictionnaire racine -> liste des indices (dans la base) des clauses de la composante
+        - nb_clauses : nombre de clauses de la base deja traitees
+        - statuts : dictionnaire racine -> (nombre de clauses de la composante, satisfiable) pour les
+            composantes dont on connait deja la satisfiabilite
+
+    Les methodes utiles sont :
+        - synchroniser : met a jour les composantes avec les clauses ajoutees a la base
+        - racine : renvoie la racine de la composante d'une variable
+        - clauses : renvoie les clauses de la composante d'une variable
+        - clauses_racines : renvoie les clauses de plusieurs composantes (donnees par leurs racines)
+        - variables_composante : renvoie les variables de la composante d'une variable
+        - statut, enregistrer_statut : cache de la satisfiabilite de chaque composante
+    """
+
+    def __init__(self, nb_variables: int):
+        self.parent = list(range(nb_variables + 1))
+        self.variables: Dict[int, List[int]] = {v: [v] for v in range(1, nb_variables + 1)}
+        self.indices_clauses: Dict[int, List[int]] = {v: [] for v in range(1, nb_variables + 1)}
+        self.nb_clauses = 0
+        self.statuts: Dict[int, tuple] = dict()
+
+    def racine(self, variable: int) -> int:
+        """
+        Renvoie la racine de la composante de la variable (avec compression de chemin)
+        """
+        racine = variable
+        while self.parent[racine] != racine:
+            racine = self.parent[racine]
+        while self.parent[variable] != racine:
+            self.parent[variable], variable = racine, self.parent[variable]
+        return racine
+
+    def _unir(self, racine1: int, racine2: int) -> int:
+        """
+        Fusionne deux composantes, la plus petite est rattachee a la plus grande
+        """
+        if racine1 == racine2:
+            return racine1
+        if len(self.variables[racine1]) < len(self.variables[racine2]):
+            racine1, racine2 = racine2, racine1
+        self.parent[racine2] = racine1
+        self.variables[racine1] += self.variables.pop(racine2)
+        self.indices_clauses[racine1] += self.indices_clauses.pop(racine2)
+        self.statuts.pop(racine1, None)
+        self.statuts.pop(racine2, None)
+        return racine1
+
+    def synchroniser(self, clauses: List[List[int]]):
+        """
+        Ajoute aux composantes les clauses de la base qui n'ont pas encore ete traitees
+        """
+        for k, clause in enumerate(iter_clauses(clauses, self.nb_clauses), self.nb_clauses):
+            if len(clause) == 0:
+                continue
+            racine = self.racine(abs(clause[0]))
+            for litteral in clause[1:]:
+                racine = self._unir(racine, self.racine(abs(litteral)))
+            self.indices_clauses[racine].append(k)
+        self.nb_clauses = len(clauses)
+
+    def clauses(self, clauses: List[List[int]], variable: int) -> List[List[int]]:
+        """
+        Renvoie les clauses de la base qui appartiennent a la composante de la variable, dans l'ordre de la base
+        """
+        return self.clauses_racines(clauses, [self.racine(variable)])
+
+    def clauses_racines(self, clauses: List[List[int]], racines: List[int]) -> List[List[int]]:
+        """
+        Renvoie les clauses de la base qui appartiennent aux composantes des racines, dans l'ordre de la base.
+        Si la base est une arene (utils/arena.py), renvoie une VueArena sur ces clauses plutot qu'une liste :
+        elle s'ecrit en DIMACS par plages d'octets du texte de l'arene, sans construire les clauses.
+        """
+        indices = sorted(k for racine in racines for k in self.indices_clauses[racine])
+        if hasattr(clauses, "vue"):
+            return clauses.vue(indices)
+        return [clauses[k] for k in indices]
+
+    def variables_composante(self, variable: int) -> List[int]:
+        """
+        Renvoie les variables de la composante de la variable
+        """
+        return self.variables[self.racine(variable)]
+
+    def statut(self, variable: int):
+        """
+        Renvoie la satisfiabilite deja calculee de la composante de la variable,
+        None si elle n'est pas connue ou si la composante a change depuis
+        """
+        racine = self.racine(variable)
+        if racine in self.statuts and self.statuts[racine][0] == len(self.indices_clauses[racine]):
+            return self.statuts[racine][1]
+        return None
+
+    def enregistrer_statut(self, variable: int, satisfiable: bool):
+        """
+        Enregistre la satisfiabilite de la composante de la variable (pour ses clauses actuelles)
+        """
+        racine = self.racine(variable)
+        self.statuts[racine] = (len(self.indices_clauses[racine]), satisfiable)
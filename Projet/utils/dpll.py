@@ -0,0 +1,122 @@
+from typing import List, Optional, Tuple
+
+def dpll(clauses: List[List[int]], nb_var: int = None, max_conflits: int = None) -> Tuple[Optional[bool], List[int]]:
+    """
+    Petit solveur DPLL (propagation unitaire avec deux litteraux surveilles par clause, retour
+    arriere chronologique), utilise pour les petites instances ou lancer gophersat couterait
+    plus cher que la resolution elle-meme.
+
+    Renvoie (True, modele) si les clauses sont satisfiables, avec un modele au meme format que
+    gophersat (liste des litteraux de 1 a nb_var), (False, []) sinon.
+    Le solveur n'apprend pas de clauses, certaines instances lui demandent un nombre exponentiel de
+    retours arriere : si max_conflits est donne, il abandonne apres ce nombre de conflits et renvoie
+    (None, []) (on ne sait pas), a l'appelant de se rabattre alors sur gophersat.
+    """
+    if nb_var is None:
+        nb_var = max((abs(l) for clause in clauses for l in clause), default=0)
+
+    valeurs = [0] * (nb_var + 1) # 0 : pas de valeur, 1 : vraie, -1 : fausse
+    surveillees = {}
+    unitaires = []
+    base = []
+    occurrences = [0] * (nb_var + 1)
+    for clause in clauses:
+        clause = list(dict.fromkeys(clause))
+        if any(-l in clause for l in clause):
+            continue # tautologie
+        if clause == []:
+            return False, []
+        for l in clause:
+            occurrences[abs(l)] += 1
+        if len(clause) == 1:
+            unitaires.append(clause[0])
+            continue
+        k = len(base)
+        base.append(clause)
+        surveillees.setdefault(clause[0], []).append(k)
+        surveillees.setdefault(clause[1], []).append(k)
+
+    def valeur(l):
+        return valeurs[l] if l > 0 else -valeurs[-l]
+
+    trace = []
+
+    def affecter(l):
+        valeurs[abs(l)] = 1 if l > 0 else -1
+        trace.append(l)
+
+    def propager(debut):
+        """
+        Propage les litteraux de la trace a partir de debut, renvoie False en cas de conflit
+        """
+        k = debut
+        while k < len(trace):
+            faux = -trace[k]
+            k += 1
+            liste = surveillees.get(faux, [])
+            nouvelle_liste = []
+            conflit = False
+            for idx, c in enumerate(liste):
+                if conflit:
+                    nouvelle_liste.append(c)
+                    continue
+                clause = base[c]
+                if clause[0] == faux:
+                    clause[0], clause[1] = clause[1], clause[0]
+                autre = clause[0]
+                if valeur(autre) == 1:
+                    nouvelle_liste.append(c)
+                    continue
+                # on cherche un autre litteral a surveiller
+                for p in range(2, len(clause)):
+                    if valeur(clause[p]) != -1:
+                        clause[1], clause[p] = clause[p], clause[1]
+                        surveillees.setdefault(clause[1], []).append(c)
+                        break
+                else:
+                    nouvelle_liste.append(c)
+                    if valeur(autre) == -1:
+                        conflit = True
+                    else:
+                        affecter(autre)
+            surveillees[faux] = nouvelle_liste
+            if conflit:
+                return False
+        return True
+
+    for l in unitaires:
+        if valeur(l) == -1:
+            return False, []
+        if valeur(l) == 0:
+            affecter(l)
+    if not propager(0):
+        return False, []
+
+    ordre = sorted(range(1, nb_var + 1), key=lambda v: -occurrences[v])
+    decisions = [] # pile de (taille de la trace avant la decision, litteral decide, deuxieme essai)
+    nb_conflits = 0
+    while True:
+        variable = next((v for v in ordre if valeurs[v] == 0 and occurrences[v] > 0), None)
+        if variable is None:
+            modele = [v if valeurs[v] == 1 else -v for v in range(1, nb_var + 1)]
+            return True, modele
+
+        decisions.append((len(trace), -variable, False))
+        affecter(-variable)
+        debut = len(trace) - 1
+        while not propager(debut):
+            nb_conflits += 1
+            if max_conflits is not None and nb_conflits > max_conflits:
+                return None, []
+            # retour arriere jusqu'a la derniere decision dont on n'a essaye qu'une valeur
+            while decisions and decisions[-1][2]:
+                decisions.pop()
+            if not decisions:
+                return False, []
+            taille, litteral, _ = decisions.pop()
+            for l in trace[taille:]:
+                valeurs[abs(l)] = 0
+            del trace[taille:]
+            decisions.append((taille, -litteral, True))
+            affecter(-litteral)
+            debut = len(trace) - 1
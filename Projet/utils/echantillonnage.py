@@ -0,0 +1,188 @@
+import random
+from typing import List, Set, Tuple
+from .arena import iter_clauses
+
+class Echantillonneur:
+    """
+    Classe qui tire des modeles de la base de clauses a peu pres uniformement (chaine de Markov),
+    pour estimer la probabilite que chaque variable soit vraie
+
+    La chaine part d'un modele (donne par le solveur) et propose a chaque pas soit d'inverser une
+    variable, soit d'echanger une variable vraie et une variable fausse (indispensable avec les
+    clauses "exactement n" de l'ouie, qu'aucune inversion seule ne peut respecter). Un pas est
+    accepte s'il donne encore un modele. Les propositions sont symetriques, la chaine converge donc
+    vers la loi uniforme sur les modeles atteignables depuis le modele de depart.
+
+    Pour verifier un pas sans parcourir toute la base, on garde pour chaque clause le nombre de
+    ses litteraux vrais, et pour chaque variable les clauses ou elle apparait : un pas est refuse
+    des qu'une clause qui perd un litteral vrai n'en a plus aucun, sans modifier l'etat, et seuls
+    les pas acceptes mettent a jour les compteurs. La base ne fait que
+    grandir, l'index est mis a jour paresseusement avec les nouvelles clauses. Si l'etat courant de
+    la chaine ne satisfait plus les nouvelles clauses, il faut un nouveau modele de depart.
+
+    Un echantillonneur est caracterise par :
+        - nb_variables : nombre de variables de la base
+        - nb_echantillons : nombre de modeles tires pour chaque estimation
+        - espacement : nombre de pas par variable libre entre deux modeles tires (et avant le premier)
+        - valeurs : etat courant de la chaine, valeurs[v] vaut True si la variable v est vraie (None sans modele)
+        - positives, negatives : pour chaque variable, indices des clauses ou elle apparait positivement/negativement
+            (listes pour les parcours, ensembles dans positives_ens et negatives_ens pour les tests d'appartenance)
+        - nb_vrais : pour chaque clause, nombre de litteraux vrais dans l'etat courant
+        - fixees : variables fixees par une clause unitaire, qui ne sont jamais inversees
+        - nb_clauses : nombre de clauses de la base deja indexees
+        - frequences : frequence de chaque variable dans les derniers modeles tires
+        - revision : nombre de clauses de la base lors de la derniere estimation (cle du cache)
+        - _hasard : generateur aleatoire (graine fixe pour que les parties soient reproductibles)
+
+    Les methodes utiles sont :
+        - synchroniser : indexe les nouvelles clauses, renvoie False si l'etat courant ne les satisfait pas
+        - demarrer : remplace l'etat courant par un modele donne par le solveur
+        - estimer : renvoie la frequence de chaque variable (en cache tant que la base ne change pas)
+    """
+
+    def __init__(self, nb_variables: int, nb_echantillons: int = 64, espacement: int = 2, graine: int = 0):
+        self.nb_variables = nb_variables
+        self.nb_echantillons = nb_echantillons
+        self.espacement = espacement
+        self.valeurs = None
+        self.positives: List[List[int]] = [[] for _ in range(nb_variables + 1)]
+        self.negatives: List[List[int]] = [[] for _ in range(nb_variables + 1)]
+        self.positives_ens: List[Set[int]] = [set() for _ in range(nb_variables + 1)]
+        self.negatives_ens: List[Set[int]] = [set() for _ in range(nb_variables + 1)]
+        self.clauses: List[List[int]] = []
+        self.nb_vrais: List[int] = []
+        self.fixees = set()
+        self.nb_clauses = 0
+        self.frequences: List[float] = None
+        self.revision = None
+        self._hasard = random.Random(graine)
+
+    def _vrai(self, litteral: int) -> bool:
+        return self.valeurs[litteral] if litteral > 0 else not self.valeurs[-litteral]
+
+    def synchroniser(self, clauses: List[List[int]]) -> bool:
+        """
+        Indexe les clauses ajoutees a la base depuis le dernier appel.
+        Renvoie False si l'etat courant de la chaine ne les satisfait pas (il faut alors appeler demarrer)
+        """
+        valable = self.valeurs is not None
+        for k, clause in enumerate(iter_clauses(clauses, self.nb_clauses), self.nb_clauses):
+            clause = list(dict.fromkeys(clause))
+            if any(-litteral in clause for litteral in clause):
+                clause = [] # tautologie, toujours satisfaite, on ne l'indexe pas
+                self.clauses.append(clause)
+                self.nb_vrais.append(1)
+                continue
+            self.clauses.append(clause)
+            for litteral in clause:
+                if litteral > 0:
+                    self.positives[litteral].append(k)
+                    self.positives_ens[litteral].add(k)
+                else:
+                    self.negatives[-litteral].append(k)
+                    self.negatives_ens[-litteral].add(k)
+            if len(clause) == 1:
+                self.fixees.add(abs(clause[0]))
+            nb = sum(1 for litteral in clause if self._vrai(litteral)) if self.valeurs is not None else 0
+            self.nb_vrais.append(nb)
+            if nb == 0:
+                valable = False
+        self.nb_clauses = len(clauses)
+        return valable
+
+    def demarrer(self, modele: List[int]):
+        """
+        Remplace l'etat courant de la chaine par un modele (au format du solveur) de la base
+        """
+        self.valeurs = [False] * (self.nb_variables + 1)
+        for litteral in modele:
+            if 0 < litteral <= self.nb_variables:
+                self.valeurs[litteral] = True
+        self.nb_vrais = [sum(1 for litteral in clause if self._vrai(litteral)) if clause != [] else 1 for clause in self.clauses]
+
+    def _inverser(self, v: int):
+        """
+        Inverse la variable v et met a jour les compteurs de litteraux vrais
+        """
+        if self.valeurs[v]:
+            perdantes, gagnantes = self.positives[v], self.negatives[v]
+        else:
+            perdantes, gagnantes = self.negatives[v], self.positives[v]
+        self.valeurs[v] = not self.valeurs[v]
+        for c in perdantes:
+            self.nb_vrais[c] -= 1
+        for c in gagnantes:
+            self.nb_vrais[c] += 1
+
+    def _perdantes(self, v: int) -> Tuple[List[int], Set[int], Set[int]]:
+        """
+        Renvoie les clauses qui perdent un litteral vrai si on inverse v (liste et ensemble),
+        et l'ensemble de celles qui en gagnent un
+        """
+        if self.valeurs[v]:
+            return self.positives[v], self.positives_ens[v], self.negatives_ens[v]
+        return self.negatives[v], self.negatives_ens[v], self.positives_ens[v]
+
+    def _valide(self, inversees: List[int]) -> bool:
+        """
+        Renvoie True si inverser les variables donne encore un modele (sans modifier l'etat)
+        """
+        nb_vrais = self.nb_vrais
+        if len(inversees) == 1:
+            perdantes, _, _ = self._perdantes(inversees[0])
+            return all(nb_vrais[c] > 1 for c in perdantes)
+
+        perdantes1, perdantes1_ens, gagnantes1 = self._perdantes(inversees[0])
+        perdantes2, perdantes2_ens, gagnantes2 = self._perdantes(inversees[1])
+        for c in perdantes1:
+            if nb_vrais[c] <= 2 and nb_vrais[c] - 1 - (c in perdantes2_ens) + (c in gagnantes2) <= 0:
+                return False
+        for c in perdantes2:
+            if nb_vrais[c] == 1 and c not in perdantes1_ens and c not in gagnantes1:
+                return False
+        return True
+
+    def _pas(self, libres: List[int]):
+        """
+        Fait un pas de la chaine : inversion d'une variable ou echange d'une variable vraie et d'une fausse
+        """
+        if self._hasard.random() < 0.5:
+            inversees = [self._hasard.choice(libres)]
+        else:
+            # deux variables tirees au hasard, l'echange n'a lieu que si l'une est vraie et l'autre fausse
+            v1, v2 = self._hasard.choice(libres), self._hasard.choice(libres)
+            if self.valeurs[v1] == self.valeurs[v2]:
+                return
+            inversees = [v1, v2]
+
+        if self._valide(inversees):
+            for v in inversees:
+                self._inverser(v)
+
+    def estimer(self) -> List[float]:
+        """
+        Tire nb_echantillons modeles et renvoie pour chaque variable la frequence a laquelle elle est vraie.
+        L'estimation est gardee en cache tant que la base n'a pas change (synchroniser et demarrer
+        doivent avoir ete appeles avant).
+        """
+        if self.revision == self.nb_clauses and self.frequences is not None:
+            return self.frequences
+
+        libres = [v for v in range(1, self.nb_variables + 1) if v not in self.fixees]
+        nb_vraies = [0] * (self.nb_variables + 1)
+        if libres != []:
+            nb_pas = self.espacement * len(libres)
+            for _ in range(nb_pas):
+                self._pas(libres)
+            for _ in range(self.nb_echantillons):
+                for _ in range(nb_pas):
+                    self._pas(libres)
+                for v in range(1, self.nb_variables + 1):
+                    if self.valeurs[v]:
+                        nb_vraies[v] += 1
+            self.frequences = [nb / self.nb_echantillons for nb in nb_vraies]
+        else:
+            self.frequences = [1.0 if self.valeurs[v] else 0.0 for v in range(self.nb_variables + 1)]
+
+        self.revision = self.nb_clauses
+        return self.frequences
@@ -0,0 +1,66 @@
+from typing import Dict, List, Tuple
+from .arena import iter_clauses
+
+class ProuveurLocal:
+    """
+    Classe qui extrait les clauses de la base proches d'une case, pour prouver localement qu'elle n'est pas un garde
+
+    Pour prouver qu'une case n'est pas un garde, il suffit de trouver un sous-ensemble de la base de
+    clauses qui devient insatisfiable quand on suppose que la case est un garde : si un sous-ensemble
+    est insatisfiable, toute la base l'est. Les informations utiles (ouie, penalites, vue) sont presque
+    toujours proches de la case, on essaye donc d'abord avec les clauses dont toutes les variables sont
+    dans une petite fenetre carree autour de la case, puis avec des fenetres de plus en plus grandes.
+    Une fenetre satisfiable ne prouve rien, il faut alors se rabattre sur la base complete.
+
+    Un prouveur est caracterise par :
+        - plateau : le plateau, qui permet de passer des cases aux variables
+        - rayons : rayons des fenetres essayees, dans l'ordre (une fenetre de rayon r fait (2r+1) x (2r+1) cases)
+        - taille_max : nombre de clauses au dela duquel une fenetre n'est plus consideree comme locale
+        - max_conflits : nombre de conflits au dela duquel le DPLL abandonne une fenetre (voir utils/dpll.py)
+        - boites : dictionnaire case -> liste de (i_max, j_max, indice) pour les clauses de la base dont la
+            boite englobante (le plus petit rectangle qui contient les cases de leurs variables) a pour
+            coin superieur gauche cette case
+        - nb_clauses : nombre de clauses de la base deja indexees
+
+    Les methodes utiles sont :
+        - synchroniser : indexe les clauses ajoutees a la base depuis le dernier appel
+        - clauses_fenetre : renvoie les clauses dont toutes les variables sont dans la fenetre autour d'une case
+    """
+
+    def __init__(self, plateau, rayons: Tuple[int, ...] = (1, 2, 3), taille_max: int = 2000, max_conflits: int = 200):
+        self.plateau = plateau
+        self.rayons = rayons
+        self.taille_max = taille_max
+        self.max_conflits = max_conflits
+        self.boites: Dict[Tuple[int, int], List[Tuple[int, int, int]]] = dict()
+        self.nb_clauses = 0
+
+    def synchroniser(self, clauses: List[List[int]]):
+        """
+        Indexe les clauses ajoutees a la base depuis le dernier appel (la base ne fait que grandir)
+        """
+        for k, clause in enumerate(iter_clauses(clauses, self.nb_clauses), self.nb_clauses):
+            if len(clause) == 0:
+                continue
+            cases = [self.plateau.var_to_cell(abs(litteral)) for litteral in clause]
+            i_min, i_max = min(c[0] for c in cases), max(c[0] for c in cases)
+            j_min, j_max = min(c[1] for c in cases), max(c[1] for c in cases)
+            self.boites.setdefault((i_min, j_min), []).append((i_max, j_max, k))
+        self.nb_clauses = len(clauses)
+
+    def clauses_fenetre(self, clauses: List[List[int]], i: int, j: int, rayon: int) -> List[List[int]]:
+        """
+        Renvoie les clauses de la base dont toutes les variables concernent des cases
+        a une distance d'au plus rayon de (i, j) (sur chaque axe), dans l'ordre de la base
+
+        Une clause est dans la fenetre si et seulement si sa boite englobante y est, il suffit donc
+        de parcourir les boites dont le coin superieur gauche est dans la fenetre.
+        """
+        indices = []
+        for i2 in range(i - rayon, i + rayon + 1):
+            for j2 in range(j - rayon, j + rayon + 1):
+                for i_max, j_max, k in self.boites.get((i2, j2), ()):
+                    if i_max <= i + rayon and j_max <= j + rayon:
+                        indices.append(k)
+
+        return [clauses[k] for k in sorted(indices)]
@@ -0,0 +1,49 @@
+from typing import Tuple, List, Set, Dict
+
+class Frontiere:
+    """
+    Classe qui represente la frontiere d'exploration du plateau
+
+    La frontiere est caracterisee par :
+        - plateau : le plateau auquel elle est rattachee
+        - cases : ensemble des cases dont le contenu est inconnu
+        - _points_de_vue : dictionnaire case -> liste des cases depuis lesquelles on peut (a priori) la voir
+
+    Les methodes utiles sont :
+        - reveler : retire une case de la frontiere et invalide les points de vue qu'elle peut changer
+        - points_de_vue : renvoie les cases depuis lesquelles on peut (a priori) voir une case
+
+    La frontiere est mise a jour par le plateau a chaque fois que le contenu d'une case change.
+
+    Les points de vue d'une case sont les cases renvoyees par Plateau.cases_voir dans les quatre directions.
+    Ils ne dependent que du contenu des cases a une distance de 3 au plus sur la meme ligne ou la meme
+    colonne, ils ne sont donc recalcules que lorsqu'une de ces cases est revelee.
+    """
+
+    def __init__(self, plateau):
+        self.plateau = plateau
+        m, n = plateau.infos_plateau()
+        self.cases: Set[Tuple[int, int]] = {(i, j) for i in range(m) for j in range(n)}
+        self._points_de_vue: Dict[Tuple[int, int], List[Tuple[int, int]]] = dict()
+
+    def reveler(self, i: int, j: int):
+        """
+        Indique que le contenu de la case (i, j) a change (en general qu'il vient d'etre decouvert)
+        """
+        self.cases.discard((i, j))
+        self._points_de_vue.pop((i, j), None)
+        for k in range(1, 4):
+            for case in ((i-k, j), (i+k, j), (i, j-k), (i, j+k)):
+                self._points_de_vue.pop(case, None)
+
+    def points_de_vue(self, i: int, j: int) -> List[Tuple[int, int]]:
+        """
+        Renvoie les cases depuis lesquelles on peut (a priori) voir la case (i, j),
+        la liste renvoyee ne doit pas etre modifiee par l'appelant
+        """
+        if (i, j) not in self._points_de_vue:
+            points_de_vue = []
+            for direction in ("haut", "droite", "bas", "gauche"):
+                points_de_vue += self.plateau.cases_voir(i, j, direction)
+            self._points_de_vue[(i, j)] = points_de_vue
+        return self._points_de_vue[(i, j)]
@@ -6,9 +6,12 @@ __maintainer__ = "Sylvain Lagrue"
 __email__ = "sylvain.lagrue@utc.fr"
 __status__ = "dev"
 
+from array import array
+from collections import namedtuple
+from collections.abc import Mapping
 from enum import Enum
 from itertools import product
-from typing import List, Tuple, Dict
+from typing import Callable, Iterator, List, Tuple, Dict
 import sys
 
 print(f"Hitman Referee v{__version__}", file=sys.stderr)
@@ -78,6 +81,13 @@ class HC(Enum):
     W = 17
 
 
+# contenu d'une case a partir de sa valeur entiere (le monde est stocke en entiers)
+HC_BY_VALUE = (None,) + tuple(HC)
+CIVIL_VALUES = (HC.CIVIL_N.value, HC.CIVIL_E.value, HC.CIVIL_S.value, HC.CIVIL_W.value)
+GUARD_VALUES = (HC.GUARD_N.value, HC.GUARD_E.value, HC.GUARD_S.value, HC.GUARD_W.value)
+PEOPLE_VALUES = frozenset(CIVIL_VALUES + GUARD_VALUES)
+
+
 # Provisoire...
 world_example = [
     [HC.EMPTY, HC.EMPTY, HC.EMPTY, HC.SUIT, HC.GUARD_S, HC.WALL, HC.WALL],
@@ -134,16 +144,223 @@ complete_map_example = {
 }
 
 
+STATUS_KEYS_PHASE_1 = (
+    "status",
+    "phase",
+    "guard_count",
+    "civil_count",
+    "m",
+    "n",
+    "position",
+    "orientation",
+    "vision",
+    "hear",
+    "penalties",
+    "is_in_guard_range",
+)
+
+STATUS_KEYS_PHASE_2 = STATUS_KEYS_PHASE_1 + (
+    "is_in_civil_range",
+    "has_suit",
+    "is_suit_on",
+    "has_weapon",
+    "is_target_down",
+)
+
+
+# actions qui peuvent etre enchainees par HitmanReferee.run_actions
+BATCH_ACTIONS = (
+    "move",
+    "turn_clockwise",
+    "turn_anti_clockwise",
+    "kill_target",
+    "neutralize_guard",
+    "neutralize_civil",
+    "take_suit",
+    "take_weapon",
+    "put_on_suit",
+)
+
+# actions qui n'existent qu'en phase 2
+PHASE_2_ACTIONS = (
+    "kill_target",
+    "neutralize_guard",
+    "neutralize_civil",
+    "take_suit",
+    "take_weapon",
+    "put_on_suit",
+)
+
+WANT_STATUS = ("last", "all", "penalties")
+
+# etat complet d'un referee (voir HitmanReferee.snapshot) : tous les champs sont immuables ou
+# ne sont jamais modifies en place par le referee, un snapshot partage donc tout avec lui
+RefereeSnapshot = namedtuple(
+    "RefereeSnapshot",
+    [
+        "filename",
+        "m",
+        "n",
+        "world",
+        "people",
+        "civil_count",
+        "guard_count",
+        "civils",
+        "guards",
+        "phase",
+        "phase1_penalties",
+        "phase1_guess_score",
+        "phase2_penalties",
+        "pos",
+        "orientation",
+        "has_guessed",
+        "is_in_guard_range",
+        "is_in_civil_range",
+        "phase1_history",
+        "phase2_history",
+        "has_suit",
+        "suit_on",
+        "has_weapon",
+        "is_target_down",
+    ],
+)
+
+
+class Status(Mapping):
+    """
+    Status renvoye par le referee apres chaque action, qui se lit comme un dictionnaire
+    (status["vision"], dict(status), status.items()...) mais ne peut pas etre modifie.
+
+    La vision et l'ecoute ne sont calculees qu'a la premiere lecture (beaucoup d'appelants,
+    comme le rejeu du plan de la phase 2, ne lisent que les penalites), puis gardees. Le status
+    garde pour cela le monde et la table des personnes du moment de l'action : le referee ne
+    les modifie jamais en place (voir HitmanReferee.__update_world_content), un status lu plus
+    tard donne donc la meme chose que s'il avait ete calcule tout de suite.
+    """
+
+    __slots__ = (
+        "status",
+        "phase",
+        "guard_count",
+        "civil_count",
+        "m",
+        "n",
+        "position",
+        "orientation",
+        "penalties",
+        "is_in_guard_range",
+        "is_in_civil_range",
+        "has_suit",
+        "is_suit_on",
+        "has_weapon",
+        "is_target_down",
+        "_keys",
+        "_vision",
+        "_hear",
+        "_sense",
+        "_world",
+        "_people",
+    )
+
+    def __init__(
+        self,
+        keys: Tuple[str, ...],
+        sense: Callable,
+        world: array,
+        people: array,
+        status: str,
+        phase: int,
+        guard_count: int,
+        civil_count: int,
+        m: int,
+        n: int,
+        position: Tuple[int, int],
+        orientation: HC,
+        penalties: int,
+        is_in_guard_range: bool,
+        is_in_civil_range: bool = None,
+        has_suit: bool = None,
+        is_suit_on: bool = None,
+        has_weapon: bool = None,
+        is_target_down: bool = None,
+    ) -> None:
+        self._keys = keys
+        self._sense = sense
+        self._world = world
+        self._people = people
+        self._vision = None
+        self._hear = None
+        self.status = status
+        self.phase = phase
+        self.guard_count = guard_count
+        self.civil_count = civil_count
+        self.m = m
+        self.n = n
+        self.position = position
+        self.orientation = orientation
+        self.penalties = penalties
+        self.is_in_guard_range = is_in_guard_range
+        self.is_in_civil_range = is_in_civil_range
+        self.has_suit = has_suit
+        self.is_suit_on = is_suit_on
+        self.has_weapon = has_weapon
+        self.is_target_down = is_target_down
+
+    def __compute_senses(self) -> None:
+        self._vision, self._hear = self._sense(
+            self.position, self.orientation, self._world, self._people
+        )
+        self._sense = self._world = self._people = None
+
+    @property
+    def vision(self) -> List[Tuple[Tuple[int, int], HC]]:
+        if self._sense is not None:
+            self.__compute_senses()
+        return self._vision
+
+    @property
+    def hear(self) -> int:
+        if self._sense is not None:
+            self.__compute_senses()
+        return self._hear
+
+    def __getitem__(self, key: str):
+        if key not in self._keys:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key) -> bool:
+        return key in self._keys
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
 class HitmanReferee:
     def __init__(self, filename: str = "") -> None:
         self.__filename = filename
         if filename == "":
-            self.__world = world_example
-            self.__m = len(self.__world)
-            self.__n = len(self.__world[0])
+            world = world_example
         else:
             raise NotImplementedError("TODO")
 
+        # le monde est une grille plate d'entiers (valeurs de HC), la case (x, y) est a
+        # l'indice y * n + x : les lignes sont rangees de bas en haut, sans retournement
+        self.__m = len(world)
+        self.__n = len(world[0])
+        self.__world = array(
+            "B", (c.value for row in reversed(world) for c in row)
+        )
+        # table des sommes cumulees des personnes (gardes et invites) : la case (x, y) de la
+        # table, a l'indice y * (n + 1) + x, compte les personnes de [0, x[ x [0, y[
+        self.__people = self.__compute_people_table()
+
         self.__civil_count = self.__compute_civil_count()
         self.__guard_count = self.__compute_guard_count()
         self.__civils = self.__compute_civils()
@@ -157,32 +374,36 @@ class HitmanReferee:
         self.__has_guessed = False
         self.__is_in_guard_range = False
         self.__is_in_civil_range = False
-        self.__phase1_history: List[str] = []
-        self.__phase2_history: List[str] = []
+        # historiques en listes chainees (action precedente, action) : une action ajoutee
+        # ne modifie pas l'historique d'un snapshot, voir __add_history
+        self.__phase1_history = None
+        self.__phase2_history = None
         self.__has_suit = False
         self.__suit_on = False
         self.__has_weapon = False
         self.__is_target_down = False
 
-    def start_phase1(self) -> Dict:
+    def start_phase1(self) -> Status:
         self.__phase = 1
         return self.__get_status_phase_1()
 
-    def __get_status_phase_1(self, err: str = "OK") -> Dict:
-        return {
-            "status": err,
-            "phase": self.__phase,
-            "guard_count": self.__guard_count,
-            "civil_count": self.__civil_count,
-            "m": self.__m,
-            "n": self.__n,
-            "position": self.__pos,
-            "orientation": self.__orientation,
-            "vision": self.__get_vision(),
-            "hear": self.__get_listening(),
-            "penalties": self.__phase1_penalties,
-            "is_in_guard_range": self.__is_in_guard_range,
-        }
+    def __get_status_phase_1(self, err: str = "OK") -> Status:
+        return Status(
+            STATUS_KEYS_PHASE_1,
+            self.__sense,
+            self.__world,
+            self.__people,
+            err,
+            self.__phase,
+            self.__guard_count,
+            self.__civil_count,
+            self.__m,
+            self.__n,
+            self.__pos,
+            self.__orientation,
+            self.__phase1_penalties,
+            self.__is_in_guard_range,
+        )
 
     def send_content(self, map_info: Dict[Tuple[int, int], HC]) -> bool:
         if not self.__has_guessed:
@@ -216,73 +437,123 @@ class HitmanReferee:
         return (
             True,
             f"Your score is {self.__phase1_guess_score-self.__phase1_penalties}",
-            self.__phase1_history,
+            self.__unroll_history(self.__phase1_history),
             map_content,
         )
 
     def __get_world_content(self, x: int, y: int) -> HC:
-        # provisoire
-        return self.__world[self.__m - y - 1][x]
+        return HC_BY_VALUE[self.__world[y * self.__n + x]]
 
     def __update_world_content(self, x: int, y: int, new_content: HC) -> None:
-        self.__world[self.__m - y - 1][x] = new_content
+        # le monde et la table sont copies et non modifies en place : les status deja
+        # renvoyes et les snapshots gardent ceux du moment de leur action (voir Status).
+        # La copie est par grille et non par case : chaque changement coute O(m * n) (copie du
+        # monde, jusqu'a m * n entrees de la table, et visions des gardes et des invites
+        # recalculees sur toute la grille comme dans le referee d'origine), ce qui reste
+        # negligeable sur les grilles du jeu (quelques dizaines de cases)
+        index = y * self.__n + x
+        delta = (new_content.value in PEOPLE_VALUES) - (
+            self.__world[index] in PEOPLE_VALUES
+        )
+        self.__world = array("B", self.__world)
+        self.__world[index] = new_content.value
+        if delta:
+            # la case compte dans toutes les sommes des rectangles qui la contiennent
+            self.__people = array("i", self.__people)
+            width = self.__n + 1
+            for j in range(y + 1, self.__m + 1):
+                for i in range(j * width + x + 1, (j + 1) * width):
+                    self.__people[i] += delta
         # comme un objet bloquant la vue peut être retiré, il faut update les visions
         self.__civils = self.__compute_civils()
         self.__guards = self.__compute_guards()
 
-    def __get_listening(self, dist: int = 2) -> int:
-        count = 0
-        possible_offset = range(-dist, dist + 1)
-        offsets = product(possible_offset, repeat=2)
-        x, y = self.__pos
-        for i, j in offsets:
-            pos_x, pos_y = x + i, y + j
-            if pos_x >= self.__n or pos_y >= self.__m or pos_x < 0 or pos_y < 0:
-                continue
-            if self.__get_world_content(pos_x, pos_y) in [
-                HC.CIVIL_N,
-                HC.CIVIL_E,
-                HC.CIVIL_S,
-                HC.CIVIL_W,
-                HC.GUARD_N,
-                HC.GUARD_E,
-                HC.GUARD_S,
-                HC.GUARD_W,
-            ]:
-                count += 1
-            if count == 5:
-                break
-
-        return count
+    def __compute_people_table(self) -> array:
+        width = self.__n + 1
+        table = array("i", bytes(4 * width * (self.__m + 1)))
+        for y in range(self.__m):
+            row_sum = 0
+            for x in range(self.__n):
+                row_sum += self.__world[y * self.__n + x] in PEOPLE_VALUES
+                table[(y + 1) * width + x + 1] = table[y * width + x + 1] + row_sum
+        return table
+
+    def __get_listening(
+        self, pos: Tuple[int, int], people: array, dist: int = 2
+    ) -> int:
+        # somme sur le rectangle [x0, x1[ x [y0, y1[ (tronque aux bords) en 4 lectures
+        x, y = pos
+        x0, x1 = max(x - dist, 0), min(x + dist + 1, self.__n)
+        y0, y1 = max(y - dist, 0), min(y + dist + 1, self.__m)
+        width = self.__n + 1
+        count = (
+            people[y1 * width + x1]
+            - people[y0 * width + x1]
+            - people[y1 * width + x0]
+            + people[y0 * width + x0]
+        )
+        return min(count, 5)
 
-    def __get_offset(self) -> Tuple[int, int]:
-        if self.__orientation == HC.N:
+    def __get_offset(self, orientation: HC = None) -> Tuple[int, int]:
+        if orientation is None:
+            orientation = self.__orientation
+        if orientation == HC.N:
             offset = 0, 1
-        elif self.__orientation == HC.E:
+        elif orientation == HC.E:
             offset = 1, 0
-        elif self.__orientation == HC.S:
+        elif orientation == HC.S:
             offset = 0, -1
-        elif self.__orientation == HC.W:
+        elif orientation == HC.W:
             offset = -1, 0
 
         return offset
 
-    def __get_vision(self, dist: int = 3) -> List[Tuple[Tuple[int, int], HC]]:
-        offset_x, offset_y = self.__get_offset()
-        pos = self.__pos
-        x, y = pos
+    def __get_ray(
+        self, world: array, x: int, y: int, offset: Tuple[int, int], dist: int
+    ) -> List[Tuple[Tuple[int, int], HC]]:
+        """
+        Cases vues depuis (x, y) dans la direction offset, jusqu'a dist cases ou jusqu'a la
+        premiere case non vide (incluse) : une ligne ou une colonne de la grille plate est une
+        tranche de pas 1 ou n, lue d'un coup puis parcourue jusqu'au premier obstacle
+        """
+        offset_x, offset_y = offset
+        if offset_x > 0:
+            steps = min(dist, self.__n - 1 - x)
+        elif offset_x < 0:
+            steps = min(dist, x)
+        elif offset_y > 0:
+            steps = min(dist, self.__m - 1 - y)
+        else:
+            steps = min(dist, y)
+        if steps <= 0:
+            return []
+        step = offset_x + offset_y * self.__n
+        start = y * self.__n + x + step
+        stop = start + steps * step
+        cells = world[start : (stop if stop >= 0 else None) : step]
+
         vision = []
-        for _ in range(0, dist):
-            pos = x + offset_x, y + offset_y
-            x, y = pos
-            if x >= self.__n or y >= self.__m or x < 0 or y < 0:
-                break
-            vision.append((pos, self.__get_world_content(x, y)))
-            if vision[-1][1] != HC.EMPTY:
+        for k, value in enumerate(cells, 1):
+            vision.append(((x + k * offset_x, y + k * offset_y), HC_BY_VALUE[value]))
+            if value != HC.EMPTY.value:
                 break
         return vision
 
-    def move(self) -> Dict:
+    def __get_vision(
+        self, pos: Tuple[int, int], orientation: HC, world: array, dist: int = 3
+    ) -> List[Tuple[Tuple[int, int], HC]]:
+        x, y = pos
+        return self.__get_ray(world, x, y, self.__get_offset(orientation), dist)
+
+    def __sense(
+        self, pos: Tuple[int, int], orientation: HC, world: array, people: array
+    ) -> Tuple[List[Tuple[Tuple[int, int], HC]], int]:
+        return (
+            self.__get_vision(pos, orientation, world),
+            self.__get_listening(pos, people),
+        )
+
+    def move(self) -> Status:
         offset_x, offset_y = self.__get_offset()
         x, y = self.__pos
 
@@ -331,7 +602,7 @@ class HitmanReferee:
             )
             return self.__get_status_phase_2()
 
-    def turn_clockwise(self) -> Dict:
+    def turn_clockwise(self) -> Status:
         if self.__phase == 1:
             self.__phase1_penalties += 1
             self.__phase1_penalties += 5 * self.__seen_by_guard_num()
@@ -360,7 +631,7 @@ class HitmanReferee:
             else self.__get_status_phase_2()
         )
 
-    def turn_anti_clockwise(self) -> Dict:
+    def turn_anti_clockwise(self) -> Status:
         if self.__phase == 1:
             self.__phase1_penalties += 1
             self.__phase1_penalties += 5 * self.__seen_by_guard_num()
@@ -388,7 +659,7 @@ class HitmanReferee:
             else self.__get_status_phase_2()
         )
 
-    def start_phase2(self) -> Dict:
+    def start_phase2(self) -> Status:
         self.__phase = 2
         self.__pos = (0, 0)
         self.__orientation = HC.N
@@ -396,34 +667,40 @@ class HitmanReferee:
         self.__seen_by_civil_num()
         return self.__get_status_phase_2()
 
-    def __get_status_phase_2(self, err: str = "OK") -> Dict:
-        return {
-            "status": err,
-            "phase": self.__phase,
-            "guard_count": self.__guard_count,
-            "civil_count": self.__civil_count,
-            "m": self.__m,
-            "n": self.__n,
-            "position": self.__pos,
-            "orientation": self.__orientation,
-            "vision": self.__get_vision(),
-            "hear": self.__get_listening(),
-            "penalties": self.__phase2_penalties,
-            "is_in_guard_range": self.__is_in_guard_range,
-            "is_in_civil_range": self.__is_in_civil_range,
-            "has_suit": self.__has_suit,
-            "is_suit_on": self.__suit_on,
-            "has_weapon": self.__has_weapon,
-            "is_target_down": self.__is_target_down,
-        }
+    def __get_status_phase_2(self, err: str = "OK") -> Status:
+        return Status(
+            STATUS_KEYS_PHASE_2,
+            self.__sense,
+            self.__world,
+            self.__people,
+            err,
+            self.__phase,
+            self.__guard_count,
+            self.__civil_count,
+            self.__m,
+            self.__n,
+            self.__pos,
+            self.__orientation,
+            self.__phase2_penalties,
+            self.__is_in_guard_range,
+            self.__is_in_civil_range,
+            self.__has_suit,
+            self.__suit_on,
+            self.__has_weapon,
+            self.__is_target_down,
+        )
 
     def end_phase2(self) -> Tuple[bool, str, List]:
         if not self.__is_target_down or not self.__pos == (0, 0):
             return False, "Err: finish the mission and go back to (0,0)", []
         self.__phase = 0
-        return True, f"Your score is {- self.__phase2_penalties}", self.__phase2_history
+        return (
+            True,
+            f"Your score is {- self.__phase2_penalties}",
+            self.__unroll_history(self.__phase2_history),
+        )
 
-    def kill_target(self) -> Dict:
+    def kill_target(self) -> Status:
         if self.__phase != 2:
             raise ValueError("Err: invalid phase")
 
@@ -444,7 +721,7 @@ class HitmanReferee:
         )
         return self.__get_status_phase_2()
 
-    def neutralize_guard(self) -> Dict:
+    def neutralize_guard(self) -> Status:
         if self.__phase != 2:
             raise ValueError("Err: invalid phase")
 
@@ -455,6 +732,8 @@ class HitmanReferee:
         offset_x, offset_y = self.__get_offset()
         x, y = self.__pos
 
+        if not (0 <= x + offset_x < self.__n and 0 <= y + offset_y < self.__m):
+            return self.__get_status_phase_2("Err: invalid move")
         if self.__get_world_content(x + offset_x, y + offset_y) not in [
             HC.GUARD_N,
             HC.GUARD_E,
@@ -474,7 +753,7 @@ class HitmanReferee:
 
         return self.__get_status_phase_2()
 
-    def neutralize_civil(self) -> Dict:
+    def neutralize_civil(self) -> Status:
         if self.__phase != 2:
             raise ValueError("Err: invalid phase")
 
@@ -484,6 +763,8 @@ class HitmanReferee:
 
         offset_x, offset_y = self.__get_offset()
         x, y = self.__pos
+        if not (0 <= x + offset_x < self.__n and 0 <= y + offset_y < self.__m):
+            return self.__get_status_phase_2("Err: invalid move")
         if self.__get_world_content(x + offset_x, y + offset_y) not in [
             HC.CIVIL_N,
             HC.CIVIL_E,
@@ -503,7 +784,7 @@ class HitmanReferee:
 
         return self.__get_status_phase_2()
 
-    def take_suit(self) -> Dict:
+    def take_suit(self) -> Status:
         if self.__phase != 2:
             raise ValueError("Err: invalid phase")
 
@@ -520,7 +801,7 @@ class HitmanReferee:
 
         return self.__get_status_phase_2()
 
-    def take_weapon(self) -> Dict:
+    def take_weapon(self) -> Status:
         if self.__phase != 2:
             raise ValueError("Err: invalid phase")
 
@@ -536,7 +817,7 @@ class HitmanReferee:
 
         return self.__get_status_phase_2()
 
-    def put_on_suit(self) -> Dict:
+    def put_on_suit(self) -> Status:
         if self.__phase != 2:
             raise ValueError("Err: invalid phase")
 
@@ -553,6 +834,55 @@ class HitmanReferee:
         )
         return self.__get_status_phase_2()
 
+    def run_actions(
+        self, actions: List[str], want_status: str = "last"
+    ) -> Tuple[object, array, int]:
+        """
+        Effectue une suite d'actions (noms des methodes, voir BATCH_ACTIONS) en un seul appel, avec
+        exactement les memes effets et penalites que les appels un par un. Les noms et la phase
+        (une action de PHASE_2_ACTIONS en dehors de la phase 2, ou une action hors des phases 1
+        et 2) sont verifies avant la premiere action : une suite refusee n'est pas commencee. Une action refusee ("Err: invalid move") ne stoppe
+        pas la suite, comme avec les appels un par un.
+
+        Renvoie (status, penalites, premiere_erreur) :
+            - status : le status de la derniere action si want_status vaut "last" (None si la
+                suite est vide), la liste des status de chaque action pour "all", None pour
+                "penalties"
+            - penalites : array des penalites de la phase apres chaque action
+            - premiere_erreur : indice de la premiere action refusee, -1 si aucune
+        """
+        if want_status not in WANT_STATUS:
+            raise ValueError(f"Err: invalid want_status {want_status!r}")
+        unknown = set(actions).difference(BATCH_ACTIONS)
+        if unknown:
+            raise ValueError(f"Err: unknown actions {sorted(unknown)}")
+        if actions and self.__phase not in (1, 2):
+            raise ValueError("Err: invalid phase")
+        if self.__phase != 2:
+            wrong_phase = set(actions).intersection(PHASE_2_ACTIONS)
+            if wrong_phase:
+                raise ValueError(f"Err: invalid phase for actions {sorted(wrong_phase)}")
+
+        methods = {name: getattr(self, name) for name in BATCH_ACTIONS}
+        keep_all = want_status == "all"
+        statuses = []
+        penalties = array("i")
+        first_error = -1
+        status = None
+        for index, action in enumerate(actions):
+            status = methods[action]()
+            penalties.append(status.penalties)
+            if first_error < 0 and status.status != "OK":
+                first_error = index
+            if keep_all:
+                statuses.append(status)
+
+        if keep_all:
+            return statuses, penalties, first_error
+        if want_status == "last":
+            return status, penalties, first_error
+        return None, penalties, first_error
+
     def __repr__(self) -> str:
         return f"HitmanReferee({self.__filename})"
 
@@ -560,47 +890,21 @@ class HitmanReferee:
         return ASCII_ART
 
     def __compute_civil_count(self) -> int:
-        count = 0
-        for l in self.__world:
-            for c in l:
-                if (
-                    c == HC.CIVIL_N
-                    or c == HC.CIVIL_E
-                    or c == HC.CIVIL_S
-                    or c == HC.CIVIL_W
-                ):
-                    count += 1
-        return count
+        return sum(map(self.__world.count, CIVIL_VALUES))
 
     def __compute_guard_count(self) -> int:
-        count = 0
-        for l in self.__world:
-            for c in l:
-                if (
-                    c == HC.GUARD_N
-                    or c == HC.GUARD_E
-                    or c == HC.GUARD_S
-                    or c == HC.GUARD_W
-                ):
-                    count += 1
-        return count
+        return sum(map(self.__world.count, GUARD_VALUES))
 
     def __compute_civils(
         self,
     ) -> Dict[Tuple[int, int], List[Tuple[Tuple[int, int], HC]]]:
         locations = {}
-        for l_index, l in enumerate(self.__world):
-            for c_index, c in enumerate(l):
-                if (
-                    c == HC.CIVIL_N
-                    or c == HC.CIVIL_E
-                    or c == HC.CIVIL_S
-                    or c == HC.CIVIL_W
-                ):
-                    civil_x, civil_y = (c_index, self.__m - l_index - 1)
-                    locations[(civil_x, civil_y)] = self.__get_civil_vision(
-                        civil_x, civil_y
-                    )
+        for index, value in enumerate(self.__world):
+            if value in CIVIL_VALUES:
+                civil_y, civil_x = divmod(index, self.__n)
+                locations[(civil_x, civil_y)] = self.__get_civil_vision(
+                    civil_x, civil_y
+                )
         return locations
 
     def __get_civil_offset(self, civil: HC) -> Tuple[int, int]:
@@ -663,18 +967,12 @@ class HitmanReferee:
         self,
     ) -> Dict[Tuple[int, int], List[Tuple[Tuple[int, int], HC]]]:
         locations = {}
-        for l_index, l in enumerate(self.__world):
-            for c_index, c in enumerate(l):
-                if (
-                    c == HC.GUARD_N
-                    or c == HC.GUARD_E
-                    or c == HC.GUARD_S
-                    or c == HC.GUARD_W
-                ):
-                    guard_x, guard_y = (c_index, self.__m - l_index - 1)
-                    locations[(guard_x, guard_y)] = self.__get_guard_vision(
-                        guard_x, guard_y
-                    )
+        for index, value in enumerate(self.__world):
+            if value in GUARD_VALUES:
+                guard_y, guard_x = divmod(index, self.__n)
+                locations[(guard_x, guard_y)] = self.__get_guard_vision(
+                    guard_x, guard_y
+                )
         return locations
 
     def __get_guard_offset(self, guard: HC) -> Tuple[int, int]:
@@ -693,19 +991,9 @@ class HitmanReferee:
         self, guard_x: int, guard_y: int, dist: int = 2
     ) -> List[Tuple[Tuple[int, int], HC]]:
         guard = self.__get_world_content(guard_x, guard_y)
-        offset_x, offset_y = self.__get_guard_offset(guard)
-        pos = (guard_x, guard_y)
-        x, y = pos
-        vision = []
-        for _ in range(0, dist):
-            pos = x + offset_x, y + offset_y
-            x, y = pos
-            if x >= self.__n or y >= self.__m or x < 0 or y < 0:
-                break
-            vision.append((pos, self.__get_world_content(x, y)))
-            if vision[-1][1] != HC.EMPTY:
-                break
-        return vision
+        return self.__get_ray(
+            self.__world, guard_x, guard_y, self.__get_guard_offset(guard), dist
+        )
 
     def __seen_by_guard_num(self) -> int:
         count = 0
@@ -732,8 +1020,96 @@ class HitmanReferee:
 
     def __add_history(self, action: str) -> None:
         if self.__phase == 1:
-            self.__phase1_history.append(action)
+            self.__phase1_history = (self.__phase1_history, action)
         elif self.__phase == 2:
-            self.__phase2_history.append(action)
+            self.__phase2_history = (self.__phase2_history, action)
         else:
             raise ValueError("Err: invalid phase")
+
+    @staticmethod
+    def __unroll_history(history: Tuple) -> List[str]:
+        actions = []
+        while history is not None:
+            history, action = history
+            actions.append(action)
+        actions.reverse()
+        return actions
+
+    def snapshot(self) -> RefereeSnapshot:
+        """
+        Renvoie l'etat complet du referee, en O(1) : le monde, la table des personnes et les
+        visions des gardes et des invites sont remplaces (copie sur ecriture) et jamais modifies
+        en place, et les historiques sont des listes chainees, le snapshot les partage donc avec
+        le referee sans que les actions suivantes ne le modifient. La copie se fait au premier
+        changement de case apres le snapshot, et porte sur toute la grille (O(m * n), voir
+        __update_world_content), pas seulement sur la case changee.
+        """
+        return RefereeSnapshot(
+            self.__filename,
+            self.__m,
+            self.__n,
+            self.__world,
+            self.__people,
+            self.__civil_count,
+            self.__guard_count,
+            self.__civils,
+            self.__guards,
+            self.__phase,
+            self.__phase1_penalties,
+            self.__phase1_guess_score,
+            self.__phase2_penalties,
+            self.__pos,
+            self.__orientation,
+            self.__has_guessed,
+            self.__is_in_guard_range,
+            self.__is_in_civil_range,
+            self.__phase1_history,
+            self.__phase2_history,
+            self.__has_suit,
+            self.__suit_on,
+            self.__has_weapon,
+            self.__is_target_down,
+        )
+
+    def restore(self, snapshot: RefereeSnapshot) -> None:
+        """
+        Remet le referee dans l'etat d'un snapshot (pris sur ce referee ou sur un autre), en O(1).
+        Un meme snapshot peut etre restaure autant de fois que voulu.
+        """
+        (
+            self.__filename,
+            self.__m,
+            self.__n,
+            self.__world,
+            self.__people,
+            self.__civil_count,
+            self.__guard_count,
+            self.__civils,
+            self.__guards,
+            self.__phase,
+            self.__phase1_penalties,
+            self.__phase1_guess_score,
+            self.__phase2_penalties,
+            self.__pos,
+            self.__orientation,
+            self.__has_guessed,
+            self.__is_in_guard_range,
+            self.__is_in_civil_range,
+            self.__phase1_history,
+            self.__phase2_history,
+            self.__has_suit,
+            self.__suit_on,
+            self.__has_weapon,
+            self.__is_target_down,
+        ) = snapshot
+
+    def fork(self) -> "HitmanReferee":
+        """
+        Renvoie un nouveau referee dans le meme etat, independant de celui-ci, sans reconstruire
+        le monde : les deux referees partagent tout jusqu'a ce que l'un d'eux modifie une case.
+        fork est en O(1), chaque case modifiee ensuite coute O(m * n) au referee qui la modifie
+        (copie de la grille, voir __update_world_content).
+        """
+        referee = HitmanReferee.__new__(HitmanReferee)
+        referee.restore(self.snapshot())
+        return referee
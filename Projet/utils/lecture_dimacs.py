@@ -0,0 +1,249 @@
+import json
+import mmap
+import os
+import re
+import sys
+from array import array
+from itertools import accumulate, repeat
+from operator import add
+from time import perf_counter
+from typing import Iterator, List, Tuple
+from .arena import ArenaClauses
+
+# lignes de commentaire ("c ...") au milieu des clauses, et fin de fichier "%" de certains fichiers SATLIB
+_COMMENTAIRES = re.compile(rb"(?m)^[ \t]*c.*$")
+_FIN = re.compile(rb"(?m)^[ \t]*%")
+# un 0 seul termine une clause : il est suivi d'une fin de ligne dans le texte de l'arene
+_TERMINAISONS = re.compile(rb" 0(?= )")
+
+def _ouvrir(fichier) -> mmap.mmap:
+    """
+    Projette le fichier en memoire (lecture seule), les pages ne sont chargees qu'a la lecture
+    """
+    if os.fstat(fichier.fileno()).st_size == 0:
+        raise ValueError("fichier DIMACS vide")
+    return mmap.mmap(fichier.fileno(), 0, access=mmap.ACCESS_READ)
+
+def lire_entete(vue) -> Tuple[int, int, int]:
+    """
+    Cherche l'en-tete "p cnf nb_var nb_clauses" (apres les commentaires) et le valide.
+    Renvoie (nb_var, nb_clauses, position du debut des clauses)
+    """
+    position = 0
+    taille = len(vue)
+    while position < taille:
+        fin = vue.find(b"\n", position)
+        if fin == -1:
+            fin = taille
+        ligne = vue[position:fin].strip()
+        position = fin + 1
+        if ligne == b"" or ligne.startswith(b"c"):
+            continue
+        morceaux = ligne.split()
+        if len(morceaux) != 4 or morceaux[0] != b"p" or morceaux[1] != b"cnf":
+            raise ValueError(f"en-tete DIMACS invalide : {ligne[:60]!r}")
+        try:
+            nb_var, nb_clauses = int(morceaux[2]), int(morceaux[3])
+        except ValueError:
+            raise ValueError(f"en-tete DIMACS invalide : {ligne[:60]!r}") from None
+        if nb_var < 0 or nb_clauses < 0:
+            raise ValueError(f"en-tete DIMACS invalide : {ligne[:60]!r}")
+        return nb_var, nb_clauses, min(position, taille)
+    raise ValueError("en-tete DIMACS absent")
+
+def _jetons(bloc: bytes) -> List[bytes]:
+    """
+    Decoupe un bloc de clauses en jetons, sans les commentaires ni ce qui suit un "%"
+    """
+    fin = _FIN.search(bloc) if b"%" in bloc else None
+    if fin is not None:
+        bloc = bloc[:fin.start()]
+    if b"c" in bloc:
+        bloc = _COMMENTAIRES.sub(b"", bloc)
+    return bloc.split()
+
+def _convertir(jetons: List[bytes], nb_var: int) -> array:
+    """
+    Convertit les jetons en tableau de litteraux et verifie qu'ils sont dans [-nb_var, nb_var]
+
+    Les jetons sont convertis d'un bloc par le decodeur JSON (ecrit en C, plus rapide que int sur
+    chaque jeton). Les ecritures qu'il refuse ("+3", "007") sont reprises jeton par jeton avec int.
+    """
+    try:
+        valeurs = json.loads(b"[" + b",".join(jetons) + b"]")
+        litteraux = array("i", valeurs)
+    except (ValueError, TypeError, OverflowError):
+        try:
+            valeurs = list(map(int, jetons))
+            litteraux = array("i", valeurs)
+        except (ValueError, OverflowError):
+            mauvais = next(j for j in jetons if not j.lstrip(b"-+").isdigit())
+            raise ValueError(f"litteral DIMACS invalide : {mauvais[:20]!r}") from None
+    if valeurs and (max(valeurs) > nb_var or -min(valeurs) > nb_var):
+        raise ValueError(f"litteral hors de l'en-tete (nb_var = {nb_var})")
+    return litteraux
+
+def _blocs(vue, position: int, taille_bloc: int) -> Iterator[bytes]:
+    """
+    Parcourt le fichier projete a partir de position par blocs d'environ taille_bloc octets, coupes en
+    fin de ligne : seul le bloc courant est copie hors de la projection. S'arrete apres un bloc qui
+    contient la fin "%" des fichiers SATLIB (_jetons ignore ce qui la suit).
+    """
+    taille = len(vue)
+    while position < taille:
+        fin = vue.find(b"\n", min(position + taille_bloc, taille) - 1)
+        fin = taille if fin == -1 else fin + 1
+        bloc = vue[position:fin]
+        position = fin
+        if b"%" in bloc and _FIN.search(bloc) is not None:
+            position = taille
+        yield bloc
+
+def lire_dimacs(chemin: str, taille_bloc: int = 1 << 20) -> Tuple[int, ArenaClauses]:
+    """
+    Lit un fichier DIMACS CNF en entier et renvoie (nb_var, arene des clauses)
+
+    Le fichier est projete en memoire et parcouru par blocs de taille_bloc octets (voir _blocs) : seul
+    le bloc courant est copie, puis decoupe d'un coup (bytes.split, puis conversion de tous ses jetons
+    en un seul array('i')), sans creer de liste par clause. Le texte DIMACS de l'arene (une ligne par
+    clause) est obtenu a partir des jetons sans reconvertir les entiers, et les debuts des clauses se
+    deduisent du nombre de jetons de chaque ligne (une clause peut etre a cheval sur deux blocs : sa
+    ligne incomplete, qui se termine par un espace, est completee par le bloc suivant).
+    Leve ValueError si l'en-tete est absent ou invalide, si un litteral n'est pas un entier ou
+    depasse nb_var, si la derniere clause n'est pas terminee par 0 ou si le nombre de clauses ne
+    correspond pas a l'en-tete.
+    """
+    arene = ArenaClauses()
+    tailles = array("q") # nombre de jetons de chaque ligne (litteraux et 0 final)
+    longueurs = array("q") # nombre d'octets de chaque ligne, fin de ligne comprise
+    reste_jetons, reste_octets = 0, 0 # ligne incomplete a la fin du bloc precedent
+    with open(chemin, "rb") as fichier, _ouvrir(fichier) as vue:
+        nb_var, nb_clauses, position = lire_entete(vue)
+        for bloc in _blocs(vue, position, taille_bloc):
+            jetons = _jetons(bloc)
+            if not jetons:
+                continue
+            arene.litteraux += _convertir(jetons, nb_var)
+            texte = _TERMINAISONS.sub(b" 0\n", b" " + b" ".join(jetons) + b" ")[1:].replace(b"\n ", b"\n")
+            arene.texte += texte
+            lignes = texte.split(b"\n")
+            incomplete = lignes.pop()
+            if lignes:
+                # une ligne de k espaces contient k + 1 jetons
+                debut = len(tailles)
+                tailles.extend(map(add, map(bytes.count, lignes, repeat(b" ")), repeat(1)))
+                longueurs.extend(map(add, map(len, lignes), repeat(1)))
+                tailles[debut] += reste_jetons
+                longueurs[debut] += reste_octets
+                reste_jetons, reste_octets = 0, 0
+            reste_jetons += incomplete.count(b" ")
+            reste_octets += len(incomplete)
+
+    if reste_jetons:
+        raise ValueError("derniere clause DIMACS non terminee par 0")
+    arene.debuts = array("q", accumulate(tailles, initial=0))
+    arene.debuts.pop()
+    arene.positions = array("q", accumulate(longueurs, initial=0))
+    arene.positions.pop()
+    if len(arene.debuts) != nb_clauses:
+        raise ValueError(f"{len(arene.debuts)} clauses lues, {nb_clauses} annoncees par l'en-tete")
+    return nb_var, arene
+
+def iterer_clauses(chemin: str, taille_bloc: int = 1 << 20) -> Iterator[List[int]]:
+    """
+    Renvoie un generateur qui lit les clauses d'un fichier DIMACS une par une, pour les fichiers
+    trop gros pour tenir en memoire : le fichier projete est parcouru par blocs (voir _blocs),
+    chaque bloc etant decoupe comme dans lire_dimacs.
+    Les memes verifications que lire_dimacs sont faites au fur et a mesure (le nombre de clauses
+    a la fin du parcours).
+    """
+    with open(chemin, "rb") as fichier, _ouvrir(fichier) as vue:
+        nb_var, nb_clauses, position = lire_entete(vue)
+        clause = []
+        nb_lues = 0
+        for bloc in _blocs(vue, position, taille_bloc):
+            for litteral in _convertir(_jetons(bloc), nb_var):
+                if litteral == 0:
+                    nb_lues += 1
+                    yield clause
+                    clause = []
+                else:
+                    clause.append(litteral)
+
+    if clause != []:
+        raise ValueError("derniere clause DIMACS non terminee par 0")
+    if nb_lues != nb_clauses:
+        raise ValueError(f"{nb_lues} clauses lues, {nb_clauses} annoncees par l'en-tete")
+
+def lire_dimacs_lignes(chemin: str) -> Tuple[int, List[List[int]]]:
+    """
+    Lecture naive ligne par ligne en liste de listes, sert de reference au banc d'essai
+    """
+    nb_var, clauses, clause = 0, [], []
+    with open(chemin) as fichier:
+        for ligne in fichier:
+            ligne = ligne.strip()
+            if ligne == "" or ligne.startswith("c"):
+                continue
+            if ligne.startswith("%"):
+                break
+            if ligne.startswith("p"):
+                nb_var = int(ligne.split()[2])
+                continue
+            for jeton in ligne.split():
+                if jeton == "0":
+                    clauses.append(clause)
+                    clause = []
+                else:
+                    clause.append(int(jeton))
+    return nb_var, clauses
+
+def banc_essai(chemins: List[str], repetitions: int = 20) -> str:
+    """
+    Compare les lectures sur chaque fichier (meilleur temps sur repetitions lectures) : lecture
+    ligne par ligne en listes, la meme suivie de la construction de l'arene, lire_dimacs et
+    iterer_clauses. Verifie qu'elles donnent les memes clauses (et le meme texte DIMACS pour
+    les arenes) et renvoie un tableau recapitulatif avec deux gains de lire_dimacs : sur la lecture
+    ligne par ligne en listes (qui ne construit pas d'arene) et sur la meme suivie de la construction
+    de l'arene (le resultat de lire_dimacs).
+    """
+    lectures = (
+        lire_dimacs_lignes,
+        lambda c: ArenaClauses(lire_dimacs_lignes(c)[1]),
+        lire_dimacs,
+        lambda c: list(iterer_clauses(c)),
+    )
+    lignes = [f"{'fichier':<24}{'var':>6}{'clauses':>9}{'lignes':>9}{'+arene':>9}{'mmap':>9}{'flux':>9}{'/lignes':>9}{'/+arene':>9}   (ms)"]
+    totaux = [0.0] * len(lectures)
+    for chemin in chemins:
+        temps = []
+        resultats = []
+        for lecture in lectures:
+            meilleur = float("inf")
+            for _ in range(repetitions):
+                debut = perf_counter()
+                resultat = lecture(chemin)
+                meilleur = min(meilleur, perf_counter() - debut)
+            temps.append(meilleur)
+            resultats.append(resultat)
+        (nb_var, reference), arene_lignes, (nb_var_mmap, arene), flux = resultats
+        assert nb_var_mmap == nb_var and list(arene) == reference and flux == reference, chemin
+        assert arene.texte == arene_lignes.texte and arene.positions == arene_lignes.positions, chemin
+        totaux = [total + t for total, t in zip(totaux, temps)]
+        lignes.append(f"{os.path.basename(chemin):<24}{nb_var:>6}{len(reference):>9}"
+                      + "".join(f"{t * 1e3:>9.3f}" for t in temps) + f"{temps[0] / temps[2]:>8.1f}x{temps[1] / temps[2]:>8.1f}x")
+    lignes.append(f"{'total':<24}{'':>6}{'':>9}" + "".join(f"{t * 1e3:>9.3f}" for t in totaux) + f"{totaux[0] / totaux[2]:>8.1f}x{totaux[1] / totaux[2]:>8.1f}x")
+    return "\n".join(lignes)
+
+def exemples() -> List[str]:
+    """
+    Renvoie les fichiers CNF d'exemple du depot (TP2/examples et TP3/sudoku.cnf)
+    """
+    racine = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..")
+    dossier = os.path.join(racine, "TP2", "examples")
+    chemins = sorted(os.path.join(dossier, nom) for nom in os.listdir(dossier) if nom.endswith(".cnf"))
+    return [os.path.normpath(c) for c in chemins + [os.path.join(racine, "TP3", "sudoku.cnf")]]
+
+if __name__ == "__main__":
+    # depuis Projet/ : python3 -m utils.lecture_dimacs [fichiers.cnf ...]
+    print(banc_essai(sys.argv[1:] or exemples()))
@@ -0,0 +1,129 @@
+from typing import List, Set
+from .arena import iter_clauses
+
+class ReserveModeles:
+    """
+    Classe qui garde les modeles trouves par le solveur pour repondre sans lui a la question
+    "existe-t-il un modele ou cette variable est vraie ?"
+
+    Un modele reste valable tant qu'il satisfait toutes les clauses de la base. La base ne fait que
+    grandir, chaque modele retient donc le nombre de clauses qu'il a deja verifiees, et n'est
+    verifie que sur les nouvelles clauses lors de la mise a jour.
+
+    Un modele peut etre partiel : c'est alors le modele d'une composante independante de la base
+    (voir utils/composantes.py), qui ne donne une valeur qu'aux variables de la composante. Il reste
+    valable tant qu'il satisfait toutes les clauses qui contiennent une de ses variables, les autres
+    composantes pouvant toujours etre completees independamment. Une clause qui contient une de
+    ses variables sans etre satisfaite par les valeurs connues l'invalide (les composantes ont fusionne).
+
+    Une reserve est caracterisee par :
+        - taille_max : nombre maximum de modeles gardes (les plus anciens sont oublies en premier)
+        - modeles : liste de couples (valeurs, nombre de clauses verifiees), valeurs[v] vaut 1 si la variable v
+            est vraie, 0 si elle est fausse et 2 si le modele ne lui donne pas de valeur
+        - vraies : ensemble des variables vraies dans au moins un modele valable
+        - impossibles : ensemble des variables fausses dans tous les modeles (prouve par le solveur)
+        - nb_reponses : nombre de questions auxquelles la reserve a repondu sans appel au solveur
+
+    Les methodes utiles sont :
+        - ajouter : ajoute un modele renvoye par le solveur
+        - mettre_a_jour : retire les modeles qui ne satisfont plus la base de clauses
+        - possible : renvoie True si une variable est vraie dans au moins un modele valable
+        - ajouter_impossibles, impossible : variables que le solveur a prouvees fausses
+        - inexpliquees : filtre les variables qui ne sont vraies dans aucun modele valable ni prouvees fausses
+    """
+
+    def __init__(self, taille_max: int = 64):
+        self.taille_max = taille_max
+        self.modeles: List[List] = []
+        self.vraies: Set[int] = set()
+        self.impossibles: Set[int] = set()
+        self.nb_reponses = 0
+
+    def ajouter(self, modele: List[int], nb_clauses_verifiees: int, variables: List[int] = None):
+        """
+        Ajoute un modele au format du solveur (liste de litteraux), qui satisfait les
+        nb_clauses_verifiees premieres clauses de la base.
+        Si variables est donne, seules ces variables sont gardees (modele d'une composante)
+        """
+        valeurs = bytearray(len(modele) + 1)
+        if variables is not None:
+            valeurs = bytearray([2]) * (len(modele) + 1)
+            for v in variables:
+                valeurs[v] = 1 if modele[v - 1] > 0 else 0
+        else:
+            for litteral in modele:
+                valeurs[abs(litteral)] = 1 if litteral > 0 else 0
+        self.vraies.update(v for v in range(1, len(valeurs)) if valeurs[v] == 1)
+        self.modeles.append([valeurs, nb_clauses_verifiees])
+        if len(self.modeles) > self.taille_max:
+            self.modeles.pop(0)
+            self._recalculer_vraies()
+
+    def mettre_a_jour(self, clauses: List[List[int]]):
+        """
+        Verifie les modeles sur les clauses ajoutees depuis la derniere mise a jour
+        et retire ceux qui ne les satisfont pas
+        """
+        nb_clauses = len(clauses)
+        valables = []
+        for modele in self.modeles:
+            valeurs, debut = modele
+            if all(self._satisfait(valeurs, clause) for clause in iter_clauses(clauses, debut, nb_clauses)):
+                modele[1] = nb_clauses
+                valables.append(modele)
+        if len(valables) != len(self.modeles):
+            self.modeles = valables
+            self._recalculer_vraies()
+
+    def possible(self, variable: int) -> bool:
+        """
+        Renvoie True si la variable est vraie dans au moins un modele valable
+        (la reserve doit avoir ete mise a jour avec la base de clauses actuelle)
+        """
+        if variable in self.vraies:
+            self.nb_reponses += 1
+            return True
+        return False
+
+    def ajouter_impossibles(self, variables: List[int]):
+        """
+        Retient des variables qui ne sont vraies dans aucun modele de la base de clauses.
+        Comme la base ne fait que grandir, elles le restent.
+        """
+        self.impossibles.update(variables)
+
+    def impossible(self, variable: int) -> bool:
+        """
+        Renvoie True si le solveur a prouve que la variable est fausse dans tous les modeles
+        """
+        if variable in self.impossibles:
+            self.nb_reponses += 1
+            return True
+        return False
+
+    def inexpliquees(self, variables: List[int]) -> List[int]:
+        """
+        Renvoie les variables qui ne sont vraies dans aucun modele valable ni prouvees fausses
+        """
+        return [v for v in variables if v not in self.vraies and v not in self.impossibles]
+
+    def _recalculer_vraies(self):
+        self.vraies = set()
+        for valeurs, _ in self.modeles:
+            self.vraies.update(v for v in range(1, len(valeurs)) if valeurs[v] == 1)
+
+    @staticmethod
+    def _satisfait(valeurs: bytearray, clause: List[int]) -> bool:
+        """
+        Renvoie True si la clause est satisfaite par les valeurs, ou si elle ne contient
+        aucune variable du modele (clause d'une autre composante)
+        """
+        concernee = False
+        for litteral in clause:
+            valeur = valeurs[abs(litteral)]
+            if valeur == 2:
+                continue
+            if valeur == (litteral > 0):
+                return True
+            concernee = True
+        return not concernee
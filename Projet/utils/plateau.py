@@ -1,6 +1,25 @@
 from .case import Case
+from .frontiere import Frontiere
 from .hitman import *
-from typing import Tuple, List, Dict
+from typing import Tuple, List, Dict, Set
+
+def formater_plateau(m: int, n: int, textes: Dict[Tuple[int, int], str])-> str:
+    """
+    Renvoie la chaine de caracteres representant un plateau de m colonnes et n lignes,
+    textes contient le texte a afficher pour chaque case (i, j)
+    """
+    bordure = "    " + "+-----" * m + "+"
+    lignes = [bordure]
+
+    for j in range(n-1, -1, -1):
+        cases = "".join(f"{textes[(i, j)]:^5}|" for i in range(m))
+        lignes.append(f" {j}  |" + cases)
+        lignes.append(bordure)
+
+    lignes.append("    " + "".join(f"   {i}  " for i in range(m)))
+    lignes.append("")
+
+    return "\n".join(lignes)
 
 class Plateau:
     """
@@ -12,6 +31,7 @@ class Plateau:
         - pos_hitman : tuple (i, j, direction) qui indique la position du hitman sur le plateau
         - history : dictionnaire qui stocke les distances minimales deja calculees pour la methode distance_minimale
         - suit_on : booleen qui indique si le hitman porte un costume ou non
+        - frontiere : objet Frontiere, ensemble des cases inconnues et des cases depuis lesquelles les voir
 
     Les methodes utiles sont :
         - board_to_dict : converti le plateau au format dictionnaire pour la soumission de la solution phase 1
@@ -23,9 +43,13 @@ class Plateau:
         - var_to_cell : converti une variable cnf en coordonnees de case et le type
         - set_case : modifie le contenu de la case (i, j)
         - get_case : renvoie le contenu de la case (i, j)
+        - cases_inconnues : renvoie l'ensemble des cases dont le contenu est inconnu
         - verif_init : verifie si les coordonnees d'initialisation sont valides
         - infos_plateau : renvoie la taille du plateau
         - __str__ : permet d'afficher le plateau avec print()
+        - texte_case : renvoie le texte affiche pour une case (en tenant compte de hitman)
+        - textes_cases : renvoie le texte affiche pour chaque case du plateau
+        - extraire_modifications : renvoie le texte des cases modifiees depuis le dernier appel (pour l'affichage differentiel)
         - voisins : renvoie les cases voisines de la case
         - voisins_gardes : renvoie les cases autour de (i, j) ou un garde pourrait se trouver et voir la case
         - cases_entendre : renvoie les cases autour de la case dans un rayon de 2, plus la case actuelle elle-meme
@@ -51,8 +75,10 @@ class Plateau:
             self._n = n
             self._history = dict() # historique temporaire pour le calcul de la distance minimale
             self._pos_hitman = None # position du hitman
+            self._cases_modifiees = set() # cases modifiees depuis le dernier affichage
 
         self._plateau = [[Case() for _ in range(n)] for _ in range(m)]
+        self.frontiere = Frontiere(self)
         self._suit_on = False
 
     def put_suit(self):
@@ -60,6 +86,8 @@ class Plateau:
         Met le costume sur le hitman
         """
         self._suit_on = True
+        if self._pos_hitman is not None:
+            self._cases_modifiees.add(self._pos_hitman[:2])
 
     @property
     def pos_hitman(self) -> Tuple[int, int, str]:
@@ -72,6 +100,9 @@ class Plateau:
             raise ValueError("La case n'existe pas")
         if direction not in {"gauche", "droite", "haut", "bas"}:
             raise ValueError("La direction n'est pas valide")
+        if self._pos_hitman is not None:
+            self._cases_modifiees.add(self._pos_hitman[:2])
+        self._cases_modifiees.add((i, j))
         self._pos_hitman = (i, j, direction)
 
     def board_to_dict(self) -> Dict[Tuple[int, int], HC]:
@@ -285,6 +316,8 @@ class Plateau:
         if not self.case_existe(i, j):
             raise ValueError("La case n'existe pas")
         self._plateau[i][j].contenu = contenu
+        self.frontiere.reveler(i, j)
+        self._cases_modifiees.add((i, j))
 
     def remove_case(self, i: int, j: int):
         """
@@ -293,6 +326,15 @@ class Plateau:
         if not self.case_existe(i, j):
             raise ValueError("La case n'existe pas")
         self._plateau[i][j].erase_contenu()
+        self.frontiere.reveler(i, j)
+        self._cases_modifiees.add((i, j))
+
+    def cases_inconnues(self)-> Set[Tuple[int, int]]:
+        """
+        Renvoie l'ensemble des cases dont le contenu est inconnu.
+        L'ensemble est maintenu par la frontiere, il ne doit pas etre modifie par l'appelant.
+        """
+        return self.frontiere.cases
 
     def get_case(self, i: int, j: int)-> Case:
         """
@@ -318,47 +360,46 @@ class Plateau:
         """
         return self._m, self._n
 
-    def __str__(self):
+    def texte_case(self, i: int, j: int)-> str:
         """
-        Permet d'afficher le plateau avec print()
-        :return: chaine de caracteres representant le plateau
+        Renvoie le texte affiche pour la case (i, j), en tenant compte de la presence de hitman
         """
+        if self.pos_hitman is None or self.pos_hitman[:2] != (i, j):
+            return str(self._plateau[i][j])
+
         directions = {"gauche": "←", "droite": "→", "haut": "↑", "bas": "↓"}
+        h_char = "h" if self._suit_on else "H"
+        hitman = h_char + directions[self.pos_hitman[2]]
+        contenu = str(self._plateau[i][j])
+        if contenu != " ":
+            hitman += f" {contenu}"
+        return hitman
 
-        if self.pos_hitman is None:
-            i_hitman, j_hitman, direction_hitman = (-1, -1, None)
-        else:
-            i_hitman, j_hitman, direction_hitman = self.pos_hitman
-        
-        
+    def textes_cases(self)-> Dict[Tuple[int, int], str]:
+        """
+        Renvoie le texte affiche pour chaque case du plateau
+        """
         m, n = self.infos_plateau()
-        plateau_str = "    "
-        plateau_str += "+-----" * m + "+\n"
-
+        return {(i, j): self.texte_case(i, j) for i in range(m) for j in range(n)}
 
-        for i in range(n-1, -1, -1):
-            plateau_str += f" {i}  |"
-            for j in range(m):
-                if i == j_hitman and j == i_hitman:
-                    if self._suit_on:
-                        h_char = "h"
-                    else:
-                        h_char = "H"
-                    hitman = f"{h_char + directions[direction_hitman]}"
-                    if str(self._plateau[j][i]) != " ":
-                        hitman += f" {str(self._plateau[j][i])}"
-                    plateau_str += f"{hitman :^5}|"
-                else:
-                    plateau_str += f"{str(self._plateau[j][i]):^5}|"
-            plateau_str += "\n    "
-            plateau_str += "+-----" * m + "+\n"
+    def extraire_modifications(self)-> Dict[Tuple[int, int], str]:
+        """
+        Renvoie le texte affiche pour les cases modifiees depuis le dernier appel,
+        et remet a zero l'ensemble des cases modifiees.
 
-        plateau_str += "    "
-        for j in range(m):
-            plateau_str += f"   {j}  "
-        plateau_str += "\n"
+        Permet a l'affichage de ne redessiner que ce qui a change.
+        """
+        modifications = {(i, j): self.texte_case(i, j) for i, j in self._cases_modifiees}
+        self._cases_modifiees = set()
+        return modifications
 
-        return plateau_str
+    def __str__(self):
+        """
+        Permet d'afficher le plateau avec print()
+        :return: chaine de caracteres representant le plateau
+        """
+        m, n = self.infos_plateau()
+        return formater_plateau(m, n, self.textes_cases())
     
     def voisins(self, i: int, j: int)-> List[Tuple[int, int]]:
         """
@@ -0,0 +1,140 @@
+import json
+import os
+import threading
+from functools import wraps
+from time import perf_counter
+from typing import Dict, List
+
+class Profileur:
+    """
+    Classe qui permet d'instrumenter le jeu pour savoir ou le temps est passe
+
+    Un profileur est caracterise par :
+        - stats : dictionnaire nom de methode -> [nombre d'appels, temps cumule (s), temps propre (s)]
+        - stats_sat : liste des appels au solveur, chaque appel est un dictionnaire
+            (nombre de clauses, nombre de variables, temps de resolution, resultat)
+        - evenements : liste d'evenements au format "Chrome trace event" (voir plus bas)
+        - _origine : instant de creation du profileur, sert de zero pour les evenements
+        - _pile : pile des appels en cours, sert a calculer le temps propre de chaque methode
+
+    Les methodes utiles sont :
+        - instrumenter : remplace les methodes d'un objet par des versions mesurees
+        - enregistrer_sat : enregistre les statistiques d'un appel au solveur
+        - resume : renvoie un tableau recapitulatif sous forme de chaine de caracteres
+        - exporter_trace : ecrit les evenements dans un fichier JSON lisible par chrome://tracing ou Perfetto
+
+    Le temps cumule d'une methode inclut le temps passe dans les methodes qu'elle appelle
+    (par exemple penalite_minimale inclut le temps de risque), le temps propre ne l'inclut pas.
+    Les appels recursifs ne sont comptes qu'une fois dans le temps cumule.
+    """
+
+    def __init__(self):
+        self.stats: Dict[str, List] = dict()
+        self.stats_sat: List[Dict] = []
+        self.evenements: List[Dict] = []
+        self._origine = perf_counter()
+        self._pile = []
+        self._en_cours = dict()
+
+    def _micro(self, instant: float) -> float:
+        """
+        Convertit un instant perf_counter en microsecondes depuis la creation du profileur
+        """
+        return (instant - self._origine) * 1e6
+
+    def _mesurer(self, nom: str, fonction):
+        """
+        Renvoie une version de fonction qui compte ses appels et mesure son temps d'execution
+        """
+        if nom not in self.stats:
+            self.stats[nom] = [0, 0.0, 0.0]
+
+        @wraps(fonction)
+        def fonction_mesuree(*args, **kwargs):
+            stats = self.stats[nom]
+            stats[0] += 1
+            self._en_cours[nom] = self._en_cours.get(nom, 0) + 1
+            self._pile.append(0.0)
+            debut = perf_counter()
+            try:
+                return fonction(*args, **kwargs)
+            finally:
+                duree = perf_counter() - debut
+                temps_enfants = self._pile.pop()
+                if self._pile:
+                    self._pile[-1] += duree
+                self._en_cours[nom] -= 1
+                if self._en_cours[nom] == 0: # on ne compte pas deux fois un appel recursif
+                    stats[1] += duree
+                stats[2] += duree - temps_enfants
+                self.evenements.append({
+                    "name": nom,
+                    "cat": "game",
+                    "ph": "X",
+                    "ts": self._micro(debut),
+                    "dur": duree * 1e6,
+                    "pid": os.getpid(),
+                    "tid": threading.get_ident(),
+                })
+
+        return fonction_mesuree
+
+    def instrumenter(self, objet, noms: List[str]):
+        """
+        Remplace les methodes noms de objet par des versions mesurees.
+        Le remplacement est fait sur l'instance, la classe n'est pas modifiee.
+        """
+        for nom in noms:
+            methode = getattr(objet, nom)
+            setattr(objet, nom, self._mesurer(nom, methode))
+
+    def enregistrer_sat(self, nb_clauses: int, nb_variables: int, debut: float, fin: float, resultat: bool):
+        """
+        Enregistre les statistiques d'un appel au solveur, debut et fin sont des instants perf_counter
+        """
+        self.stats_sat.append({
+            "clauses": nb_clauses,
+            "variables": nb_variables,
+            "duree": fin - debut,
+            "satisfiable": resultat,
+        })
+        self.evenements.append({
+            "name": "gophersat",
+            "cat": "sat",
+            "ph": "X",
+            "ts": self._micro(debut),
+            "dur": (fin - debut) * 1e6,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": {"clauses": nb_clauses, "variables": nb_variables, "satisfiable": resultat},
+        })
+
+    def resume(self) -> str:
+        """
+        Renvoie un tableau recapitulatif des mesures, trie par temps cumule decroissant
+        """
+        lignes = []
+        lignes.append(f"{'methode':<22}{'appels':>10}{'cumule (s)':>14}{'propre (s)':>14}{'moyen (ms)':>14}")
+        lignes.append("-" * 74)
+        for nom, (appels, cumule, propre) in sorted(self.stats.items(), key=lambda x: -x[1][1]):
+            moyen = 1000 * cumule / appels if appels > 0 else 0
+            lignes.append(f"{nom:<22}{appels:>10}{cumule:>14.3f}{propre:>14.3f}{moyen:>14.3f}")
+
+        lignes.append("")
+        nb_appels = len(self.stats_sat)
+        lignes.append(f"Appels SAT : {nb_appels}")
+        if nb_appels > 0:
+            temps_total = sum(s["duree"] for s in self.stats_sat)
+            nb_unsat = len([s for s in self.stats_sat if not s["satisfiable"]])
+            lignes.append(f"    temps total : {temps_total:.3f} s, moyen : {1000 * temps_total / nb_appels:.3f} ms")
+            lignes.append(f"    insatisfiables : {nb_unsat}")
+            lignes.append(f"    clauses : moyenne {sum(s['clauses'] for s in self.stats_sat) / nb_appels:.0f}, max {max(s['clauses'] for s in self.stats_sat)}")
+            lignes.append(f"    variables : max {max(s['variables'] for s in self.stats_sat)}")
+        return "\n".join(lignes)
+
+    def exporter_trace(self, filename: str):
+        """
+        Ecrit les evenements au format "Chrome trace event" (ouvrable avec chrome://tracing ou ui.perfetto.dev)
+        """
+        with open(filename, "w") as f:
+            json.dump({"traceEvents": self.evenements, "displayTimeUnit": "ms"}, f)
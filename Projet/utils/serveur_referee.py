@@ -0,0 +1,441 @@
+"""
+Serveur de referee : de nombreuses parties en parallele dans un seul processus
+
+Le serveur (asyncio) ecoute sur une socket Unix ("unix:/chemin") ou en TCP ("hote:port", ou
+seulement "port" pour 127.0.0.1). Chaque message est une trame : sa taille sur 4 octets
+(big-endian) puis un objet JSON (msgpack n'est pas disponible, le JSON suffit).
+    - requete : {"id": n, "session": s, "methode": nom, "args": [...]}
+    - reponse : {"id": n, "resultat": ...} ou {"id": n, "erreur": message, "type": exception}
+
+La methode "ouvrir" cree une partie (un HitmanReferee) et renvoie son numero de session,
+"fermer" la supprime. Une partie appartient a la connexion qui l'a ouverte : les requetes
+d'une autre connexion sur cette session sont refusees, et les parties d'une connexion sont
+supprimees a sa fermeture (meme si le client n'a pas appele "fermer").
+Les autres methodes sont celles du referee, run_actions compris ; les status sont convertis
+comme dans les traces (voir utils/trace.py).
+
+Un client peut envoyer des requetes sans attendre les reponses precedentes (pipelining) :
+elles sont traitees dans l'ordre d'arrivee et chaque reponse porte l'id de sa requete.
+
+Depuis Projet/ :
+    python3 -m utils.serveur_referee serveur --adresse unix:/tmp/referee.sock
+    python3 main.py --display False --referee unix:/tmp/referee.sock
+    python3 -m utils.serveur_referee charge --sessions 50 --actions 200
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import struct
+import tempfile
+import threading
+from array import array
+from multiprocessing import Process
+from time import perf_counter, sleep
+from typing import Dict, List, Tuple
+from .hitman import HC, HitmanReferee
+from .trace import ACTIONS, status_vers_json, json_vers_status
+
+ENTETE = struct.Struct(">I")
+TAILLE_MAX = 1 << 24
+
+# methodes du referee accessibles a distance
+METHODES = ACTIONS | {"send_content", "end_phase1", "end_phase2", "run_actions"}
+
+
+def trame(message: Dict) -> bytes:
+    donnees = json.dumps(message, separators=(",", ":")).encode()
+    return ENTETE.pack(len(donnees)) + donnees
+
+async def lire_trame(reader: asyncio.StreamReader) -> Dict:
+    taille, = ENTETE.unpack(await reader.readexactly(ENTETE.size))
+    if taille > TAILLE_MAX:
+        raise ValueError(f"trame trop grande ({taille} octets)")
+    return json.loads(await reader.readexactly(taille))
+
+async def ouvrir_connexion(adresse: str) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    if adresse.startswith("unix:"):
+        return await asyncio.open_unix_connection(adresse[5:])
+    return await asyncio.open_connection(*_hote_port(adresse))
+
+def _hote_port(adresse: str) -> Tuple[str, int]:
+    hote, _, port = adresse.rpartition(":")
+    return hote or "127.0.0.1", int(port)
+
+
+def _carte_vers_json(carte: Dict[Tuple[int, int], HC]) -> List:
+    return [[x, y, contenu.name] for (x, y), contenu in carte.items()]
+
+def _json_vers_carte(donnees: List) -> Dict[Tuple[int, int], HC]:
+    return {(x, y): HC[contenu] for x, y, contenu in donnees}
+
+def resultat_vers_json(methode: str, resultat):
+    if methode in ACTIONS:
+        return status_vers_json(resultat)
+    if methode == "end_phase1":
+        succes, message, historique, carte = resultat
+        return [succes, message, historique, _carte_vers_json(carte)]
+    if methode == "run_actions":
+        status, penalites, erreur = resultat
+        if isinstance(status, list):
+            status = [status_vers_json(s) for s in status]
+        elif status is not None:
+            status = status_vers_json(status)
+        return [status, list(penalites), erreur]
+    return resultat
+
+def json_vers_resultat(methode: str, donnees):
+    if methode in ACTIONS:
+        return json_vers_status(donnees)
+    if methode == "end_phase1":
+        succes, message, historique, carte = donnees
+        return succes, message, historique, _json_vers_carte(carte)
+    if methode == "end_phase2":
+        return tuple(donnees)
+    if methode == "run_actions":
+        status, penalites, erreur = donnees
+        if isinstance(status, list):
+            status = [json_vers_status(s) for s in status]
+        elif status is not None:
+            status = json_vers_status(status)
+        return status, array("i", penalites), erreur
+    return donnees
+
+
+class ServeurReferee:
+    """
+    Serveur qui heberge des parties (une par session) et repond aux requetes des clients
+
+    Un serveur est caracterise par :
+        - sessions : dictionnaire numero de session -> HitmanReferee, toutes connexions confondues
+            (chaque connexion garde l'ensemble de ses propres sessions, voir traiter)
+        - prochaine_session : numero de la prochaine session ouverte
+        - nb_requetes : nombre de requetes traitees
+
+    Les methodes utiles sont :
+        - traiter : execute une requete et renvoie la reponse
+        - servir : ecoute sur une adresse jusqu'a l'arret du serveur
+    """
+
+    def __init__(self):
+        self.sessions: Dict[int, HitmanReferee] = dict()
+        self.prochaine_session = 1
+        self.nb_requetes = 0
+
+    def traiter(self, requete: Dict, ouvertes: set) -> Dict:
+        """
+        Execute une requete d'une connexion ; ouvertes est l'ensemble des sessions ouvertes par
+        cette connexion, les seules auxquelles elle a acces (supprimees a sa fermeture).
+        Une trame qui n'est pas un objet JSON avec un id entier recoit une reponse d'erreur d'id None.
+        """
+        self.nb_requetes += 1
+        reponse = {"id": None}
+        try:
+            if not isinstance(requete, dict) or type(requete.get("id")) is not int:
+                raise ValueError("Err: invalid request, expected an object with an integer id")
+            reponse["id"] = requete["id"]
+            methode = requete.get("methode")
+            if methode == "ouvrir":
+                session = self.prochaine_session
+                self.prochaine_session += 1
+                self.sessions[session] = HitmanReferee()
+                ouvertes.add(session)
+                reponse["resultat"] = session
+                return reponse
+
+            session = requete.get("session")
+            # une session d'une autre connexion est traitee comme inconnue
+            if session not in ouvertes or session not in self.sessions:
+                raise ValueError(f"Err: unknown session {session}")
+            if methode == "fermer":
+                del self.sessions[session]
+                ouvertes.discard(session)
+                reponse["resultat"] = None
+            elif methode in METHODES:
+                args = requete.get("args", [])
+                if not isinstance(args, list):
+                    raise ValueError("Err: invalid request, args must be a list")
+                if methode == "send_content":
+                    args = [_json_vers_carte(args[0])]
+                resultat = getattr(self.sessions[session], methode)(*args)
+                reponse["resultat"] = resultat_vers_json(methode, resultat)
+            else:
+                raise ValueError(f"Err: unknown method {methode!r}")
+        except Exception as e:
+            reponse["erreur"] = str(e)
+            reponse["type"] = type(e).__name__
+        return reponse
+
+    async def _connexion(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        ouvertes = set()
+        try:
+            while True:
+                requete = await lire_trame(reader)
+                writer.write(trame(self.traiter(requete, ouvertes)))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            # fin de la connexion, ou trame invalide : on ferme la connexion
+            pass
+        finally:
+            # les parties que le client n'a pas fermees disparaissent avec sa connexion
+            for session in ouvertes:
+                self.sessions.pop(session, None)
+            writer.close()
+
+    async def servir(self, adresse: str):
+        if adresse.startswith("unix:"):
+            serveur = await asyncio.start_unix_server(self._connexion, path=adresse[5:])
+        else:
+            hote, port = _hote_port(adresse)
+            serveur = await asyncio.start_server(self._connexion, hote, port)
+        async with serveur:
+            await serveur.serve_forever()
+
+
+class ClientReferee:
+    """
+    Client asyncio du serveur : une connexion, partagee par autant de sessions que voulu
+
+    Les requetes sont envoyees sans attendre les reponses precedentes (pipelining), une tache
+    lit les reponses et les associe a leur requete grace a leur id. Une erreur du referee est
+    relevee chez le client (ValueError si le referee a leve une ValueError, RuntimeError sinon).
+
+    Un client est caracterise par :
+        - _reader, _writer : flux de la connexion
+        - _attentes : dictionnaire id de requete -> (methode, future du resultat)
+        - _prochain_id : id de la prochaine requete
+        - _lecteur : tache qui lit les reponses
+
+    Les methodes utiles sont :
+        - connecter : ouvre une connexion (coroutine de classe)
+        - envoyer : envoie une requete et renvoie la future de son resultat sans l'attendre
+        - vider : attend que les requetes envoyees soient parties (apres plusieurs envoyer)
+        - appeler : envoie une requete et attend son resultat
+        - ouvrir, fermer_session : cree et supprime une partie sur le serveur
+        - session : renvoie une SessionDistante, qui a les methodes du referee (en coroutines)
+        - fermer : ferme la connexion
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._reader = reader
+        self._writer = writer
+        self._attentes: Dict[int, Tuple[str, asyncio.Future]] = dict()
+        self._prochain_id = 0
+        self._lecteur = asyncio.get_running_loop().create_task(self._lire_reponses())
+
+    @classmethod
+    async def connecter(cls, adresse: str) -> "ClientReferee":
+        return cls(*await ouvrir_connexion(adresse))
+
+    async def _lire_reponses(self):
+        try:
+            while True:
+                reponse = await lire_trame(self._reader)
+                identifiant = reponse.get("id") if isinstance(reponse, dict) else None
+                if type(identifiant) is not int or identifiant not in self._attentes:
+                    # reponse a aucune requete en attente (id inconnu ou trame invalide) : ignoree
+                    continue
+                methode, future = self._attentes.pop(identifiant)
+                if future.cancelled():
+                    continue
+                try:
+                    if "erreur" in reponse:
+                        exception = ValueError if reponse.get("type") == "ValueError" else RuntimeError
+                        future.set_exception(exception(reponse["erreur"]))
+                    else:
+                        future.set_result(json_vers_resultat(methode, reponse["resultat"]))
+                except Exception as e:
+                    future.set_exception(RuntimeError(f"reponse invalide du serveur : {e!r}"))
+        except Exception as e:
+            # connexion perdue ou trame illisible : aucune requete en attente ne recevra de reponse
+            for _, future in self._attentes.values():
+                if not future.done():
+                    future.set_exception(ConnectionError(f"connexion au serveur perdue ({e})"))
+            self._attentes.clear()
+
+    def envoyer(self, session: int, methode: str, *args) -> asyncio.Future:
+        if self._lecteur.done():
+            raise ConnectionError("connexion au serveur perdue")
+        self._prochain_id += 1
+        future = asyncio.get_running_loop().create_future()
+        self._attentes[self._prochain_id] = (methode, future)
+        if methode == "send_content":
+            args = (_carte_vers_json(args[0]),)
+        requete = {"id": self._prochain_id, "session": session, "methode": methode, "args": list(args)}
+        self._writer.write(trame(requete))
+        return future
+
+    async def vider(self):
+        await self._writer.drain()
+
+    async def appeler(self, session: int, methode: str, *args):
+        future = self.envoyer(session, methode, *args)
+        await self._writer.drain()
+        return await future
+
+    async def ouvrir(self) -> int:
+        return await self.appeler(None, "ouvrir")
+
+    async def fermer_session(self, session: int):
+        await self.appeler(session, "fermer")
+
+    async def session(self) -> "SessionDistante":
+        return SessionDistante(self, await self.ouvrir())
+
+    async def fermer(self):
+        self._writer.close()
+        try:
+            await self._writer.wait_closed()
+        except ConnectionError:
+            pass
+        self._lecteur.cancel()
+
+
+class SessionDistante:
+    """
+    Partie hebergee par le serveur, avec les methodes du referee en coroutines
+    (await session.move(), await session.run_actions(actions, "last")...)
+    """
+
+    def __init__(self, client: ClientReferee, numero: int):
+        self.client = client
+        self.numero = numero
+
+    def __getattr__(self, nom: str):
+        if nom not in METHODES:
+            raise AttributeError(nom)
+        return lambda *args: self.client.appeler(self.numero, nom, *args)
+
+    async def fermer(self):
+        await self.client.fermer_session(self.numero)
+
+
+class RefereeDistant:
+    """
+    Referee avec la meme interface synchrone que HitmanReferee, dont la partie est hebergee par
+    un serveur (voir l'option --referee de main.py). La boucle asyncio du client tourne dans un
+    thread a part. Les status sont des dictionnaires (voir utils/trace.json_vers_status).
+    """
+
+    def __init__(self, adresse: str):
+        self._boucle = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._boucle.run_forever, daemon=True)
+        self._thread.start()
+        self._client = self._executer(ClientReferee.connecter(adresse))
+        self._session = self._executer(self._client.ouvrir())
+
+    def _executer(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._boucle).result()
+
+    def __getattr__(self, nom: str):
+        if nom not in METHODES:
+            raise AttributeError(nom)
+        return lambda *args: self._executer(self._client.appeler(self._session, nom, *args))
+
+    def fermer(self):
+        self._executer(self._client.fermer_session(self._session))
+        self._executer(self._client.fermer())
+        self._boucle.call_soon_threadsafe(self._boucle.stop)
+        self._thread.join()
+        self._boucle.close()
+
+
+#### test de charge
+
+MODES = ("un_par_un", "pipeline", "lot")
+
+async def _partie(adresse: str, actions: List[str], mode: str) -> float:
+    """
+    Joue une partie sur sa propre connexion (comme un moteur) et renvoie la duree de la phase 2 :
+        - un_par_un : chaque action attend son status avant la suivante (comme le jeu)
+        - pipeline : toutes les actions sont envoyees sans attendre, puis les status sont attendus
+        - lot : une seule requete run_actions
+    """
+    client = await ClientReferee.connecter(adresse)
+    session = await client.session()
+    await session.start_phase1()
+    await session.send_content({})
+    await session.end_phase1()
+    await session.start_phase2()
+
+    debut = perf_counter()
+    if mode == "un_par_un":
+        for action in actions:
+            await client.appeler(session.numero, action)
+    elif mode == "pipeline":
+        futures = [client.envoyer(session.numero, action) for action in actions]
+        await client.vider()
+        await asyncio.gather(*futures)
+    else:
+        await session.run_actions(actions, "penalties")
+    duree = perf_counter() - debut
+
+    await session.end_phase2()
+    await session.fermer()
+    await client.fermer()
+    return duree
+
+async def _charge(adresse: str, nb_sessions: int, nb_actions: int, mode: str, graine: int) -> Tuple[float, List[float]]:
+    generateur = random.Random(graine)
+    plans = [[generateur.choice(("move", "move", "turn_clockwise", "turn_anti_clockwise")) for _ in range(nb_actions)]
+             for _ in range(nb_sessions)]
+    debut = perf_counter()
+    durees = await asyncio.gather(*(_partie(adresse, plan, mode) for plan in plans))
+    return perf_counter() - debut, durees
+
+def _servir(adresse: str):
+    asyncio.run(ServeurReferee().servir(adresse))
+
+def charge(adresse: str = None, nb_sessions: int = 50, nb_actions: int = 200, modes=MODES, graine: int = 0) -> str:
+    """
+    Lance nb_sessions parties simultanees de nb_actions actions (aleatoires) de phase 2 contre un
+    serveur, dans chaque mode, et renvoie un tableau du debit obtenu. Sans adresse, un serveur
+    est lance dans un processus a part sur une socket Unix temporaire.
+    """
+    processus = None
+    if adresse is None:
+        dossier = tempfile.mkdtemp(prefix="referee_")
+        adresse = "unix:" + os.path.join(dossier, "referee.sock")
+        processus = Process(target=_servir, args=(adresse,), daemon=True)
+        processus.start()
+        while not os.path.exists(adresse[5:]):
+            sleep(0.01)
+
+    lignes = [f"{'mode':>10} {'sessions':>9} {'actions':>8} {'temps (s)':>10} {'actions/s':>10} {'phase 2 / session (ms)':>23}"]
+    try:
+        for mode in modes:
+            total, durees = asyncio.run(_charge(adresse, nb_sessions, nb_actions, mode, graine))
+            lignes.append(f"{mode:>10} {nb_sessions:>9} {nb_sessions * nb_actions:>8} {total:>10.3f} "
+                          f"{nb_sessions * nb_actions / total:>10.0f} {1e3 * sum(durees) / len(durees):>23.1f}")
+    finally:
+        if processus is not None:
+            processus.terminate()
+            processus.join()
+            os.remove(adresse[5:])
+            os.rmdir(os.path.dirname(adresse[5:]))
+    return "\n".join(lignes)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Hitman referee server')
+    commandes = parser.add_subparsers(dest='commande', required=True)
+    serveur = commandes.add_parser('serveur', help='Run the referee server')
+    serveur.add_argument('--adresse', type=str, default="unix:/tmp/referee.sock", help='"unix:/path", "host:port" or "port", default is unix:/tmp/referee.sock')
+    test = commandes.add_parser('charge', help='Load test: many simultaneous games against one server')
+    test.add_argument('--adresse', type=str, default=None, help='Server address, default is to start a server in a separate process')
+    test.add_argument('--sessions', type=int, default=50, help='Number of simultaneous games, default is 50')
+    test.add_argument('--actions', type=int, default=200, help='Number of phase 2 actions per game, default is 200')
+    test.add_argument('--modes', type=str, default=",".join(MODES), help='Comma separated modes, default is "un_par_un,pipeline,lot"')
+    args = parser.parse_args()
+
+    if args.commande == "serveur":
+        print(f"Serveur de referee sur {args.adresse}")
+        _servir(args.adresse)
+    else:
+        modes = args.modes.split(",")
+        for mode in modes:
+            if mode not in MODES:
+                parser.error(f"unknown mode {mode!r}, available: {', '.join(MODES)}")
+        print(charge(args.adresse, args.sessions, args.actions, modes))
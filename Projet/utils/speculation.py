@@ -0,0 +1,79 @@
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, List, Tuple
+from gophersat.dimacs import solve_model
+
+def _sonder(clauses: List[List[int]], nb_var: int) -> Tuple[bool, List[int]]:
+    """
+    Appelle le solveur depuis un thread de travail, avec son propre fichier DIMACS
+    """
+    descripteur, filename = tempfile.mkstemp(prefix="hitman_", suffix=".cnf")
+    os.close(descripteur)
+    try:
+        return solve_model(clauses, nb_var, filename=filename)
+    finally:
+        os.remove(filename)
+
+
+class Speculateur:
+    """
+    Classe qui sonde le solveur en arriere-plan pendant que le jeu joue ses actions
+
+    Chaque sondage demande au solveur s'il existe un modele ou une variable (garde d'une case) est vraie.
+    Il est lance par un pool de threads, chacun pilotant un processus gophersat, sur une copie des
+    clauses au moment de la soumission : la revision (nombre de clauses de la base a ce moment) est
+    gardee avec le sondage. Le jeu recupere ensuite les resultats termines :
+        - un modele trouve a la revision r satisfait les r premieres clauses, il est ajoute a la reserve
+            de modeles qui le verifie sur les clauses suivantes et l'oublie s'il ne les satisfait plus
+        - une preuve qu'aucun modele n'existe reste vraie quand la base grandit
+    Une reponse perimee n'est donc jamais utilisee telle quelle.
+
+    Un speculateur est caracterise par :
+        - en_cours : dictionnaire variable -> (revision, variables couvertes, future) des sondages soumis
+        - nb_soumis : nombre de sondages soumis
+        - _executeur : pool de threads qui execute les sondages
+
+    Les methodes utiles sont :
+        - soumettre : lance un sondage en arriere-plan
+        - resultats : renvoie les sondages termines (ou attend celui d'une variable)
+        - fermer : attend la fin des sondages en cours et arrete les threads
+    """
+
+    def __init__(self, nb_travailleurs: int = 2):
+        self.en_cours: Dict[int, Tuple[int, List[int], Future]] = dict()
+        self.nb_soumis = 0
+        self._executeur = ThreadPoolExecutor(max_workers=nb_travailleurs, thread_name_prefix="speculation")
+
+    def soumettre(self, variable: int, revision: int, clauses: List[List[int]], variables: List[int], nb_var: int):
+        """
+        Lance en arriere-plan la resolution de clauses avec la variable vraie. clauses doit etre une copie
+        ou une VueArena figee (la base continue a grandir pendant le sondage) ; variables sont les variables dont le modele
+        trouve sera garde (la composante de la variable)
+        """
+        if variable in self.en_cours:
+            return
+        future = self._executeur.submit(_sonder, clauses + [[variable]], nb_var)
+        self.en_cours[variable] = (revision, variables, future)
+        self.nb_soumis += 1
+
+    def resultats(self, attendre: int = None) -> List[Tuple[int, int, List[int], bool, List[int]]]:
+        """
+        Renvoie les sondages termines sous forme de (variable, revision, variables, satisfiable, modele),
+        et les retire des sondages en cours. Si attendre est une variable en cours de sondage,
+        on attend d'abord la fin de son sondage.
+        """
+        if attendre in self.en_cours:
+            self.en_cours[attendre][2].result()
+
+        termines = []
+        for variable, (revision, variables, future) in list(self.en_cours.items()):
+            if future.done():
+                del self.en_cours[variable]
+                satisfiable, modele = future.result()
+                termines.append((variable, revision, variables, satisfiable, modele))
+        return termines
+
+    def fermer(self):
+        self._executeur.shutdown(wait=True)
+        self.en_cours = dict()
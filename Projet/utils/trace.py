@@ -0,0 +1,211 @@
+"""
+Enregistrement et rejeu des parties
+
+Une trace est un fichier JSONL (une ligne JSON par evenement), compresse avec gzip si son nom
+finit par ".gz". Les evenements sont de trois types :
+    - "action" : une action envoyee au referee, avec son nom (nom de la methode du referee)
+        et le dictionnaire de status renvoye
+    - "decision" : une decision du moteur (objectif choisi, case choisie, penalites et risques
+        des candidats, plan de la phase 2...), uniquement informative
+    - "fin" : le resultat d'une methode de fin du referee (send_content, end_phase1, end_phase2)
+
+Les dictionnaires de status contiennent des HC, qui sont ecrits avec leur nom.
+"""
+
+import gzip
+import json
+from typing import Dict, List, Iterator
+from .hitman import HC, WANT_STATUS
+
+
+ACTIONS = {
+    "start_phase1",
+    "start_phase2",
+    "move",
+    "turn_clockwise",
+    "turn_anti_clockwise",
+    "kill_target",
+    "neutralize_guard",
+    "neutralize_civil",
+    "take_suit",
+    "take_weapon",
+    "put_on_suit",
+}
+
+FINS = {"send_content", "end_phase1", "end_phase2"}
+
+def status_vers_json(status: Dict) -> Dict:
+    """
+    Convertit un dictionnaire de status du referee en dictionnaire serialisable en JSON
+    """
+    resultat = dict(status)
+    resultat["position"] = list(status["position"])
+    resultat["orientation"] = status["orientation"].name
+    resultat["vision"] = [[x, y, contenu.name] for (x, y), contenu in status["vision"]]
+    return resultat
+
+def json_vers_status(donnees: Dict) -> Dict:
+    """
+    Convertit un dictionnaire lu dans une trace en dictionnaire de status identique a celui du referee
+    """
+    status = dict(donnees)
+    status["position"] = tuple(donnees["position"])
+    status["orientation"] = HC[donnees["orientation"]]
+    status["vision"] = [((x, y), HC[contenu]) for x, y, contenu in donnees["vision"]]
+    return status
+
+def _ouvrir(filename: str, mode: str):
+    if filename.endswith(".gz"):
+        return gzip.open(filename, mode + "t", encoding="utf8")
+    return open(filename, mode, encoding="utf8")
+
+def lire_trace(filename: str) -> Iterator[Dict]:
+    """
+    Renvoie les evenements d'une trace un par un
+    """
+    with _ouvrir(filename, "r") as f:
+        for ligne in f:
+            if ligne.strip() != "":
+                yield json.loads(ligne)
+
+
+class EnregistreurTrace:
+    """
+    Classe qui ecrit les evenements d'une partie dans un fichier de trace
+
+    Les methodes utiles sont :
+        - action : enregistre une action et le status obtenu
+        - decision : enregistre une decision du moteur
+        - fin : enregistre le resultat d'une methode de fin du referee
+        - fermer : ferme le fichier
+    """
+
+    def __init__(self, filename: str):
+        self._fichier = _ouvrir(filename, "w")
+        self._nb_actions = 0
+
+    def _ecrire(self, evenement: Dict):
+        self._fichier.write(json.dumps(evenement, separators=(",", ":"), ensure_ascii=False) + "\n")
+
+    def action(self, nom: str, status: Dict):
+        self._ecrire({"type": "action", "n": self._nb_actions, "action": nom, "status": status_vers_json(status)})
+        self._nb_actions += 1
+
+    def decision(self, nom: str, **donnees):
+        """
+        Enregistre une decision, rattachee a la derniere action effectuee
+        """
+        self._ecrire({"type": "decision", "n": self._nb_actions - 1, "decision": nom, **donnees})
+
+    def fin(self, nom: str, resultat):
+        self._ecrire({"type": "fin", "n": self._nb_actions - 1, "methode": nom, "resultat": resultat})
+
+    def fermer(self):
+        self._fichier.close()
+
+
+class RefereeEnregistre:
+    """
+    Classe qui s'intercale entre le jeu et le referee pour enregistrer toutes les actions dans une trace
+
+    Elle expose la meme interface que HitmanReferee et transmet chaque appel au vrai referee.
+    """
+
+    def __init__(self, referee, enregistreur: EnregistreurTrace):
+        self._referee = referee
+        self._enregistreur = enregistreur
+
+    def __getattr__(self, nom: str):
+        methode = getattr(self._referee, nom)
+        if nom in ACTIONS:
+            def action_enregistree():
+                status = methode()
+                self._enregistreur.action(nom, status)
+                return status
+            return action_enregistree
+        if nom == "send_content":
+            def send_content_enregistre(map_info):
+                resultat = methode(map_info)
+                self._enregistreur.fin(nom, resultat)
+                return resultat
+            return send_content_enregistre
+        if nom == "run_actions":
+            def run_actions_enregistre(actions, want_status="last"):
+                if want_status not in WANT_STATUS:
+                    raise ValueError(f"Err: invalid want_status {want_status!r}")
+                # chaque action est enregistree avec son status, comme avec les appels un par un
+                status, penalites, erreur = methode(actions, "all")
+                for action, status_action in zip(actions, status):
+                    self._enregistreur.action(action, status_action)
+                if want_status == "last":
+                    status = status[-1] if status else None
+                elif want_status == "penalties":
+                    status = None
+                return status, penalites, erreur
+            return run_actions_enregistre
+        if nom in FINS:
+            def fin_enregistree():
+                resultat = methode()
+                # la carte complete renvoyee par end_phase1 n'est pas utile pour rejouer la partie
+                self._enregistreur.fin(nom, list(resultat[:3]))
+                return resultat
+            return fin_enregistree
+        return methode
+
+
+class RefereeRejoue:
+    """
+    Classe qui remplace le referee en renvoyant les status enregistres dans une trace
+
+    Chaque action demandee doit correspondre a l'action suivante de la trace, sinon une
+    exception est levee (le jeu a diverge de la partie enregistree).
+
+    Les attributs utiles sont :
+        - actions : liste des (nom, status) de la trace, dans l'ordre
+        - decisions : liste des decisions du moteur enregistrees dans la trace
+        - fins : dictionnaire methode de fin -> resultat enregistre
+        - position : indice de la prochaine action a rejouer
+    """
+
+    def __init__(self, filename: str):
+        self.actions: List = []
+        self.decisions: List[Dict] = []
+        self.fins: Dict = dict()
+        self.position = 0
+        for evenement in lire_trace(filename):
+            if evenement["type"] == "action":
+                self.actions.append((evenement["action"], json_vers_status(evenement["status"])))
+            elif evenement["type"] == "decision":
+                self.decisions.append(evenement)
+            else:
+                self.fins[evenement["methode"]] = evenement["resultat"]
+
+    def prochaine_action(self) -> str:
+        """
+        Renvoie le nom de la prochaine action de la trace, None si la trace est terminee
+        """
+        if self.position >= len(self.actions):
+            return None
+        return self.actions[self.position][0]
+
+    def _rejouer(self, nom: str) -> Dict:
+        if self.position >= len(self.actions):
+            raise ValueError(f"La trace est terminee, impossible de rejouer {nom}")
+        nom_enregistre, status = self.actions[self.position]
+        if nom_enregistre != nom:
+            raise ValueError(f"La partie diverge de la trace a l'action {self.position} : {nom} au lieu de {nom_enregistre}")
+        self.position += 1
+        return dict(status)
+
+    def __getattr__(self, nom: str):
+        if nom in ACTIONS:
+            return lambda: self._rejouer(nom)
+        if nom == "send_content":
+            return lambda map_info: self.fins.get(nom, False)
+        if nom in FINS:
+            resultat = tuple(self.fins.get(nom, (False, "Err: pas de resultat dans la trace", [])))
+            if nom == "end_phase1":
+                # la carte complete n'est pas enregistree dans la trace
+                resultat += (dict(),)
+            return lambda: resultat
+        raise AttributeError(nom)
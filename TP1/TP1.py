@@ -1,3 +1,5 @@
+import ast
+
 def decomp2(n : int, nb_bits : int):
     decomposition = list()
     
@@ -35,18 +37,124 @@ def gen_interpretations(voc: list[str]):
         yield interpretation(voc, vals)
 
 
+def gen_interpretations_gray(voc: list[str]):
+    """
+    Genere les 2^n interpretations dans l'ordre du code de Gray : d'une interpretation a la
+    suivante une seule variable change, le meme dictionnaire est donc modifie et renvoye a
+    chaque fois (il ne faut pas le garder d'une iteration a l'autre).
+    """
+    interp = {variable: False for variable in voc}
+    yield interp
+    for i in range(1, 2**len(voc)):
+        # la variable qui change est celle du bit de poids faible de i
+        bit = (i & -i).bit_length() - 1
+        variable = voc[len(voc) - 1 - bit]
+        interp[variable] = not interp[variable]
+        yield interp
+
+
 def valuate(formula: str, interpretation: dict[str, bool]):
     return eval(formula, interpretation)
 
+
+def compiler(formule: str):
+    """
+    Compile la formule une seule fois, le code obtenu s'evalue ensuite avec eval(code, interpretation)
+    sans reanalyser la chaine
+    """
+    return compile(formule, "<formule>", "eval")
+
+
+class VersBits(ast.NodeTransformer):
+    """
+    Remplace and/or/not par &/|/~ pour evaluer la formule sur des entiers dont chaque bit est une interpretation
+
+    Seules les formules faites de and, or, not, de variables et de True/False sont acceptees : tout
+    autre noeud (comparaison, operation arithmetique...) donnerait un resultat faux sur les entiers,
+    il leve donc une ValueError.
+    """
+
+    AUTORISES = (ast.Expression, ast.Name, ast.Load, ast.And, ast.Or, ast.Not)
+
+    def generic_visit(self, node):
+        if not isinstance(node, self.AUTORISES):
+            raise ValueError(f"expression non supportee en mode bits : {ast.unparse(node)}")
+        return super().generic_visit(node)
+
+    def visit_BoolOp(self, node):
+        super().generic_visit(node)
+        op = ast.BitAnd() if isinstance(node.op, ast.And) else ast.BitOr()
+        expression = node.values[0]
+        for valeur in node.values[1:]:
+            expression = ast.BinOp(left=expression, op=op, right=valeur)
+        return expression
+
+    def visit_UnaryOp(self, node):
+        if not isinstance(node.op, ast.Not):
+            raise ValueError(f"expression non supportee en mode bits : {ast.unparse(node)}")
+        super().generic_visit(node)
+        return ast.UnaryOp(op=ast.Invert(), operand=node.operand)
+
+    def visit_Constant(self, node):
+        # True vaut 1 (un seul bit), il faut tous les bits : -1 en complement a deux
+        if node.value is True:
+            return ast.Constant(value=-1)
+        if node.value is False:
+            return ast.Constant(value=0)
+        raise ValueError(f"expression non supportee en mode bits : {ast.unparse(node)}")
+
+
+def compiler_bits(formule: str, voc: list[str]):
+    """
+    Compile la formule en une fonction qui prend un entier par variable (un bit par interpretation)
+    et renvoie l'entier des resultats, a masquer avec le nombre de bits utiles (~ rend des entiers negatifs).
+    Leve une ValueError si la formule n'est pas faite uniquement de and, or, not, variables et True/False.
+    """
+    expression = VersBits().visit(ast.parse(formule, mode="eval")).body
+    arguments = ast.arguments(posonlyargs=[], args=[ast.arg(arg=variable) for variable in voc],
+                              kwonlyargs=[], kw_defaults=[], defaults=[])
+    fonction = ast.Expression(body=ast.Lambda(args=arguments, body=expression))
+    return eval(compile(ast.fix_missing_locations(fonction), "<formule>", "eval"), {"__builtins__": {}})
+
+
+def gen_blocs(voc: list[str], bits_bloc: int = 16):
+    """
+    Genere les interpretations par blocs de 2^bits_bloc, sous forme de (valeurs, masque) : valeurs
+    donne pour chaque variable un entier dont le bit r est sa valeur dans la r-ieme interpretation
+    du bloc (meme ordre que gen_interpretations), masque a un bit a 1 par interpretation du bloc.
+    """
+    n = len(voc)
+    b = min(n, bits_bloc)
+    taille = 2**b
+    masque = (1 << taille) - 1
+    # motif p : alternance de 2^p zeros et 2^p uns, le bit r vaut le bit p de r
+    motifs = [(((1 << 2**p) - 1) << 2**p) * (masque // ((1 << 2**(p + 1)) - 1)) for p in range(b)]
+
+    for bloc in range(2**(n - b)):
+        valeurs = []
+        for k in range(n):
+            p = n - 1 - k # voc[0] est le bit de poids fort de l'indice de l'interpretation
+            if p < b:
+                valeurs.append(motifs[p])
+            else:
+                valeurs.append(-1 if (bloc >> (p - b)) & 1 else 0)
+        yield valeurs, masque
+
 def transform(val : bool):
     if val:
         return 'T'
     return 'F'
 
 def affichage(formule, voc):
+    """
+    Affiche la table de verite de la formule. Les interpretations sont parcourues dans l'ordre du
+    code de Gray (gen_interpretations_gray) : d'une ligne a la suivante une seule variable change,
+    on ne reformate donc que sa cellule. Chaque ligne est rangee a son rang dans l'ordre binaire
+    (le i-eme code de Gray est i ^ (i >> 1)), puis la table est affichee dans cet ordre.
+    """
     print(f"formule : {formule}\n")
 
-    g = gen_interpretations(voc)
+    n = len(voc)
 
     for variable in voc:
         print(f"+-{'-'*len(variable)}-", end="")
@@ -61,34 +169,73 @@ def affichage(formule, voc):
         print(f"+-{'-'*len(variable)}-", end="")
     print("+-------+")
 
-    
-
-    for interpretation in g:
-        res = valuate(formule, interpretation)
+    # cellules[k][valeur] : cellule de la variable k pour chaque valeur
+    cellules = [[f"| {transform(valeur):<{len(variable)}} " for valeur in (False, True)] for variable in voc]
+    ligne = [cellules[k][False] for k in range(n)]
+    lignes = [None] * 2**n
 
-        for variable, variable_res in enumerate(list(interpretation.values())[:len(voc)]):
-            print(f"| {transform(variable_res):<{len(voc[variable])}} ", end="")
-        
-        print("|", end="")
+    code = compiler(formule)
+    for i, interp in enumerate(gen_interpretations_gray(voc)):
+        if i > 0:
+            # meme variable que celle changee par gen_interpretations_gray
+            k = n - 1 - ((i & -i).bit_length() - 1)
+            ligne[k] = cellules[k][interp[voc[k]]]
+        res = valuate(code, interp)
+        lignes[i ^ (i >> 1)] = f"{''.join(ligne)}|   {transform(res)}   |"
 
-        print(f"   {transform(res)}   |")
+    print("\n".join(lignes))
 
     for variable in voc:
         print(f"+-{'-'*len(variable)}-", end="")
     print("+-------+")
 
 
-def nature(formule, voc):
-    g = gen_interpretations(voc)
+MODES = ("auto", "eval", "gray", "bits")
+
+def nature(formule, voc, mode="auto"):
+    """
+    mode vaut :
+        - "eval" : la chaine est evaluee pour chaque interpretation
+        - "gray" : la formule est compilee une fois, interpretations dans l'ordre du code de Gray
+        - "bits" : la formule est evaluee sur des blocs de 2^16 interpretations a la fois (un bit par interpretation),
+            uniquement pour les formules faites de and, or, not, variables et True/False (ValueError sinon)
+        - "auto" : "bits" si la formule le permet, "gray" sinon
+    Dans tous les cas, on s'arrete des qu'on a trouve une interpretation vraie et une fausse.
+    """
+    if mode not in MODES:
+        raise ValueError(f"mode inconnu : {mode!r}, choisir parmi {', '.join(MODES)}")
 
     existe_vrai = False
     existe_faux = False
-    
-    for interpretation in g:
-        if valuate(formule, interpretation):
-            existe_vrai = True
+
+    f = None
+    if mode in ("auto", "bits"):
+        try:
+            f = compiler_bits(formule, voc)
+        except ValueError:
+            if mode == "bits":
+                raise
+            mode = "gray"
+
+    if f is not None:
+        for valeurs, masque in gen_blocs(voc):
+            resultat = f(*valeurs) & masque
+            existe_vrai = existe_vrai or resultat != 0
+            existe_faux = existe_faux or resultat != masque
+            if existe_vrai and existe_faux:
+                break
+    else:
+        if mode == "gray":
+            code, g = compiler(formule), gen_interpretations_gray(voc)
         else:
-            existe_faux = True
+            code, g = formule, gen_interpretations(voc)
+        for interpretation in g:
+            if valuate(code, interpretation):
+                existe_vrai = True
+            else:
+                existe_faux = True
+            if existe_vrai and existe_faux:
+                break
 
 
     if existe_vrai and existe_faux:
@@ -110,7 +257,7 @@ def contradiction(formule, voc):
 
 
 
-def test(nb_variables):
+def test(nb_variables, mode="auto"):
     n = nb_variables
     variables = [f"X{i}" for i in range(1, n+1)]
 
@@ -121,18 +268,28 @@ def test(nb_variables):
     formule = formule[:-5]
 
     print(f"nb variables : {n}")
-    print(nature(formule, variables))
+    print(nature(formule, variables, mode))
 
     # affichage(formule, variables)
 
-def is_cons(f1: str, f2: str, voc: list[str]):
+def is_cons(f1: str, f2: str, voc: list[str], methode="enumeration"):
     """
     Détermine si f1 => f2
+    methode vaut "enumeration" (toutes les interpretations), "bdd" (bdd.py) ou "sat" (tseitin.py,
+    une seule requete a gophersat)
     """
-    formula = f"not ({f1}) or {f2}"
-    res = validite(formula, voc)
+    if methode == "sat":
+        from tseitin import is_cons_sat
+        res = is_cons_sat(f1, f2)
+    elif methode == "bdd":
+        from bdd import is_cons_bdd
+        res = is_cons_bdd(f1, f2, voc)
+    else:
+        formula = f"not ({f1}) or {f2}"
+        res = validite(formula, voc)
     print(f"\"{f1} => {f2}\" is {res}")
     return res
 
-is_cons("X1 and X3", "X1 or X3 and X2", ["X1", "X2", "X3"])
-affichage("X1 or X3 and X2", ["X1", "X2", "X3"])
+if __name__ == "__main__":
+    is_cons("X1 and X3", "X1 or X3 and X2", ["X1", "X2", "X3"])
+    affichage("X1 or X3 and X2", ["X1", "X2", "X3"])
@@ -0,0 +1,289 @@
+import ast
+from collections import OrderedDict
+from time import perf_counter
+
+FAUX = 0
+VRAI = 1
+
+
+class BDD:
+    """
+    Diagramme de decision binaire reduit et ordonne (ROBDD)
+
+    Chaque noeud teste une variable et a deux fils : bas (variable fausse) et haut (variable vraie).
+    Les variables sont toujours testees dans le meme ordre, et la table unique garantit qu'il n'existe
+    qu'un seul noeud par triplet (variable, bas, haut), sans noeud dont les deux fils sont egaux :
+    deux formules equivalentes ont donc le meme noeud racine. Une formule est valide si sa racine est
+    VRAI, contradictoire si c'est FAUX, et f1 => f2 si (non f1 ou f2) donne VRAI.
+
+    Un BDD est caracterise par :
+        - ordre : liste des variables, dans l'ordre ou elles sont testees
+        - niveaux : dictionnaire variable -> position dans l'ordre
+        - noeuds : liste des noeuds (niveau, bas, haut), les noeuds 0 et 1 sont les feuilles FAUX et VRAI
+        - unique : table unique, dictionnaire (niveau, bas, haut) -> noeud
+        - cache : resultats deja calcules des operations, (operation, u, v) -> noeud, limite a
+            taille_cache entrees ou au nombre de noeuds s'il est plus grand (les moins recemment
+            utilisees sont oubliees) : un cache plus petit que le BDD ferait recalculer les memes
+            sous-problemes et le temps ne serait plus proportionnel a la taille du BDD
+
+    Les operations parcourent le BDD avec une pile explicite plutot que par recursion : la profondeur
+    est le nombre de variables, qui peut depasser la limite de recursion de Python.
+
+    Les methodes utiles sont :
+        - variable : renvoie le noeud d'une variable
+        - non, et, ou : operations logiques sur des noeuds
+        - formule : construit le noeud d'une formule Python (and, or, not, True, False)
+        - nature : "Valide", "Contradictoire" ou "Contingente"
+        - nb_modeles : nombre d'interpretations qui satisfont un noeud
+        - taille : nombre de noeuds accessibles depuis un noeud
+    """
+
+    def __init__(self, ordre: list[str] = None, taille_cache: int = 1 << 16):
+        self.ordre = []
+        self.niveaux = dict()
+        # les feuilles sont au niveau "infini" (apres toutes les variables)
+        self.noeuds = [(float("inf"), FAUX, FAUX), (float("inf"), VRAI, VRAI)]
+        self.unique = dict()
+        self.cache = OrderedDict()
+        self.taille_cache = taille_cache
+        for variable in ordre or []:
+            self.ajouter_variable(variable)
+
+    def ajouter_variable(self, variable: str):
+        if variable not in self.niveaux:
+            self.niveaux[variable] = len(self.ordre)
+            self.ordre.append(variable)
+
+    def _noeud(self, niveau: int, bas: int, haut: int) -> int:
+        if bas == haut:
+            return bas
+        cle = (niveau, bas, haut)
+        noeud = self.unique.get(cle)
+        if noeud is None:
+            noeud = len(self.noeuds)
+            self.noeuds.append(cle)
+            self.unique[cle] = noeud
+        return noeud
+
+    def _en_cache(self, cle):
+        resultat = self.cache.get(cle)
+        if resultat is not None:
+            self.cache.move_to_end(cle)
+        return resultat
+
+    def _mettre_en_cache(self, cle, resultat: int):
+        self.cache[cle] = resultat
+        if len(self.cache) > self.taille_cache and len(self.cache) > len(self.noeuds):
+            self.cache.popitem(last=False)
+
+    def variable(self, nom: str) -> int:
+        if nom not in self.niveaux:
+            raise ValueError(f"variable {nom} absente de l'ordre des variables")
+        return self._noeud(self.niveaux[nom], FAUX, VRAI)
+
+    def non(self, u: int) -> int:
+        return self._appliquer("non", u, u)
+
+    @staticmethod
+    def _terminal(operation: str, u: int, v: int):
+        """
+        Resultat immediat de l'operation (feuilles, element neutre ou absorbant), None s'il faut decomposer
+        """
+        if operation == "non":
+            return 1 - u if u <= VRAI else None
+        if operation == "et":
+            if u == FAUX or v == FAUX:
+                return FAUX
+            if u == VRAI:
+                return v
+            if v == VRAI or u == v:
+                return u
+        else:
+            if u == VRAI or v == VRAI:
+                return VRAI
+            if u == FAUX:
+                return v
+            if v == FAUX or u == v:
+                return u
+        return None
+
+    def _appliquer(self, operation: str, u: int, v: int) -> int:
+        """
+        Calcule non u (v vaut alors u), u et v, ou u ou v, en decomposant sur la premiere variable
+        testee par u ou v (Shannon). La pile contient les couples (u, v) a calculer et, sous les deux
+        couples des fils d'un noeud, la tache (None, cle, niveau) qui assemble leurs resultats.
+        """
+        resultats = []
+        pile = [(u, v)]
+        while pile:
+            tache = pile.pop()
+            if tache[0] is None:
+                _, cle, niveau = tache
+                haut = resultats.pop()
+                bas = resultats.pop()
+                resultat = self._noeud(niveau, bas, haut)
+                self._mettre_en_cache(cle, resultat)
+                resultats.append(resultat)
+                continue
+
+            u, v = tache
+            resultat = self._terminal(operation, u, v)
+            if resultat is None:
+                if u > v:
+                    u, v = v, u # operations commutatives, une seule entree de cache
+                cle = (operation, u, v)
+                resultat = self._en_cache(cle)
+            if resultat is not None:
+                resultats.append(resultat)
+                continue
+
+            niveau_u, bas_u, haut_u = self.noeuds[u]
+            niveau_v, bas_v, haut_v = self.noeuds[v]
+            niveau = min(niveau_u, niveau_v)
+            if niveau_u != niveau:
+                bas_u = haut_u = u
+            if niveau_v != niveau:
+                bas_v = haut_v = v
+            pile.append((None, cle, niveau))
+            pile.append((haut_u, haut_v))
+            pile.append((bas_u, bas_v))
+        return resultats.pop()
+
+    def et(self, u: int, v: int) -> int:
+        return self._appliquer("et", u, v)
+
+    def ou(self, u: int, v: int) -> int:
+        return self._appliquer("ou", u, v)
+
+    def formule(self, formule: str) -> int:
+        """
+        Construit le noeud d'une formule ecrite en Python (meme syntaxe que pour TP1.nature).
+        Les variables absentes de l'ordre sont ajoutees a la fin, dans l'ordre de la formule.
+        """
+        return self._construire(ast.parse(formule, mode="eval").body)
+
+    def _construire(self, noeud) -> int:
+        if isinstance(noeud, ast.BoolOp):
+            operation = self.et if isinstance(noeud.op, ast.And) else self.ou
+            resultat = self._construire(noeud.values[0])
+            for valeur in noeud.values[1:]:
+                resultat = operation(resultat, self._construire(valeur))
+            return resultat
+        if isinstance(noeud, ast.UnaryOp) and isinstance(noeud.op, ast.Not):
+            return self.non(self._construire(noeud.operand))
+        if isinstance(noeud, ast.Name):
+            self.ajouter_variable(noeud.id)
+            return self.variable(noeud.id)
+        if isinstance(noeud, ast.Constant) and isinstance(noeud.value, bool):
+            return VRAI if noeud.value else FAUX
+        raise ValueError(f"expression non supportee : {ast.unparse(noeud)}")
+
+    def nature(self, u: int) -> str:
+        if u == VRAI:
+            return "Valide"
+        if u == FAUX:
+            return "Contradictoire"
+        return "Contingente"
+
+    def nb_modeles(self, u: int, nb_variables: int = None) -> int:
+        """
+        Nombre d'interpretations des nb_variables premieres variables de l'ordre (toutes par defaut)
+        qui rendent u vrai, en un parcours du BDD : une variable sautee entre un noeud et son fils
+        peut prendre les deux valeurs, ce qui multiplie le nombre de modeles du fils par 2.
+        """
+        n = len(self.ordre) if nb_variables is None else nb_variables
+        comptes = {FAUX: 0, VRAI: 1}
+
+        def niveau(w):
+            return min(self.noeuds[w][0], n)
+
+        # parcours en profondeur avec une pile : un noeud est compte quand ses deux fils le sont
+        pile = [u]
+        while pile:
+            w = pile[-1]
+            if w in comptes:
+                pile.pop()
+                continue
+            niveau_w, bas, haut = self.noeuds[w]
+            if bas in comptes and haut in comptes:
+                pile.pop()
+                comptes[w] = (comptes[bas] * 2**(niveau(bas) - niveau_w - 1)
+                              + comptes[haut] * 2**(niveau(haut) - niveau_w - 1))
+            else:
+                pile.extend(f for f in (bas, haut) if f not in comptes)
+
+        return comptes[u] * 2**niveau(u)
+
+    def taille(self, u: int) -> int:
+        vus = set()
+        a_voir = [u]
+        while a_voir:
+            w = a_voir.pop()
+            if w in vus:
+                continue
+            vus.add(w)
+            if w > VRAI:
+                a_voir.extend(self.noeuds[w][1:])
+        return len(vus)
+
+
+def nature_bdd(formule: str, voc: list[str]):
+    bdd = BDD(voc)
+    return bdd.nature(bdd.formule(formule))
+
+def contingence_bdd(formule, voc):
+    return nature_bdd(formule, voc) == "Contingente"
+
+def validite_bdd(formule, voc):
+    return nature_bdd(formule, voc) == "Valide"
+
+def contradiction_bdd(formule, voc):
+    return nature_bdd(formule, voc) == "Contradictoire"
+
+def is_cons_bdd(f1: str, f2: str, voc: list[str]):
+    """
+    Détermine si f1 => f2 : les deux formules sont construites dans le meme BDD et on verifie
+    que (non f1) ou f2 est la feuille VRAI
+    """
+    bdd = BDD(voc)
+    return bdd.ou(bdd.non(bdd.formule(f1)), bdd.formule(f2)) == VRAI
+
+
+def formule_test(n: int) -> str:
+    """
+    Formule de TP1.test : (X1 or X2) and (X2 or X3) and ... and (Xn-1 or Xn)
+    """
+    return " and ".join(f"(X{i} or X{i+1})" for i in range(1, n))
+
+
+def benchmark(tailles_enumeration=(8, 12, 16, 20), tailles_bdd=(20, 50, 100, 200, 400)):
+    """
+    Compare l'enumeration des interpretations (TP1.nature) et le BDD sur les formules de TP1.test,
+    pour la validite de la formule, et de la formule ou sa negation (valide, pire cas de l'enumeration
+    qui ne peut pas s'arreter avant la fin), ainsi que le nombre de modeles
+    """
+    from TP1 import nature
+
+    print(f"{'n':>5} {'methode':>12} {'nature':>14} {'(f or not f)':>14} {'temps (s)':>10} {'modeles':>12} {'noeuds':>7}")
+    for n in sorted(set(tailles_enumeration) | set(tailles_bdd)):
+        voc = [f"X{i}" for i in range(1, n + 1)]
+        f = formule_test(n)
+        tautologie = f"({f}) or not ({f})"
+        modes = [m for m in ("eval", "bits") if n in tailles_enumeration and (m == "bits" or n <= 12)]
+        for mode in modes:
+            debut = perf_counter()
+            resultats = nature(f, voc, mode), nature(tautologie, voc, mode)
+            print(f"{n:>5} {mode:>12} {resultats[0]:>14} {resultats[1]:>14} {perf_counter() - debut:>10.3f}")
+        if n in tailles_bdd or n in tailles_enumeration:
+            debut = perf_counter()
+            bdd = BDD(voc)
+            u = bdd.formule(f)
+            resultats = bdd.nature(u), bdd.nature(bdd.formule(tautologie))
+            duree = perf_counter() - debut
+            modeles = bdd.nb_modeles(u)
+            modeles = str(modeles) if modeles < 10**12 else f"{modeles:.3e}"
+            print(f"{n:>5} {'bdd':>12} {resultats[0]:>14} {resultats[1]:>14} {duree:>10.3f} {modeles:>12} {bdd.taille(u):>7}")
+
+
+if __name__ == "__main__":
+    benchmark()
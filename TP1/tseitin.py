@@ -0,0 +1,184 @@
+import ast
+import os
+import sys
+import tempfile
+from time import perf_counter
+from typing import Dict, List, Tuple
+
+# le lanceur de gophersat est celui du projet (Projet/gophersat/dimacs.py)
+PROJET = os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "Projet")
+sys.path.append(PROJET)
+from gophersat.dimacs import exec_gophersat
+
+# executable gophersat : argument cmd, sinon variable d'environnement GOPHERSAT, sinon celui du projet
+# (Projet/gophersat/gophersat), voir readme.md
+GOPHERSAT = os.path.join(PROJET, "gophersat", "gophersat")
+
+
+def chemin_gophersat(cmd: str = None) -> str:
+    chemin = cmd or os.environ.get("GOPHERSAT") or GOPHERSAT
+    if not (os.path.isfile(chemin) and os.access(chemin, os.X_OK)):
+        raise FileNotFoundError(f"executable gophersat introuvable ou non executable : {chemin} "
+                                "(passer cmd ou definir la variable d'environnement GOPHERSAT)")
+    return chemin
+
+
+class Tseitin:
+    """
+    Transformation de Tseitin des formules Python (and, or, not, True, False) en CNF
+
+    Chaque sous-formule and/or recoit une variable equivalente a cette sous-formule, ce qui donne
+    un nombre de clauses lineaire en la taille de la formule (au lieu d'un developpement exponentiel).
+    Les sous-formules identiques sont partagees (hash-consing) : une sous-formule est identifiee par
+    son operateur et l'ensemble trie des litteraux de ses fils (and et or sont associatifs,
+    commutatifs et idempotents), elle ne recoit donc qu'une variable et ses clauses ne sont ecrites
+    qu'une fois, meme si elle apparait dans plusieurs formules. La negation ne cree pas de variable,
+    c'est le litteral oppose.
+
+    Un transformateur est caracterise par :
+        - variables : dictionnaire nom de variable de la formule -> variable propositionnelle
+        - sous_formules : dictionnaire (operateur, litteraux des fils) -> variable de la sous-formule
+        - clauses : clauses de definition des sous-formules
+        - nb_var : nombre de variables propositionnelles utilisees
+
+    Les methodes utiles sont :
+        - litteral : renvoie le litteral equivalent a une formule (les constantes donnent True ou False)
+        - satisfiable : resout les clauses de definition avec des litteraux supposes vrais
+    """
+
+    def __init__(self):
+        self.variables: Dict[str, int] = dict()
+        self.sous_formules: Dict[Tuple[str, Tuple[int, ...]], int] = dict()
+        self.clauses: List[List[int]] = []
+        self.nb_var = 0
+
+    def _nouvelle_variable(self) -> int:
+        self.nb_var += 1
+        return self.nb_var
+
+    def variable(self, nom: str) -> int:
+        if nom not in self.variables:
+            self.variables[nom] = self._nouvelle_variable()
+        return self.variables[nom]
+
+    def litteral(self, formule: str):
+        return self._transformer(ast.parse(formule, mode="eval").body)
+
+    def _transformer(self, noeud):
+        """
+        Renvoie le litteral de la sous-formule, ou True / False si elle se simplifie en constante
+        """
+        if isinstance(noeud, ast.Name):
+            return self.variable(noeud.id)
+        if isinstance(noeud, ast.Constant) and isinstance(noeud.value, bool):
+            return noeud.value
+        if isinstance(noeud, ast.UnaryOp) and isinstance(noeud.op, ast.Not):
+            fils = self._transformer(noeud.operand)
+            return (not fils) if isinstance(fils, bool) else -fils
+        if isinstance(noeud, ast.BoolOp):
+            et = isinstance(noeud.op, ast.And)
+            absorbant = not et # False absorbe un "and", True absorbe un "or"
+            litteraux = set()
+            for valeur in noeud.values:
+                fils = self._transformer(valeur)
+                if isinstance(fils, bool):
+                    if fils == absorbant:
+                        return absorbant
+                    continue # element neutre
+                if -fils in litteraux:
+                    return absorbant # x and not x, x or not x
+                litteraux.add(fils)
+            return self._definir("and" if et else "or", litteraux, not absorbant)
+        raise ValueError(f"expression non supportee : {ast.unparse(noeud)}")
+
+    def _definir(self, operateur: str, litteraux: set, neutre: bool):
+        if not litteraux:
+            return neutre
+        if len(litteraux) == 1:
+            return next(iter(litteraux))
+
+        cle = (operateur, tuple(sorted(litteraux)))
+        if cle in self.sous_formules:
+            return self.sous_formules[cle]
+
+        x = self._nouvelle_variable()
+        self.sous_formules[cle] = x
+        if operateur == "and":
+            # x <=> l1 and ... and lk
+            self.clauses.extend([-x, l] for l in cle[1])
+            self.clauses.append([x] + [-l for l in cle[1]])
+        else:
+            # x <=> l1 or ... or lk
+            self.clauses.append([-x] + list(cle[1]))
+            self.clauses.extend([-l, x] for l in cle[1])
+        return x
+
+    def satisfiable(self, hypotheses: List[int], cmd: str = None) -> bool:
+        """
+        Resout (un seul appel a gophersat, cmd : voir chemin_gophersat) les clauses de definition
+        et les litteraux supposes vrais
+        """
+        descripteur, filename = tempfile.mkstemp(prefix="tseitin_", suffix=".cnf")
+        os.close(descripteur)
+        try:
+            lignes = [f"p cnf {self.nb_var} {len(self.clauses) + len(hypotheses)}\n"]
+            lignes.extend(" ".join(map(str, clause)) + " 0\n" for clause in self.clauses)
+            lignes.extend(f"{l} 0\n" for l in hypotheses)
+            with open(filename, "w") as cnf:
+                cnf.write("".join(lignes))
+            satisfiable, _ = exec_gophersat(filename, chemin_gophersat(cmd))
+            return satisfiable
+        finally:
+            os.remove(filename)
+
+
+def is_cons_sat(f1: str, f2: str, cmd: str = None) -> bool:
+    """
+    Détermine si f1 => f2 : f1 and not f2 doit etre insatisfiable (une seule requete SAT,
+    cmd : executable gophersat, voir chemin_gophersat)
+    """
+    tseitin = Tseitin()
+    l1, l2 = tseitin.litteral(f1), tseitin.litteral(f2)
+    if l1 is False or l2 is True:
+        return True
+    if l1 is True and l2 is False:
+        return False
+    hypotheses = ([] if l1 is True else [l1]) + ([] if l2 is False else [-l2])
+    return not tseitin.satisfiable(hypotheses, cmd)
+
+
+def validite_sat(formule: str, cmd: str = None) -> bool:
+    return is_cons_sat("True", formule, cmd)
+
+
+def contradiction_sat(formule: str, cmd: str = None) -> bool:
+    return is_cons_sat(formule, "False", cmd)
+
+
+def contingence_sat(formule: str, cmd: str = None) -> bool:
+    return not validite_sat(formule, cmd) and not contradiction_sat(formule, cmd)
+
+
+def benchmark(tailles=(10, 100, 300, 1000)):
+    """
+    Consequences logiques sur les formules de TP1.test (chaines de (Xi or Xi+1)) :
+    la chaine implique (X1 or X2) et la chaine decalee d'un cran privee de sa derniere clause,
+    mais pas X1
+    """
+    print(f"{'n':>6} {'clauses':>8} {'question':>28} {'reponse':>8} {'temps (ms)':>11}")
+    for n in tailles:
+        chaine = " and ".join(f"(X{i} or X{i+1})" for i in range(1, n))
+        sous_chaine = " and ".join(f"(X{i+1} or X{i})" for i in range(n - 2, 0, -1))
+        tseitin = Tseitin()
+        tseitin.litteral(chaine)
+        for question, (f1, f2) in (("chaine => (X1 or X2)", (chaine, "X1 or X2")),
+                                   ("chaine => sous-chaine", (chaine, sous_chaine)),
+                                   ("chaine => X1", (chaine, "X1"))):
+            debut = perf_counter()
+            reponse = is_cons_sat(f1, f2)
+            duree = perf_counter() - debut
+            print(f"{n:>6} {len(tseitin.clauses):>8} {question:>28} {str(reponse):>8} {duree * 1e3:>11.1f}")
+
+
+if __name__ == "__main__":
+    benchmark()
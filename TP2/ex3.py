@@ -1,4 +1,11 @@
+import argparse
 import os
+import random
+import subprocess
+import sys
+import tempfile
+from itertools import combinations
+from time import perf_counter
 
 def init_graphe(sommets):
     graphe = {}
@@ -65,6 +72,199 @@ def convertir_dimacs(graphe):
 
     return dict_decode_variables
         
+#### coloration a k couleurs de grands graphes
+
+GOPHERSAT = os.path.join(os.path.dirname(os.path.realpath(__file__)), "gophersat")
+
+# le lanceur de gophersat est celui du projet (Projet/gophersat/dimacs.py) : il exige une reponse
+# explicite (SATISFIABLE ou UNSATISFIABLE) et leve RuntimeError sinon
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "Projet"))
+from gophersat.dimacs import exec_gophersat
+
+def lire_col(fichier):
+    """
+    Lit un graphe au format DIMACS .col ("p edge n m", puis une ligne "e u v" par arete, sommets
+    numerotes a partir de 1). Renvoie (nombre de sommets, liste des aretes (u, v) avec u < v,
+    numerotees a partir de 0), sans doublons ni boucles
+    """
+    nb_sommets = None
+    aretes = set()
+    with open(fichier) as f:
+        for ligne in f:
+            morceaux = ligne.split()
+            if not morceaux or morceaux[0] == "c":
+                continue
+            if morceaux[0] == "p":
+                if len(morceaux) < 3:
+                    raise ValueError(f"en-tete .col invalide : {ligne.strip()!r}")
+                nb_sommets = int(morceaux[2])
+            elif morceaux[0] == "e":
+                if nb_sommets is None:
+                    raise ValueError("arete avant l'en-tete p edge")
+                u, v = int(morceaux[1]) - 1, int(morceaux[2]) - 1
+                if not (0 <= u < nb_sommets and 0 <= v < nb_sommets):
+                    raise ValueError(f"sommet hors du graphe : {ligne.strip()!r}")
+                if u != v:
+                    aretes.add((min(u, v), max(u, v)))
+    if nb_sommets is None:
+        raise ValueError("en-tete p edge absent")
+    return nb_sommets, sorted(aretes)
+
+def ecrire_col(fichier, nb_sommets, aretes):
+    with open(fichier, "w") as f:
+        f.write(f"p edge {nb_sommets} {len(aretes)}\n")
+        f.writelines(f"e {u + 1} {v + 1}\n" for u, v in aretes)
+
+def graphe_aleatoire(nb_sommets, degre_moyen, graine=0):
+    """
+    Graphe aleatoire a nb_sommets sommets d'environ degre_moyen voisins par sommet
+    (au plus nb_sommets - 1, le graphe complet)
+    """
+    hasard = random.Random(graine)
+    nb_aretes = nb_sommets * degre_moyen // 2
+    nb_aretes_max = nb_sommets * (nb_sommets - 1) // 2
+    if degre_moyen < 0 or nb_aretes > nb_aretes_max:
+        raise ValueError(f"degre moyen {degre_moyen} impossible avec {nb_sommets} sommets "
+                         f"({nb_aretes} aretes demandees, {nb_aretes_max} au plus)")
+    if 2 * nb_aretes > nb_aretes_max:
+        # graphe dense : le tirage avec rejet tomberait trop souvent sur une arete deja tiree
+        return sorted(hasard.sample(list(combinations(range(nb_sommets), 2)), nb_aretes))
+
+    aretes = set()
+    while len(aretes) < nb_aretes:
+        u, v = hasard.randrange(nb_sommets), hasard.randrange(nb_sommets)
+        if u != v:
+            aretes.add((min(u, v), max(u, v)))
+    return sorted(aretes)
+
+def voisinages(nb_sommets, aretes):
+    voisins = [set() for _ in range(nb_sommets)]
+    for u, v in aretes:
+        voisins[u].add(v)
+        voisins[v].add(u)
+    return voisins
+
+def coloration_gloutonne(voisins):
+    """
+    Coloration gloutonne (sommets par degre decroissant, plus petite couleur libre) : donne un
+    majorant du nombre chromatique
+    """
+    couleurs = [-1] * len(voisins)
+    for s in sorted(range(len(voisins)), key=lambda s: -len(voisins[s])):
+        prises = {couleurs[v] for v in voisins[s]}
+        c = 0
+        while c in prises:
+            c += 1
+        couleurs[s] = c
+    return couleurs
+
+def clique_gloutonne(voisins, nb_essais=20):
+    """
+    Grande clique trouvee gloutonnement depuis les sommets de plus haut degre : minorant du nombre
+    chromatique, et ses sommets recoivent des couleurs fixees (elimination des symetries)
+    """
+    meilleure = []
+    for depart in sorted(range(len(voisins)), key=lambda s: -len(voisins[s]))[:nb_essais]:
+        clique = [depart]
+        candidats = set(voisins[depart])
+        while candidats:
+            s = max(candidats, key=lambda s: len(voisins[s] & candidats))
+            clique.append(s)
+            candidats &= voisins[s]
+        if len(clique) > len(meilleure):
+            meilleure = clique
+    return meilleure
+
+def encoder_coloration(nb_sommets, aretes, k_max, clique):
+    """
+    Clauses de la coloration a au plus k_max couleurs, ecrites une seule fois pour toute la descente :
+        - variable x(s, c) = s * k_max + c + 1 : le sommet s a la couleur c
+        - variable u(c) = nb_sommets * k_max + c + 1 : la couleur c est utilisee
+        - chaque sommet a au moins une couleur (s'il en a plusieurs, on garde la premiere)
+        - deux sommets voisins n'ont pas la meme couleur (une fois par arete)
+        - x(s, c) => u(c), pour interdire une couleur avec la seule clause unitaire -u(c)
+        - le i-eme sommet de la clique a la couleur i
+    Renvoie (texte DIMACS des clauses sans en-tete, nombre de clauses, nombre de variables)
+    """
+    def x(s, c):
+        return s * k_max + c + 1
+
+    def u(c):
+        return nb_sommets * k_max + c + 1
+
+    lignes = []
+    for s in range(nb_sommets):
+        lignes.append(" ".join(str(x(s, c)) for c in range(k_max)) + " 0\n")
+        lignes.extend(f"-{x(s, c)} {u(c)} 0\n" for c in range(k_max))
+    for s, t in aretes:
+        lignes.extend(f"-{x(s, c)} -{x(t, c)} 0\n" for c in range(k_max))
+    for i, s in enumerate(clique):
+        lignes.append(f"{x(s, i)} 0\n")
+    return "".join(lignes).encode("ascii"), len(lignes), nb_sommets * k_max + k_max
+
+def nombre_chromatique(nb_sommets, aretes, delai=60, afficher=True):
+    """
+    Cherche le nombre chromatique par descente : on part de la coloration gloutonne (k couleurs),
+    puis on demande a SAT une coloration a k - 1 couleurs, en sautant directement sous le nombre de
+    couleurs effectivement utilisees par chaque solution, jusqu'a un echec ou jusqu'a la taille de
+    la clique (minorant). Les clauses sont encodees une seule fois avec k couleurs, chaque essai
+    n'ajoute que les clauses unitaires qui interdisent les couleurs en trop (gophersat n'a pas de
+    mode incremental, le meme texte est donc reecrit puis relu a chaque essai).
+    Un essai qui depasse delai secondes arrete la descente : le resultat n'est alors qu'un majorant.
+    Seul un "s UNSATISFIABLE" explicite de gophersat prouve la minimalite, toute autre reponse leve
+    RuntimeError (voir exec_gophersat).
+    Renvoie (nombre de couleurs, coloration, True si ce nombre est prouve minimal)
+    """
+    voisins = voisinages(nb_sommets, aretes)
+    debut = perf_counter()
+    meilleure = coloration_gloutonne(voisins)
+    k_max = max(meilleure, default=-1) + 1
+    clique = clique_gloutonne(voisins) if nb_sommets > 0 else []
+    if afficher:
+        print(f"{nb_sommets} sommets, {len(aretes)} aretes : glouton {k_max} couleurs, clique {len(clique)} ({perf_counter() - debut:.3f} s)")
+
+    if k_max <= len(clique):
+        return k_max, meilleure, True
+
+    debut = perf_counter()
+    texte, nb_clauses, nb_var = encoder_coloration(nb_sommets, aretes, k_max, clique)
+    if afficher:
+        print(f"encodage : {nb_var} variables, {nb_clauses} clauses ({perf_counter() - debut:.3f} s)")
+
+    descripteur, filename = tempfile.mkstemp(prefix="coloration_", suffix=".cnf")
+    os.close(descripteur)
+    exact = True
+    try:
+        k = k_max - 1
+        while k >= len(clique):
+            interdites = [f"-{nb_sommets * k_max + c + 1} 0\n" for c in range(k, k_max)]
+            debut = perf_counter()
+            with open(filename, "wb") as cnf:
+                cnf.write(f"p cnf {nb_var} {nb_clauses + len(interdites)}\n".encode("ascii"))
+                cnf.write(texte)
+                cnf.write("".join(interdites).encode("ascii"))
+            try:
+                satisfiable, modele = exec_gophersat(filename, cmd=GOPHERSAT, timeout=delai)
+            except subprocess.TimeoutExpired:
+                if afficher:
+                    print(f"k = {k} : expire ({perf_counter() - debut:.3f} s)")
+                exact = False
+                break
+            if afficher:
+                print(f"k = {k} : {'SAT' if satisfiable else 'UNSAT'} ({perf_counter() - debut:.3f} s)")
+            if not satisfiable:
+                break
+            vrais = set(l for l in modele if l > 0)
+            meilleure = [next(c for c in range(k) if s * k_max + c + 1 in vrais) for s in range(nb_sommets)]
+            k = max(meilleure) # la solution peut utiliser moins de k couleurs
+    finally:
+        os.remove(filename)
+
+    return max(meilleure) + 1, meilleure, exact
+
+def verifier_coloration(aretes, couleurs):
+    return all(couleurs[u] != couleurs[v] for u, v in aretes)
+
 def main():
     decode = convertir_dimacs(creer_graphe_exemple())
     output = os.popen("./gophersat graphe.cnf").read()
@@ -75,4 +275,24 @@ def main():
     print(f"Solution : {solution_readable}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Graph colouring with SAT")
+    parser.add_argument("--col", type=str, default="", help="Find the chromatic number of this DIMACS .col graph")
+    parser.add_argument("--random", type=int, default=0, help="Find the chromatic number of a random graph with this number of vertices")
+    parser.add_argument("--degree", type=int, default=20, help="Average degree of the random graph, default is 20")
+    parser.add_argument("--timeout", type=float, default=60, help="Time limit in seconds for each number of colours, default is 60")
+    args = parser.parse_args()
+
+    if args.col or args.random:
+        if args.col:
+            nb_sommets, aretes = lire_col(args.col)
+        else:
+            try:
+                nb_sommets, aretes = args.random, graphe_aleatoire(args.random, args.degree)
+            except ValueError as e:
+                parser.error(str(e))
+        debut = perf_counter()
+        chi, couleurs, exact = nombre_chromatique(nb_sommets, aretes, args.timeout)
+        assert verifier_coloration(aretes, couleurs)
+        print(f"nombre chromatique : {'' if exact else 'au plus '}{chi} ({perf_counter() - debut:.3f} s)")
+    else:
+        main()
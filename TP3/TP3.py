@@ -1,22 +1,28 @@
 from itertools import combinations
+from math import ceil, isqrt
 
-def cell_to_variable(i, j, n):
-    return 81 * i + 9 * j + n 
+## order : ordre de la grille, une grille d'ordre 3 fait 9x9 cases, 4 -> 16x16, 5 -> 25x25
 
-def variable_to_cell(v):
-    valeur = (v - 1) % 9 + 1
-    ligne = (v - 1) // 81
-    colonne = ((v - 1) % 81) // 9
+def cell_to_variable(i, j, n, order=3):
+    size = order * order
+    return size * size * i + size * j + n
+
+def variable_to_cell(v, order=3):
+    size = order * order
+    valeur = (v - 1) % size + 1
+    ligne = (v - 1) // (size * size)
+    colonne = ((v - 1) % (size * size)) // size
     return ligne, colonne, valeur
 
-def model_to_grid(model):
-    grid = [[0 for _ in range(9)] for _ in range(9)]
+def model_to_grid(model, order=3):
+    size = order * order
+    grid = [[0 for _ in range(size)] for _ in range(size)]
     for var in model:
-        if var > 0:
-            ligne, colonne, valeur = variable_to_cell(var)
+        if 0 < var <= size ** 3:
+            ligne, colonne, valeur = variable_to_cell(var, order)
             grid[ligne][colonne] = valeur
     return grid
-    
+
 
 def at_least_one(liste):
     return liste.copy()
@@ -32,98 +38,252 @@ def unique(liste):
     return clauses
 
 
-def create_cell_constraints():
+def create_cell_constraints(order=3):
+    size = order * order
     clauses = []
-    for i in range(9):
-        for j in range(9):
+    for i in range(size):
+        for j in range(size):
             ## liste des variables
             liste = []
-            for n in range(1, 10):
-                liste.append(cell_to_variable(i, j, n))
+            for n in range(1, size + 1):
+                liste.append(cell_to_variable(i, j, n, order))
             clauses.extend(unique(liste))
     return clauses
 
 
-def create_line_constraints():
+def create_line_constraints(order=3):
+    size = order * order
     clauses = []
-    for n in range(1, 10):
-        for i in range(9):
+    for n in range(1, size + 1):
+        for i in range(size):
             ## liste des variables
             liste = []
-            for j in range(9):
-                liste.append(cell_to_variable(i, j, n))
+            for j in range(size):
+                liste.append(cell_to_variable(i, j, n, order))
             clauses.append(liste)
     return clauses
 
 
-def create_column_constraints():
+def create_column_constraints(order=3):
+    size = order * order
     clauses = []
-    for n in range(1, 10):
-        for j in range(9):
+    for n in range(1, size + 1):
+        for j in range(size):
             ## liste des variables
             liste = []
-            for i in range(9):
-                liste.append(cell_to_variable(i, j, n))
+            for i in range(size):
+                liste.append(cell_to_variable(i, j, n, order))
             clauses.append(liste)
     return clauses
 
 
-def create_box_constraints():
+def create_box_constraints(order=3):
+    size = order * order
     clauses = []
-    for n in range(1, 10):
-        for i in range(3):
-            for j in range(3):
+    for n in range(1, size + 1):
+        for i in range(order):
+            for j in range(order):
                 ## liste des variables
                 liste = []
-                for k in range(3):
-                    for l in range(3):
-                        liste.append(cell_to_variable(3 * i + k, 3 * j + l, n))
+                for k in range(order):
+                    for l in range(order):
+                        liste.append(cell_to_variable(order * i + k, order * j + l, n, order))
                 clauses.append(liste)
     return clauses
 
 
-def create_value_constraints(grid):
+def create_value_constraints(grid, order=3):
+    size = order * order
     clauses = []
-    for i in range(9):
-        for j in range(9):
+    for i in range(size):
+        for j in range(size):
             if grid[i][j] != 0:
-                clauses.append([cell_to_variable(i, j, grid[i][j])])
+                clauses.append([cell_to_variable(i, j, grid[i][j], order)])
     return clauses
 
 
-def generate_problem(grid):
+def generate_problem(grid, order=3):
     clauses = []
-    clauses.extend(create_cell_constraints())
-    clauses.extend(create_line_constraints())
-    clauses.extend(create_column_constraints())
-    clauses.extend(create_box_constraints())
-    clauses.extend(create_value_constraints(grid))
+    clauses.extend(create_cell_constraints(order))
+    clauses.extend(create_line_constraints(order))
+    clauses.extend(create_column_constraints(order))
+    clauses.extend(create_box_constraints(order))
+    clauses.extend(create_value_constraints(grid, order))
     return clauses
 
+
+#### encodage compact
+
+def at_most_one_product(liste, next_var, seuil=5):
+    """
+    Encodage "produit" de au plus une variable vraie (Chen, 2010) : les n variables sont rangees
+    dans un tableau p x q (p ~ q ~ racine de n), avec une variable auxiliaire par ligne et par
+    colonne. Une variable vraie rend vraies celles de sa ligne et de sa colonne, et on impose
+    recursivement au plus une ligne et au plus une colonne : environ 2n + 4 racine(n) clauses
+    au lieu de n(n-1)/2 en deux a deux.
+    Renvoie (clauses, prochaine variable libre)
+    """
+    if len(liste) <= seuil:
+        return [[-a, -b] for a, b in combinations(liste, 2)], next_var
+
+    p = ceil(len(liste) / isqrt(len(liste)))
+    q = ceil(len(liste) / p)
+    lignes = list(range(next_var, next_var + p))
+    colonnes = list(range(next_var + p, next_var + p + q))
+    next_var += p + q
+
+    clauses = []
+    for k, x in enumerate(liste):
+        clauses.append([-x, lignes[k // q]])
+        clauses.append([-x, colonnes[k % q]])
+    for auxiliaires in (lignes, colonnes):
+        sous_clauses, next_var = at_most_one_product(auxiliaires, next_var, seuil)
+        clauses.extend(sous_clauses)
+    return clauses, next_var
+
+
+def units(order=3):
+    """
+    Renvoie la liste des lignes, colonnes et carres, chacun sous forme de liste de cases (i, j)
+    """
+    size = order * order
+    lines = [[(i, j) for j in range(size)] for i in range(size)]
+    columns = [[(i, j) for i in range(size)] for j in range(size)]
+    boxes = [[(order * bi + k, order * bj + l) for k in range(order) for l in range(order)]
+             for bi in range(order) for bj in range(order)]
+    return lines + columns + boxes
+
+
+def propagate_singles(grid, order=3):
+    """
+    Remplit les cases deduites sans recherche avant d'ecrire la moindre clause :
+        - singleton nu : une case qui n'a plus qu'un candidat prend cette valeur
+        - singleton cache : une valeur qui n'a plus qu'une place dans une ligne/colonne/carre y est placee
+    Renvoie (grille remplie, candidats de chaque case), ou None si la grille est contradictoire
+    """
+    size = order * order
+    all_units = units(order)
+    peers = {(i, j): set() for i in range(size) for j in range(size)}
+    for unit in all_units:
+        for cell in unit:
+            peers[cell].update(unit)
+    for cell in peers:
+        peers[cell].discard(cell)
+
+    filled = [[0] * size for _ in range(size)]
+    candidates = {(i, j): set(range(1, size + 1)) for i in range(size) for j in range(size)}
+    to_assign = [((i, j), grid[i][j]) for i in range(size) for j in range(size) if grid[i][j] != 0]
+
+    while to_assign:
+        # singletons nus : on place les valeurs et on les retire des candidats des cases voisines
+        while to_assign:
+            (i, j), n = to_assign.pop()
+            if filled[i][j] == n:
+                continue
+            if filled[i][j] != 0 or n not in candidates[(i, j)]:
+                return None
+            filled[i][j] = n
+            candidates[(i, j)] = {n}
+            for peer in peers[(i, j)]:
+                if n in candidates[peer]:
+                    candidates[peer].discard(n)
+                    if not candidates[peer]:
+                        return None
+                    if len(candidates[peer]) == 1 and filled[peer[0]][peer[1]] == 0:
+                        to_assign.append((peer, next(iter(candidates[peer]))))
+
+        # singletons caches
+        for unit in all_units:
+            for n in range(1, size + 1):
+                places = [cell for cell in unit if n in candidates[cell]]
+                if not places:
+                    return None
+                if len(places) == 1 and filled[places[0][0]][places[0][1]] == 0:
+                    to_assign.append((places[0], n))
+
+    return filled, candidates
+
+
+def generate_compact_problem(grid, order=3):
+    """
+    Genere les clauses d'une grille d'ordre quelconque, apres propagation des singletons :
+    seules les cases encore vides ont des variables, une par candidat restant (numerotees a
+    la suite), avec exactement un candidat par case et exactement une place pour chaque valeur
+    pas encore placee de chaque ligne/colonne/carre ("au plus un" en encodage produit).
+    Renvoie (clauses, nb_var, variables, grille remplie), variables etant le dictionnaire
+    (i, j, n) -> variable. Une grille contradictoire donne la clause vide.
+    """
+    result = propagate_singles(grid, order)
+    if result is None:
+        return [[]], 0, dict(), [list(row) for row in grid]
+    filled, candidates = result
+
+    size = order * order
+    variables = dict()
+    for i in range(size):
+        for j in range(size):
+            if filled[i][j] == 0:
+                for n in sorted(candidates[(i, j)]):
+                    variables[(i, j, n)] = len(variables) + 1
+    next_var = len(variables) + 1
+
+    clauses = []
+    for i in range(size):
+        for j in range(size):
+            if filled[i][j] == 0:
+                liste = [variables[(i, j, n)] for n in sorted(candidates[(i, j)])]
+                clauses.append(at_least_one(liste))
+                at_most_one, next_var = at_most_one_product(liste, next_var)
+                clauses.extend(at_most_one)
+
+    for unit in units(order):
+        placed = {filled[i][j] for i, j in unit}
+        for n in range(1, size + 1):
+            if n not in placed:
+                liste = [variables[(i, j, n)] for i, j in unit if (i, j, n) in variables]
+                clauses.append(at_least_one(liste))
+                # redondant avec les cases, mais aide beaucoup la propagation du solveur
+                at_most_one, next_var = at_most_one_product(liste, next_var)
+                clauses.extend(at_most_one)
+
+    return clauses, next_var - 1, variables, filled
+
+
+def compact_model_to_grid(model, variables, filled):
+    grid = [list(row) for row in filled]
+    cells = {v: cell for cell, v in variables.items()}
+    for var in model:
+        if var in cells:
+            i, j, n = cells[var]
+            grid[i][j] = n
+    return grid
+
+
 def clauses_to_dimacs(clauses, nb_var=729):
     nb_clause = len(clauses)
-    chaine = f"p cnf {nb_var} {nb_clause}\n"
+    lignes = [f"p cnf {nb_var} {nb_clause}\n"]
     for clause in clauses:
-        chaine += " ".join([str(i) for i in clause]) + " 0\n"
-    return chaine
-    
+        lignes.append(" ".join([str(i) for i in clause]) + " 0\n")
+    return "".join(lignes)
+
 def display_grid(grid):
-    for i in range(25):
-        print("-", end="")
-    print()
-    
-    for i in range(9):
+    size = len(grid)
+    order = isqrt(size)
+    width = len(str(size))
+    # chaque carre prend order cases de width caracteres plus un espace, plus "| " a gauche
+    separator = "-" * ((width + 1) * size + 2 * order + 1)
+    print(separator)
+
+    for i in range(size):
         print("|", end=" ")
-        for j in range(9):
+        for j in range(size):
             n = grid[i][j]
             if n == 0:
                 n = "."
-            print(n, end=" ")
-            if j % 3 == 2:
+            print(str(n).rjust(width), end=" ")
+            if j % order == order - 1:
                 print("|", end=" ")
         print()
-        if i % 3 == 2:
-            for j in range(25):
-                print("-", end="")
-            print()
+        if i % order == order - 1:
+            print(separator)
     print()
@@ -4,10 +4,21 @@ author:  Sylvain Lagrue
 version: 1.1.0
 """
 
-from typing import List, Tuple
+from typing import List, Tuple, Optional
+from multiprocessing import Pool
+from time import perf_counter
+import argparse
+import os
+import random
 import subprocess
+import sys
+import tempfile
 from TP3 import *
 
+# le lanceur de gophersat est celui du projet (Projet/gophersat/dimacs.py)
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "Projet"))
+from gophersat.dimacs import exec_gophersat
+
 # alias de types
 Grid = List[List[int]] 
 PropositionnalVariable = int
@@ -62,21 +73,216 @@ def write_dimacs_file(dimacs: str, filename: str):
         cnf.write(dimacs)
 
 
-def exec_gophersat(
-    filename: str, cmd: str = "./gophersat", encoding: str = "utf8"
-) -> Tuple[bool, List[int]]:
-    result = subprocess.run(
-        [cmd, filename], capture_output=True, check=True, encoding=encoding
-    )
-    string = str(result.stdout)
-    lines = string.splitlines()
+#### resolution par lots
+
+GOPHERSAT = os.path.join(os.path.dirname(os.path.realpath(__file__)), "gophersat")
+
+# texte DIMACS des contraintes de case/ligne/colonne/carre, identiques pour toutes les grilles :
+# construit une seule fois par processus (initialiseur du pool), seules les clauses unitaires
+# des chiffres donnes changent d'une grille a l'autre
+static_clauses: bytes = b""
+nb_static_clauses: int = 0
+
+
+def init_static_clauses():
+    global static_clauses, nb_static_clauses
+    clauses = generate_problem(empty_grid)
+    static_clauses = "".join(" ".join(map(str, clause)) + " 0\n" for clause in clauses).encode("ascii")
+    nb_static_clauses = len(clauses)
+
+
+def parse_puzzle(line: str) -> Grid:
+    """
+    Transforme une ligne de 81 caracteres (chiffres, "0" ou "." pour une case vide) en grille
+    """
+    line = line.strip()
+    if len(line) != 81 or any(c not in "0123456789." for c in line):
+        raise ValueError(f"invalid puzzle line: {line[:90]!r}")
+    return [[0 if c == "." else int(c) for c in line[9 * i : 9 * i + 9]] for i in range(9)]
+
+
+def grid_to_line(grid: Grid) -> str:
+    return "".join(str(n) if n != 0 else "." for row in grid for n in row)
+
+
+def read_puzzles(filename: str) -> List[str]:
+    """
+    Lit un fichier de grilles (une grille de 81 caracteres par ligne, lignes vides et lignes
+    commencant par # ignorees)
+    """
+    with open(filename) as f:
+        lines = [line.strip() for line in f]
+    puzzles = [line for line in lines if line != "" and not line.startswith("#")]
+    for line in puzzles:
+        parse_puzzle(line)
+    return puzzles
+
+
+def generate_variants(count: int, seed: int = 0) -> List[str]:
+    """
+    Genere count grilles equivalentes aux grilles d'exemple (chiffres renommes, lignes et colonnes
+    permutees dans leur bande, transposition), pour mesurer le debit sans fichier de grilles
+    """
+    rng = random.Random(seed)
+    puzzles = []
+    for k in range(count):
+        grid = example if k % 2 == 0 else example2
+        digits = list(range(1, 10))
+        rng.shuffle(digits)
+        rows = [3 * b + r for b in rng.sample(range(3), 3) for r in rng.sample(range(3), 3)]
+        cols = [3 * b + c for b in rng.sample(range(3), 3) for c in rng.sample(range(3), 3)]
+        new_grid = [[grid[i][j] and digits[grid[i][j] - 1] for j in cols] for i in rows]
+        if rng.random() < 0.5:
+            new_grid = [list(row) for row in zip(*new_grid)]
+        puzzles.append(grid_to_line(new_grid))
+    return puzzles
+
+
+def solve_with_units(units: List[Clause], filename: str) -> Tuple[bool, List[int]]:
+    """
+    Resout les contraintes statiques plus des clauses supplementaires : seul leur texte est genere,
+    le texte statique est ecrit tel quel
+    """
+    extra = "".join(" ".join(map(str, clause)) + " 0\n" for clause in units).encode("ascii")
+    with open(filename, "wb") as cnf:
+        cnf.write(f"p cnf 729 {nb_static_clauses + len(units)}\n".encode("ascii"))
+        cnf.write(static_clauses)
+        cnf.write(extra)
+    return exec_gophersat(filename, cmd=GOPHERSAT)
+
+
+def solve_puzzle(line: str) -> Tuple[str, Optional[str]]:
+    """
+    Resout une grille et verifie l'unicite de sa solution.
+    Renvoie ("unique", solution), ("several", solution) ou ("unsatisfiable", None)
+
+    Pour l'unicite, la clause bloquante ne porte que sur les cases vides (les cases donnees ont la
+    meme valeur dans toute solution) : au plus 81 litteraux au lieu des 729 du modele complet.
+    """
+    grid = parse_puzzle(line)
+    units = create_value_constraints(grid)
+    descriptor, filename = tempfile.mkstemp(prefix="sudoku_", suffix=".cnf")
+    os.close(descriptor)
+    try:
+        satisfiable, model = solve_with_units(units, filename)
+        if not satisfiable:
+            return "unsatisfiable", None
+        solution = model_to_grid(model)
+        blocking = [-cell_to_variable(i, j, solution[i][j]) for i in range(9) for j in range(9) if grid[i][j] == 0]
+        if blocking == []:
+            return "unique", grid_to_line(solution)
+        several, _ = solve_with_units(units + [blocking], filename)
+        return ("several" if several else "unique"), grid_to_line(solution)
+    finally:
+        os.remove(filename)
 
-    if lines[1] != "s SATISFIABLE":
-        return False, []
 
-    model = lines[2][2:-2].split(" ")
+def solve_batch(puzzles: List[str], workers: Optional[int] = None) -> List[Tuple[str, Optional[str]]]:
+    """
+    Resout les grilles en parallele (un processus gophersat par resolution, workers processus Python
+    qui construisent chacun une fois les clauses statiques), dans l'ordre des grilles
+    """
+    with Pool(processes=workers, initializer=init_static_clauses) as pool:
+        return pool.map(solve_puzzle, puzzles, chunksize=max(1, len(puzzles) // (4 * (workers or os.cpu_count() or 1))))
 
-    return True, [int(x) for x in model]
+
+def main_batch(puzzles: List[str], workers: Optional[int], output: Optional[str]):
+    start = perf_counter()
+    results = solve_batch(puzzles, workers)
+    elapsed = perf_counter() - start
+
+    counts = {"unique": 0, "several": 0, "unsatisfiable": 0}
+    for status, _ in results:
+        counts[status] += 1
+    print(f"{len(puzzles)} puzzles in {elapsed:.2f} s ({len(puzzles) / elapsed:.1f} puzzles/s)")
+    print(f"unique: {counts['unique']}, several solutions: {counts['several']}, unsatisfiable: {counts['unsatisfiable']}")
+
+    if output:
+        with open(output, "w") as f:
+            for line, (status, solution) in zip(puzzles, results):
+                f.write(f"{line} {status} {solution or ''}\n")
+
+
+#### grilles d'ordre quelconque
+
+
+def generate_puzzle(order: int, kept: float, seed: int = 0) -> Grid:
+    """
+    Genere une grille d'ordre order (order^2 x order^2) a partir d'une grille complete melangee
+    (chiffres renommes, lignes et colonnes permutees dans leur bande), en ne gardant que la
+    proportion kept des cases. La solution n'est pas forcement unique.
+    """
+    rng = random.Random(seed)
+    size = order * order
+    digits = list(range(1, size + 1))
+    rng.shuffle(digits)
+    rows = [order * b + r for b in rng.sample(range(order), order) for r in rng.sample(range(order), order)]
+    cols = [order * b + c for b in rng.sample(range(order), order) for c in rng.sample(range(order), order)]
+    # grille complete classique : decalage de order par ligne, de 1 par bande
+    full = [[digits[(order * (i % order) + i // order + j) % size] for j in cols] for i in rows]
+    return [[n if rng.random() < kept else 0 for n in row] for row in full]
+
+
+def check_solution(grid: Grid, solution: Grid, order: int) -> bool:
+    size = order * order
+    expected = list(range(1, size + 1))
+    return (all(sorted(row) == expected for row in solution)
+            and all(sorted(column) == expected for column in zip(*solution))
+            and all(sorted(solution[order * bi + k][order * bj + l] for k in range(order) for l in range(order)) == expected
+                    for bi in range(order) for bj in range(order))
+            and all(grid[i][j] in (0, solution[i][j]) for i in range(size) for j in range(size)))
+
+
+def timed_solve(clauses: ClauseBase, nb_var: int, filename: str, timeout: float) -> Tuple[Optional[bool], List[int]]:
+    """
+    Resout avec gophersat, renvoie (None, []) si la resolution depasse timeout secondes
+    """
+    write_dimacs_file(clauses_to_dimacs(clauses, nb_var), filename)
+    try:
+        return exec_gophersat(filename, cmd=GOPHERSAT, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return None, []
+
+
+def benchmark(orders: List[int] = [3, 4, 5], kept: float = 0.35, timeout: float = 60):
+    """
+    Compare, pour chaque ordre, l'encodage deux a deux sur toutes les variables (generate_problem)
+    et l'encodage compact apres propagation (generate_compact_problem) : nombre de variables et de
+    clauses, temps de generation et de resolution par gophersat (limite a timeout secondes)
+    """
+    print(f"{'grid':>7} {'encoding':>9} {'vars':>7} {'clauses':>8} {'gen (s)':>8} {'solve (s)':>9}  result")
+    descriptor, filename = tempfile.mkstemp(prefix="sudoku_", suffix=".cnf")
+    os.close(descriptor)
+    try:
+        for order in orders:
+            size = order * order
+            grid = example2 if order == 3 else generate_puzzle(order, kept)
+            name = f"{size}x{size}"
+
+            start = perf_counter()
+            clauses = generate_problem(grid, order)
+            nb_var = size ** 3
+            generated = perf_counter()
+            satisfiable, model = timed_solve(clauses, nb_var, filename, timeout)
+            solved = perf_counter()
+            valid = satisfiable and check_solution(grid, model_to_grid(model, order), order)
+            status = "timeout" if satisfiable is None else ("ok" if valid else "WRONG")
+            print(f"{name:>7} {'pairwise':>9} {nb_var:>7} {len(clauses):>8} {generated - start:>8.3f} {solved - generated:>9.3f}  {status}", flush=True)
+
+            start = perf_counter()
+            clauses, nb_var, variables, filled = generate_compact_problem(grid, order)
+            generated = perf_counter()
+            if clauses == []:
+                # la propagation a rempli toute la grille
+                satisfiable, model = True, []
+            else:
+                satisfiable, model = timed_solve(clauses, nb_var, filename, timeout)
+            solved = perf_counter()
+            valid = satisfiable and check_solution(grid, compact_model_to_grid(model, variables, filled), order)
+            status = "timeout" if satisfiable is None else ("ok" if valid else "WRONG")
+            print(f"{name:>7} {'compact':>9} {nb_var:>7} {len(clauses):>8} {generated - start:>8.3f} {solved - generated:>9.3f}  {status}", flush=True)
+    finally:
+        os.remove(filename)
 
 
 def main():
@@ -113,4 +319,18 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Sudoku SAT")
+    parser.add_argument("--batch", type=str, default="", help="Solve every puzzle of this file (one 81-char line each, 0 or . for empty cells)")
+    parser.add_argument("--variants", type=int, default=0, help="Solve this number of generated variants of the example grids")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes, default is the number of cores")
+    parser.add_argument("--output", type=str, default="", help="Write each puzzle with its status and solution to this file")
+    parser.add_argument("--benchmark", action="store_true", help="Compare pairwise and compact encodings on 9x9, 16x16 and 25x25 grids")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark()
+    elif args.batch or args.variants:
+        puzzles = read_puzzles(args.batch) if args.batch else generate_variants(args.variants)
+        main_batch(puzzles, args.workers, args.output)
+    else:
+        main()
\ No newline at end of file